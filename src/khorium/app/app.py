@@ -1,13 +1,28 @@
+import uuid
+
 from trame.app import get_server
 from trame.decorators import TrameApp
 
-from khorium.app.core.vtk_pipeline import VtkPipeline
-from khorium.app.core.state_manager import StateManager
+from khorium.app.config import METRICS_ENDPOINT
 from khorium.app.controllers.file_controller import FileController
 from khorium.app.controllers.mesh_controller import MeshController
+from khorium.app.controllers.rpc_controller import RpcController
 from khorium.app.controllers.view_controller import ViewController
+from khorium.app.core.metrics import (
+    ACTIVE_JOBS,
+    PROCESS_MEMORY_BYTES,
+    get_metrics_registry,
+    get_process_rss_bytes,
+)
+from khorium.app.core.render_scheduler import RenderScheduler
+from khorium.app.core.state_manager import StateManager
+from khorium.app.core.vtk_pipeline import VtkPipeline
 from khorium.app.ui.layouts.main_layout import MainLayout
 from khorium.app.utils.hot_reload import setup_hot_reload
+from khorium.app.utils.log import configure_logging, get_logger
+from khorium.app.utils.tracing import get_tracer
+
+logger = get_logger(__name__)
 
 # ---------------------------------------------------------
 # Engine class
@@ -17,26 +32,49 @@ from khorium.app.utils.hot_reload import setup_hot_reload
 @TrameApp()
 class MyTrameApp:
     def __init__(self, server=None):
+        configure_logging()
         self.server = get_server(server, client_type="vue3")
         self.vtk_pipeline = VtkPipeline()
-        
+        self.render_scheduler = RenderScheduler()
+        self.session_id = (
+            uuid.uuid4().hex
+        )  # Namespace for this session's uploads and executions
+
         # Initialize StateManager
         self.state_manager = StateManager(self.server.state)
         self.state_manager.initialize_state()
-        
+
         # Initialize controllers
         self.view_controller = ViewController(self)
         self.file_controller = FileController(self)
         self.mesh_controller = MeshController(self)
-        
+        # Batched commands from the embedding frontend
+        self.rpc_controller = RpcController(self)
+
+        # Debug command writing per-key state traffic statistics to JSON
+        self.ctrl.dump_state_traffic = self.state_manager.dump_state_traffic
+
+        # Per-action span traces as Chrome trace-event JSON, for Perfetto
+        tracer = get_tracer()
+        self.ctrl.list_traces = tracer.list_traces
+        self.ctrl.export_trace = tracer.export_chrome_trace
+        self.server.trigger("list_traces")(tracer.list_traces)
+        self.server.trigger("export_trace")(tracer.export_chrome_trace)
+
+        # Scrape-time gauges and the Prometheus endpoint
+        self._setup_metrics()
+
+        # Drop this session's references to stored uploads on exit
+        self.server.controller.on_server_exited.add(self._release_session)
+
         # Initialize UI layout
         self.main_layout = MainLayout(self)
-        
+
         # Setup hot reload if enabled
         if self.server.hot_reload:
             self.server.controller.on_server_reload.add(self._build_ui)
             setup_hot_reload(self.server, self._build_ui)
-            
+
         self.ui = self._build_ui()
 
         # Set Trame-specific state variables
@@ -50,7 +88,36 @@ class MyTrameApp:
     def ctrl(self):
         return self.server.controller
 
+    def _setup_metrics(self):
+        """Register the gauges computed on scrape and serve the registry on METRICS_ENDPOINT"""
+        from khorium.app.services.execution_scheduler import get_execution_scheduler
+
+        PROCESS_MEMORY_BYTES.set_function(get_process_rss_bytes)
+        ACTIVE_JOBS.set_function(
+            lambda: get_execution_scheduler().get_metrics()["running"],
+            kind="code_execution",
+        )
+        ACTIVE_JOBS.set_function(
+            self.file_controller.count_running_preprocessing_jobs, kind="preprocessing"
+        )
+
+        if METRICS_ENDPOINT:
+            self.ctrl.on_server_bind.add(self._add_metrics_route)
+
+    def _add_metrics_route(self, wslink_server):
+        from aiohttp import web
+
+        async def metrics(_request):
+            return web.Response(
+                body=get_metrics_registry().render().encode(),
+                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+            )
+
+        wslink_server.app.add_routes([web.get(METRICS_ENDPOINT, metrics)])
+        logger.info("Serving metrics on %s", METRICS_ENDPOINT)
+
+    def _release_session(self, **_kwargs):
+        self.file_controller.file_service.release_uploads()
 
     def _build_ui(self, *_args, **_kwargs):
         return self.main_layout.build_ui(*_args, **_kwargs)
-
@@ -1,7 +1,120 @@
 import os
+import tempfile
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MESH_GENERATE_API = os.getenv("MESH_GENERATE_API", "http://localhost:10000/optimize_mesh")
+MESH_GENERATE_API = os.getenv(
+    "MESH_GENERATE_API", "http://localhost:10000/optimize_mesh"
+)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://www.app.khorium.ai")
+
+# Resource limits applied to user code execution (0 disables a limit)
+CODE_EXEC_MAX_MEMORY_MB = int(os.getenv("CODE_EXEC_MAX_MEMORY_MB", "8192"))
+CODE_EXEC_MAX_CPU_SECONDS = int(os.getenv("CODE_EXEC_MAX_CPU_SECONDS", "600"))
+CODE_EXEC_MAX_OPEN_FILES = int(os.getenv("CODE_EXEC_MAX_OPEN_FILES", "1024"))
+CODE_EXEC_MAX_FILE_SIZE_MB = int(os.getenv("CODE_EXEC_MAX_FILE_SIZE_MB", "2048"))
+
+# Opt-in memoization of mesh code execution results
+CODE_EXEC_CACHE_ENABLED = os.getenv("CODE_EXEC_CACHE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+CODE_EXEC_CACHE_DIR = os.getenv(
+    "CODE_EXEC_CACHE_DIR", os.path.join(tempfile.gettempdir(), "khorium_exec_cache")
+)
+CODE_EXEC_CACHE_MAX_MB = int(os.getenv("CODE_EXEC_CACHE_MAX_MB", "1024"))
+
+# Persistent kernel mode for iterative mesh scripting
+CODE_EXEC_KERNEL_IDLE_TIMEOUT = int(os.getenv("CODE_EXEC_KERNEL_IDLE_TIMEOUT", "900"))
+CODE_EXEC_KERNEL_MAX_MEMORY_MB = int(
+    os.getenv("CODE_EXEC_KERNEL_MAX_MEMORY_MB", "4096")
+)
+
+# Admission control for mesh code execution. Set CODE_EXEC_SLOTS_DIR to a
+# directory shared by all Khorium processes to make the cap host-wide.
+CODE_EXEC_MAX_CONCURRENT = int(os.getenv("CODE_EXEC_MAX_CONCURRENT", "2"))
+CODE_EXEC_MAX_PER_SESSION = int(os.getenv("CODE_EXEC_MAX_PER_SESSION", "1"))
+CODE_EXEC_MAX_QUEUED_PER_SESSION = int(
+    os.getenv("CODE_EXEC_MAX_QUEUED_PER_SESSION", "4")
+)
+CODE_EXEC_SLOTS_DIR = os.getenv("CODE_EXEC_SLOTS_DIR", "")
+
+# Execution output is kept server-side and fetched in pages; state only carries a preview
+CODE_EXEC_OUTPUT_PREVIEW_CHARS = int(
+    os.getenv("CODE_EXEC_OUTPUT_PREVIEW_CHARS", "2000")
+)
+CODE_EXEC_OUTPUT_RETAINED = int(os.getenv("CODE_EXEC_OUTPUT_RETAINED", "8"))
+
+# Per-key state update and change handler statistics, published to the
+# state_traffic debug key at most once per interval. Off by default: every
+# write is serialized to count its bytes and the statistics add sync traffic.
+STATE_TRAFFIC_STATS_ENABLED = os.getenv(
+    "STATE_TRAFFIC_STATS_ENABLED", "false"
+).lower() in ("1", "true", "yes")
+STATE_TRAFFIC_PUBLISH_SECONDS = float(os.getenv("STATE_TRAFFIC_PUBLISH_SECONDS", "2"))
+
+# Content-addressed upload store shared by all sessions on the host (0 disables a quota)
+UPLOAD_STORE_DIR = os.getenv(
+    "UPLOAD_STORE_DIR", os.path.join(tempfile.gettempdir(), "khorium_uploads")
+)
+UPLOAD_STORE_MAX_MB = int(os.getenv("UPLOAD_STORE_MAX_MB", "0"))
+UPLOAD_SESSION_QUOTA_MB = int(os.getenv("UPLOAD_SESSION_QUOTA_MB", "0"))
+# Staging files of uploads left unfinished this long are removed by the
+# store sweep that runs when a khorium process starts
+UPLOAD_STAGING_MAX_AGE_SECONDS = int(
+    os.getenv("UPLOAD_STAGING_MAX_AGE_SECONDS", "86400")
+)
+
+# Compressed uploads that decompress past this size are rejected
+UPLOAD_MAX_DECOMPRESSED_MB = int(os.getenv("UPLOAD_MAX_DECOMPRESSED_MB", "16384"))
+
+# Worker threads validating, storing and parsing the files of a multi-file upload
+UPLOAD_INGEST_WORKERS = int(os.getenv("UPLOAD_INGEST_WORKERS", "4"))
+
+# Background preprocessing of uploads (surface, bounds, array ranges, LOD, meshing surface)
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
+PREPROCESS_LOD_TARGET_CELLS = int(os.getenv("PREPROCESS_LOD_TARGET_CELLS", "200000"))
+
+# Warm session pool (khorium-pool): idle khorium processes are started ahead of
+# time and handed to sessions on connect. Idle processes are recycled after
+# SESSION_POOL_IDLE_TIMEOUT seconds, which is also passed to each process as
+# its trame --timeout.
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "2"))
+SESSION_POOL_PORTS = os.getenv("SESSION_POOL_PORTS", "9001-9100")
+SESSION_POOL_IDLE_TIMEOUT = int(os.getenv("SESSION_POOL_IDLE_TIMEOUT", "600"))
+SESSION_POOL_READY_TIMEOUT = int(os.getenv("SESSION_POOL_READY_TIMEOUT", "60"))
+SESSION_POOL_READY_LINE = os.getenv("SESSION_POOL_READY_LINE", "Starting factory")
+SESSION_POOL_SESSION_URL = os.getenv(
+    "SESSION_POOL_SESSION_URL",
+    "ws://USE_HOSTNAME:USE_HOST_PORT/proxy?sessionId=${id}&path=ws",
+)
+SESSION_POOL_PROXY_FILE = os.getenv("SESSION_POOL_PROXY_FILE", "")
+
+# Prometheus text endpoint served by the trame server (empty disables it)
+METRICS_ENDPOINT = os.getenv("METRICS_ENDPOINT", "/metrics")
+
+# Logging: LOG_LEVEL applies to all of khorium, LOG_LEVELS overrides it per
+# module ("controllers.view_controller=DEBUG,services=WARNING"), and
+# LOG_FORMAT selects "text" or one JSON object per line ("json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Span tracing of user actions, kept in memory for the last TRACE_RETAINED
+# actions and exported on demand as Chrome trace-event JSON
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_RETAINED = int(os.getenv("TRACE_RETAINED", "20"))
+
+# Generated mesh streaming to the embedding frontend: size of one binary
+# chunk, chunks handed out per request, and streams kept open per process.
+# Every open stream keeps its own encoded copy of the mesh, so memory use is
+# bounded by MESH_STREAM_MAX_OPEN times the encoded mesh size
+MESH_STREAM_CHUNK_BYTES = int(os.getenv("MESH_STREAM_CHUNK_BYTES", str(1024 * 1024)))
+MESH_STREAM_MAX_CHUNKS_PER_REQUEST = int(
+    os.getenv("MESH_STREAM_MAX_CHUNKS_PER_REQUEST", "8")
+)
+MESH_STREAM_MAX_OPEN = int(os.getenv("MESH_STREAM_MAX_OPEN", "4"))
+MESH_STREAM_IDLE_TIMEOUT = int(os.getenv("MESH_STREAM_IDLE_TIMEOUT", "300"))
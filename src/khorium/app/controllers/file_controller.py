@@ -1,52 +1,370 @@
+import asyncio
+import contextvars
+import os
+import time
+from typing import Optional
+
+from trame.app import asynchronous
 from trame.decorators import controller
 
+from khorium.app.core.mesh_data import read_mesh_file
+from khorium.app.core.metrics import UPLOAD_BYTES, UPLOAD_SECONDS
 from khorium.app.services.file_service import FileService
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import traced
+
+logger = get_logger(__name__)
 
 
 class FileController:
     """Controller for file upload operations"""
-    
+
     def __init__(self, app):
         self.app = app
-        self.file_service = FileService()
+        self.file_service = FileService(app.session_id)
+        self._preprocessing_service = None
         self._register_controllers()
-    
+
+    @property
+    def preprocessing_service(self):
+        """Background preprocessing, created with its VTK filters and worker pool on the first upload"""
+        if self._preprocessing_service is None:
+            from khorium.app.services.preprocessing_service import PreprocessingService
+
+            self._preprocessing_service = PreprocessingService()
+        return self._preprocessing_service
+
     def _register_controllers(self):
         """Register controller methods with Trame"""
         self.app.ctrl.upload_file = self.upload_file
-    
+
+        # Chunked streaming upload protocol, callable from the client via trame.trigger
+        self.app.ctrl.upload_begin = self.upload_begin
+        self.app.ctrl.upload_chunk = self.upload_chunk
+        self.app.ctrl.upload_finish = self.upload_finish
+        self.app.ctrl.upload_abort = self.upload_abort
+        self.app.server.trigger("upload_begin")(self.upload_begin)
+        self.app.server.trigger("upload_chunk")(self.upload_chunk)
+        self.app.server.trigger("upload_finish")(self.upload_finish)
+        self.app.server.trigger("upload_abort")(self.upload_abort)
+
     @controller.set("upload_file")
+    @traced("file_controller.upload_file")
     def upload_file(self, files):
-        """Handle .vtu or .stl file upload and reload VTK pipeline"""
-        target_file_path = self.file_service.process_uploaded_files(files)
-        
+        """
+        Handle .vtu or .stl file upload and reload VTK pipeline
+
+        Returns:
+            Stored path of a single uploaded file, None if it was rejected or
+            when several files start a background batch ingest
+        """
+        if files and len(files) > 1:
+            asynchronous.create_task(self.upload_files_async(files))
+            return None
+
+        with UPLOAD_SECONDS.time(kind="single", status="failed") as labels:
+            target_file_path = self.file_service.process_uploaded_files(files)
+
+            if not target_file_path:
+                if self.file_service.last_error:
+                    self.app.state_manager.set(
+                        "upload_progress",
+                        {
+                            "status": "failed",
+                            "error": self.file_service.last_error,
+                        },
+                    )
+                return None
+
+            UPLOAD_BYTES.inc(os.path.getsize(target_file_path), kind="single")
+            self._load_uploaded_file(target_file_path)
+            labels["status"] = "completed"
+            return target_file_path
+
+    @traced("file_controller.upload_files_async")
+    async def upload_files_async(self, files):
+        """
+        Ingest a multi-file upload in parallel and show each file as a separate part
+
+        Returns:
+            Per-file status dictionaries (index, filename, status, error, ...)
+        """
+        started = time.perf_counter()
+        logger.info("Ingesting %d files", len(files))
+        self.file_service.begin_batch()
+
+        statuses = [
+            {"index": i, "filename": "", "status": "processing"}
+            for i in range(len(files))
+        ]
+        with self.app.state:
+            self._update_upload_batch(statuses, "running", started)
+
+        loop = asyncio.get_running_loop()
+        futures = [
+            loop.run_in_executor(
+                self.file_service.ingest_executor,
+                contextvars.copy_context().run,
+                self.file_service.ingest_file,
+                index,
+                file,
+                read_mesh_file,
+            )
+            for index, file in enumerate(files)
+        ]
+
+        results = []
+        for future in asyncio.as_completed(futures):
+            result = await future
+            results.append(result)
+            statuses[result["index"]] = {
+                k: v for k, v in result.items() if k != "dataset"
+            }
+            if result["status"] == "failed":
+                logger.warning(
+                    "Failed to ingest %s: %s", result["filename"], result["error"]
+                )
+            with self.app.state:
+                self._update_upload_batch(statuses, "running", started)
+
+        parts = [
+            (result["filename"] or f"part_{result['index']}", result["dataset"])
+            for result in sorted(results, key=lambda r: r["index"])
+            if result["status"] == "loaded"
+        ]
+
+        with self.app.state:
+            if parts and self.app.vtk_pipeline.load_parts(parts):
+                self.app.vtk_pipeline.center_camera_on_all_actors()
+                self.app.render_scheduler.request_update(reset_camera=True)
+                self.app.state_manager.show_mesh(False)
+            self._update_upload_batch(
+                statuses, "completed" if parts else "failed", started
+            )
+
+        UPLOAD_SECONDS.observe(
+            time.perf_counter() - started,
+            kind="batch",
+            status="completed" if parts else "failed",
+        )
+        UPLOAD_BYTES.inc(
+            sum(result.get("size") or 0 for result in results), kind="batch"
+        )
+        logger.info(
+            "Loaded %d/%d files in %.2fs",
+            len(parts),
+            len(files),
+            time.perf_counter() - started,
+        )
+        return statuses
+
+    def count_running_preprocessing_jobs(self) -> int:
+        """Number of preprocessing jobs still running, without starting the service"""
+        service = self._preprocessing_service
+        job = service.current_job if service else None
+        return 1 if job is not None and job.get_summary()["status"] == "running" else 0
+
+    def get_preprocessed(self, name: str):
+        """Finished preprocessing product of the displayed upload, or None, without starting the service"""
+        service = self._preprocessing_service
+        if service is None:
+            return None
+        return service.get_artifact(self.app.vtk_pipeline.get_current_file(), name)
+
+    def _start_preprocessing(self, target_file_path: str):
+        """Compute derived products of an upload on the preprocessing worker pool"""
+        loop = asyncio.get_event_loop()
+
+        def on_update(job):
+            # Stages finish on worker threads, publish from the event loop
+            loop.call_soon_threadsafe(self._publish_preprocessing, job)
+
+        job = self.preprocessing_service.submit(target_file_path, on_update)
+        self._publish_preprocessing(job)
+
+    def _publish_preprocessing(self, job):
+        """Report preprocessing progress to state"""
+        if job is not self.preprocessing_service.current_job:
+            return
+        summary = job.get_summary()
+        # Stages finishing in the same loop tick are published as one update
+        self.app.state_manager.set_deferred({"preprocessing": summary})
+        if summary["status"] != "running":
+            timings = ", ".join(
+                f"{name} {stage['duration']:.2f}s"
+                for name, stage in summary["stages"].items()
+            )
+            logger.info(
+                "Preprocessing %s for %s: %s",
+                summary["status"],
+                summary["file"],
+                timings,
+            )
+
+    def _update_upload_batch(self, statuses, status: str, started: float):
+        """Report multi-file upload progress to state"""
+        self.app.state_manager.set(
+            "upload_batch",
+            {
+                "status": status,
+                "files": list(statuses),
+                "loaded": sum(1 for s in statuses if s["status"] == "loaded"),
+                "failed": sum(1 for s in statuses if s["status"] == "failed"),
+                "total": len(statuses),
+                "elapsed": time.perf_counter() - started,
+            },
+        )
+
+    def upload_begin(
+        self, filename: str, total_size: int, sha256: Optional[str] = None
+    ):
+        """
+        Start a chunked upload
+
+        When the client sends the SHA-256 of content that is already stored, the
+        file is loaded right away and no chunks need to be sent.
+
+        Returns:
+            Dictionary with the upload id (None if rejected or not needed) and
+            whether the upload is already complete
+        """
+        if sha256:
+            target_file_path = self.file_service.link_existing_upload(filename, sha256)
+            if target_file_path:
+                self.app.state_manager.set(
+                    "upload_progress",
+                    {
+                        "filename": filename,
+                        "received": int(total_size),
+                        "total": int(total_size),
+                        "percent": 100.0,
+                        "status": "completed",
+                        "sha256": sha256.lower(),
+                        "deduplicated": True,
+                    },
+                )
+                self._load_uploaded_file(target_file_path)
+                return {"upload_id": None, "complete": True}
+
+        upload_id = self.file_service.begin_chunked_upload(filename, int(total_size))
+        if upload_id:
+            self._update_upload_progress(upload_id, "uploading")
+        else:
+            self.app.state_manager.set(
+                "upload_progress",
+                {
+                    "filename": filename,
+                    "status": "failed",
+                    "error": self.file_service.last_error,
+                },
+            )
+        return {"upload_id": upload_id, "complete": False}
+
+    def upload_chunk(self, upload_id: str, offset: int, data: bytes):
+        """Write one chunk of a chunked upload, returning False on failure"""
+        progress = self.file_service.get_upload_progress(upload_id)
+        if not self.file_service.write_chunk(upload_id, int(offset), data):
+            self.app.state_manager.set(
+                "upload_progress",
+                {
+                    **progress,
+                    "status": "failed",
+                    "error": self.file_service.last_error,
+                },
+            )
+            return False
+        self._update_upload_progress(upload_id, "uploading")
+        return True
+
+    @traced("file_controller.upload_finish")
+    def upload_finish(self, upload_id: str, sha256: Optional[str] = None):
+        """Complete a chunked upload and load the file into the VTK pipeline"""
+        with UPLOAD_SECONDS.time(kind="chunked", status="failed") as labels:
+            if self._finish_chunked_upload(upload_id, sha256):
+                labels["status"] = "completed"
+                return True
+        return False
+
+    def _finish_chunked_upload(
+        self, upload_id: str, sha256: Optional[str] = None
+    ) -> bool:
+        progress = self.file_service.get_upload_progress(upload_id)
+        target_file_path = self.file_service.finish_chunked_upload(upload_id, sha256)
         if not target_file_path:
+            self.app.state_manager.set(
+                "upload_progress",
+                {
+                    **progress,
+                    "status": "failed",
+                    "error": self.file_service.last_error,
+                },
+            )
+            return False
+
+        self.app.state_manager.set(
+            "upload_progress",
+            {
+                **progress,
+                "status": "completed",
+                "sha256": self.file_service.content_hashes.get(target_file_path, ""),
+            },
+        )
+        UPLOAD_BYTES.inc(progress.get("received", 0), kind="chunked")
+        self._load_uploaded_file(target_file_path)
+        return True
+
+    def upload_abort(self, upload_id: str):
+        """Cancel a chunked upload"""
+        progress = self.file_service.get_upload_progress(upload_id)
+        self.file_service.abort_chunked_upload(upload_id)
+        self.app.state_manager.set("upload_progress", {**progress, "status": "aborted"})
+
+    def _update_upload_progress(self, upload_id: str, status: str):
+        """Report chunked upload progress to state"""
+        progress = self.file_service.get_upload_progress(upload_id)
+        # Chunks arrive faster than the client needs progress, keep the latest per loop tick
+        self.app.state_manager.set_deferred(
+            {"upload_progress": {**progress, "status": status}}
+        )
+
+    @traced("file_controller._load_uploaded_file")
+    def _load_uploaded_file(self, target_file_path: str):
+        """Load a stored upload into the VTK pipeline and reset the view"""
+        # Start right away, the workers read the file while the pipeline loads it
+        self._start_preprocessing(target_file_path)
+
+        # Stored paths are content-addressed, so the same path means the same content
+        if self.app.vtk_pipeline.is_file_loaded(target_file_path):
+            logger.info(
+                "Uploaded file is identical to the displayed one, skipping reload"
+            )
             return
-        
+
         # Check if uploaded file is STL
-        is_stl = target_file_path.lower().endswith('.stl')
-        
+        is_stl = target_file_path.lower().endswith(".stl")
+
         # Reload VTK pipeline with new file
         if self.app.vtk_pipeline.load_file(target_file_path):
-            # Center the camera on all visible actors
-            self.app.vtk_pipeline.center_camera_on_all_actors()
-            
+            # Center the camera on all visible actors, with the preprocessed bounds if they are ready
+            self.app.vtk_pipeline.center_camera_on_all_actors(
+                self.preprocessing_service.get_artifact(target_file_path, "bounds")
+            )
+
             # Update the view and ensure proper centering
-            if hasattr(self.app.ctrl, "view_update"):
-                self.app.ctrl.view_update()
-            if hasattr(self.app.ctrl, "view_reset_camera"):
-                self.app.ctrl.view_reset_camera()
-                print(">>> FILE_CONTROLLER: Camera reset to center the uploaded model")
+            self.app.render_scheduler.request_update(reset_camera=True)
+            logger.debug("Camera reset requested to center the uploaded model")
 
             if is_stl:
-                print(">>> FILE_CONTROLLER: STL file loaded and rendered successfully")
+                logger.info("STL file loaded and rendered successfully")
                 # For STL files, we don't use the mesh toggle functionality
                 self.app.state_manager.show_mesh(False)
             else:
-                print(">>> FILE_CONTROLLER: VTK pipeline reloaded with uploaded VTU file")
+                logger.info("VTK pipeline reloaded with uploaded VTU file")
                 # Hide any existing generated mesh when new VTU file is uploaded
                 self.app.state_manager.show_mesh(False)
-            
+
         else:
             file_type = "STL" if is_stl else "VTU"
-            print(f">>> FILE_CONTROLLER: Failed to load uploaded {file_type} file - file may be corrupted")
\ No newline at end of file
+            logger.warning(
+                "Failed to load uploaded %s file - file may be corrupted", file_type
+            )
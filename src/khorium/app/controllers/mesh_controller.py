@@ -1,171 +1,357 @@
 import os
 import time
 from typing import Optional
+
+from trame.app import asynchronous
 from trame.decorators import controller
 
-from khorium.app.services.mesh_service import MeshService
+from khorium.app.core.mesh_data import MeshConversionCache, load_npz_mesh
+from khorium.app.core.metrics import CODE_EXECUTION_SECONDS, MSH_CONVERSION_SECONDS
+from khorium.app.services.code_execution_service import (
+    CodeExecutionResult,
+    CodeExecutionService,
+)
+from khorium.app.services.execution_scheduler import (
+    QueueFullError,
+    get_execution_scheduler,
+)
 from khorium.app.services.file_service import FileService
-from khorium.app.services.code_execution_service import CodeExecutionService
+from khorium.app.services.mesh_service import MeshService
+from khorium.app.services.output_store import DEFAULT_PAGE_CHARS, OutputStore
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import traced
+
+logger = get_logger(__name__)
 
 
 class MeshController:
     """Controller for mesh generation and visualization operations"""
-    
+
     def __init__(self, app):
         self.app = app
         self.mesh_service = MeshService()
-        self.file_service = FileService()
-        self.code_service = CodeExecutionService(default_timeout=120)  # 2 minutes for mesh operations
+        self.session_id = app.session_id
+        self.file_service = FileService(self.session_id)
+        # 2 minutes for mesh operations
+        self.code_service = CodeExecutionService(
+            default_timeout=120, file_service=self.file_service
+        )
+        self.scheduler = get_execution_scheduler()
+        self._last_artifacts = []
+        self._last_output_dir = None
+        self.msh_conversion_cache = MeshConversionCache()
+        self.output_store = OutputStore()
         self._register_controllers()
         self._register_state_handlers()  # Register state change handlers
 
     def _register_state_handlers(self):
         """Register state change handlers"""
         # Register new state manager handlers
-        self.app.state.change("set_mesh_size_factor")(self.set_mesh_size_factor)
-        self.app.state.change("execute_mesh_code")(self._handle_execute_mesh_code_state_change)
-    
+        # Debounced so a dragged slider only pushes the value it settles on
+        self.app.state_manager.on_change(
+            "set_mesh_size_factor", self._handle_mesh_size_factor_state_change
+        )
+        self.app.state_manager.on_change(
+            "execute_mesh_code", self._handle_execute_mesh_code_state_change
+        )
+
+    def _handle_mesh_size_factor_state_change(
+        self, set_mesh_size_factor=None, **kwargs
+    ):
+        """Handle the settled value of the mesh size factor slider"""
+        if set_mesh_size_factor is None:
+            return
+        try:
+            self.set_mesh_size_factor(float(set_mesh_size_factor))
+        except ValueError as e:
+            logger.warning("Ignoring mesh size factor: %s", e)
+
     def _handle_execute_mesh_code_state_change(self, **kwargs):
         """Handle state change for execute_mesh_code"""
         code = self.app.state_manager.get("execute_mesh_code", "")
         if code and code.strip():
-            self.execute_mesh_code(code)
-    
+            bypass_cache = self.app.state_manager.get("mesh_code_bypass_cache", False)
+            persistent = self.app.state_manager.get(
+                "mesh_code_persistent_kernel", False
+            )
+            asynchronous.create_task(
+                self.execute_mesh_code_async(
+                    code, bypass_cache=bypass_cache, persistent=persistent
+                )
+            )
+
     def _register_controllers(self):
         """Register controller methods with Trame"""
+
         @controller.set("load_generated_mesh")
         def load_generated_mesh():
-            """Manually load generated mesh files"""
-            print(">>> MESH_CONTROLLER: Manual load_generated_mesh triggered")
+            """Manually reload the artifacts declared by the last code execution"""
+            logger.info("Manual load_generated_mesh triggered")
             self._handle_post_execution_mesh_loading()
-            if hasattr(self.app.ctrl, "view_update"):
-                self.app.ctrl.view_update()
+            self.app.render_scheduler.request_update()
+
         self.app.ctrl.generate_mesh = self.generate_mesh_gmsh
-    
+        self.app.ctrl.restart_mesh_kernel = self.restart_mesh_kernel
+        # Execution output is paged from the server instead of synchronized through state
+        self.app.ctrl.fetch_mesh_code_output = self.fetch_mesh_code_output
+        self.app.server.trigger("fetch_mesh_code_output")(self.fetch_mesh_code_output)
+
     @controller.set("generate_mesh")
+    @traced("mesh_controller.generate_mesh_gmsh")
     def generate_mesh_gmsh(self):
         """Generate mesh from currently loaded 3D model using GMSH"""
-        print(">>> MESH_CONTROLLER: GMSH mesh generation started")
-        
+        logger.info("GMSH mesh generation started")
+
+        # Apply a slider value still waiting on its debounce before reading it
+        self.app.state_manager.flush_handlers("set_mesh_size_factor")
+
         # Set mesh size factor from state before generating
         mesh_size_factor = self.app.state_manager.get("mesh_size_factor", 1.0)
         self.mesh_service.set_mesh_size_factor(mesh_size_factor)
-        
-        # Generate mesh using GMSH service
-        mesh_file_path = self.mesh_service.generate_mesh_with_gmsh(self.app.vtk_pipeline)
-        
+
+        # Generate mesh using GMSH service, reusing the preprocessed surface when ready
+        surface_file = self.app.file_controller.preprocessing_service.get_artifact(
+            self.app.vtk_pipeline.get_current_file(), "meshing_surface"
+        )
+        mesh_file_path = self.mesh_service.generate_mesh_with_gmsh(
+            self.app.vtk_pipeline, surface_file
+        )
+
         if mesh_file_path:
             # Load the generated mesh
             if self.app.vtk_pipeline.load_file(mesh_file_path, is_generated_mesh=True):
-                # Update the view
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
-                if hasattr(self.app.ctrl, "view_reset_camera"):
-                    self.app.ctrl.view_reset_camera()
-                
-                print(">>> MESH_CONTROLLER: GMSH generated mesh loaded successfully")
-                
+                # Update the view and reset the camera in one render
+                self.app.render_scheduler.request_update(reset_camera=True)
+
+                logger.info("GMSH generated mesh loaded successfully")
+
                 # Show the generated mesh using StateManager
-                print(">>> MESH_CONTROLLER: Setting mesh visible via StateManager")
+                logger.debug("Setting mesh visible via StateManager")
                 self.app.state_manager.show_mesh(True)
-                
-                # Force a render update
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
-                    print(">>> MESH_CONTROLLER: View updated after mesh generation")
             else:
-                print(">>> MESH_CONTROLLER: Failed to load GMSH generated mesh")
+                logger.error("Failed to load GMSH generated mesh")
         else:
-            print(">>> MESH_CONTROLLER: GMSH mesh generation failed")
-
+            logger.error("GMSH mesh generation failed")
 
+    @traced("mesh_controller.generate_mesh_gnn")
     def generate_mesh_gnn(self):
         """Generate mesh from current VTU file via API"""
-        print(">>> MESH_CONTROLLER: Generate Mesh button clicked")
-        
+        logger.info("Generate Mesh button clicked")
+
         # Get current VTU file
         current_file = self.file_service.get_current_vtu_file()
-        
+
         # Generate mesh via service
         mesh_file_path = self.mesh_service.generate_mesh_from_file(current_file)
-        
+
         if mesh_file_path:
             # Load the generated mesh
             if self.app.vtk_pipeline.load_file(mesh_file_path, is_generated_mesh=True):
-                # Update the view
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
-                if hasattr(self.app.ctrl, "view_reset_camera"):
-                    self.app.ctrl.view_reset_camera()
-                
-                print(">>> MESH_CONTROLLER: Generated mesh loaded successfully")
-                
+                # Update the view and reset the camera in one render
+                self.app.render_scheduler.request_update(reset_camera=True)
+
+                logger.info("Generated mesh loaded successfully")
+
                 # Show the generated mesh using StateManager
-                print(">>> MESH_CONTROLLER: Setting mesh visible via StateManager")
+                logger.debug("Setting mesh visible via StateManager")
                 self.app.state_manager.show_mesh(True)
-                
-                # Force a render update
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
-                    print(">>> MESH_CONTROLLER: View updated after mesh generation")
             else:
-                print(">>> MESH_CONTROLLER: Failed to load generated mesh")
-    
-    def execute_mesh_code(self, code: str, timeout: Optional[int] = None):
+                logger.error("Failed to load generated mesh")
+
+    @traced("mesh_controller.execute_mesh_code")
+    def execute_mesh_code(
+        self,
+        code: str,
+        timeout: Optional[int] = None,
+        bypass_cache: bool = False,
+        persistent: bool = False,
+    ):
         """
-        Execute Python code for mesh operations
-        
+        Execute Python code for mesh operations on the calling thread
+
+        This bypasses the execution scheduler; state-driven executions go
+        through execute_mesh_code_async instead.
+
         Args:
             code: Python code string to execute
             timeout: Optional timeout in seconds (default: 120s for mesh operations)
+            bypass_cache: Re-execute even if a cached result exists
+            persistent: Run in the persistent kernel, keeping state from earlier executions
         """
-        print(f">>> MESH_CONTROLLER: Executing mesh code ({len(code)} chars)")
-        
+        logger.info("Executing mesh code (%d chars)", len(code))
+
         # Initialize execution state using StateManager
         self.app.state_manager.start_mesh_code_execution(code)
-        
+
         # Execute the code with mesh context (STL/VTU files automatically available)
         result = self.code_service.execute_mesh_code(
             code=code,
-            timeout=timeout
+            timeout=timeout,
+            bypass_cache=bypass_cache,
+            persistent=persistent,
+        )
+        return self._apply_mesh_code_result(result, persistent)
+
+    @traced("mesh_controller.execute_mesh_code_async")
+    async def execute_mesh_code_async(
+        self,
+        code: str,
+        timeout: Optional[int] = None,
+        bypass_cache: bool = False,
+        persistent: bool = False,
+    ):
+        """
+        Queue Python code for mesh operations through the execution scheduler
+
+        The queue position is reported through mesh_code_queue_position while
+        waiting, and the code runs in the scheduler's worker pool so the event
+        loop stays responsive.
+        """
+        logger.info("Queueing mesh code (%d chars)", len(code))
+
+        def on_queue_update(position: int, depth: int):
+            with self.app.state:
+                if position == 0:
+                    self.app.state_manager.start_mesh_code_execution(code)
+                else:
+                    logger.debug(
+                        "Mesh code queued at position %d of %d", position, depth
+                    )
+                    self.app.state_manager.queue_mesh_code_execution(code, position)
+                self._update_scheduler_metrics()
+
+        try:
+            result = await self.scheduler.run(
+                self.session_id,
+                self.code_service.execute_mesh_code,
+                code=code,
+                timeout=timeout,
+                bypass_cache=bypass_cache,
+                persistent=persistent,
+                on_queue_update=on_queue_update,
+            )
+        except QueueFullError as e:
+            logger.warning("Mesh code rejected: %s", e)
+            with self.app.state:
+                self.app.state_manager.complete_mesh_code_execution(False, {}, str(e))
+                self._update_scheduler_metrics()
+            return None
+
+        with self.app.state:
+            self._update_scheduler_metrics()
+            return self._apply_mesh_code_result(result, persistent)
+
+    @traced("mesh_controller._apply_mesh_code_result")
+    def _apply_mesh_code_result(
+        self, result: CodeExecutionResult, persistent: bool
+    ) -> dict:
+        """Publish an execution result to state and load its artifacts"""
+        if persistent:
+            self._update_kernel_status()
+
+        CODE_EXECUTION_SECONDS.observe(
+            result.execution_time,
+            status="completed" if result.success else "failed",
+            cached=str(result.cached).lower(),
         )
-        
-        # Convert result to dictionary for Trame state
-        result_dict = {
-            'success': result.success,
-            'stdout': result.stdout,
-            'stderr': result.stderr,
-            'exit_code': result.exit_code,
-            'execution_time': result.execution_time,
-            'error_message': result.error_message
+
+        # Convert result to dictionary for Trame state, artifact paths stay on the server
+        result_dict = result.to_dict()
+        result_dict["artifacts"] = [
+            {"name": a["name"], "kind": a["kind"]} for a in result.artifacts
+        ]
+
+        # Full output stays server-side, state only carries its handle and a preview
+        output_id = self.output_store.put(result.stdout, result.stderr)
+        output_summary = self.output_store.summarize(output_id)
+        stdout_preview = output_summary.pop("stdout_preview")
+        stderr_preview = output_summary.pop("stderr_preview")
+        state_result = {
+            **result_dict,
+            "stdout": stdout_preview,
+            "stderr": stderr_preview,
+            "output": output_summary,
         }
-        
+
         # Update comprehensive state with results using StateManager
-        error_message = result.error_message or result.stderr or 'Execution failed' if not result.success else ""
-        self.app.state_manager.complete_mesh_code_execution(result.success, result_dict, error_message)
-        
+        error_message = (
+            (result.error_message or stderr_preview or "Execution failed")
+            if not result.success
+            else ""
+        )
+        self.app.state_manager.complete_mesh_code_execution(
+            result.success, state_result, error_message
+        )
+
         if result.success:
-            print(f">>> MESH_CONTROLLER: Mesh code executed successfully in {result.execution_time:.2f}s")
-            
-            # Check for generated mesh files and auto-load them (with small delay)
-            import time
-            time.sleep(0.5)  # Give time for file system to sync
-            self._handle_post_execution_mesh_loading()
-            
-            # If the code might have modified mesh data, trigger a view update
-            if any(keyword in code.lower() for keyword in ['mesh', 'vtk', 'generate', 'load', 'update']):
-                print(">>> MESH_CONTROLLER: Code contains mesh keywords, triggering view update")
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
+            logger.info(
+                "Mesh code executed successfully in %.2fs", result.execution_time
+            )
+
+            # Load the artifacts the script declared via publish_mesh/publish_file
+            scene_token = self.app.vtk_pipeline.get_scene_token()
+            self._handle_post_execution_mesh_loading(result.artifacts)
+
+            # The script runs out of process, only loading its artifacts can change the scene
+            if self.app.vtk_pipeline.scene_changed_since(scene_token):
+                logger.debug("Pipeline changed, triggering view update")
+                self.app.render_scheduler.request_update()
         else:
-            print(f">>> MESH_CONTROLLER: Mesh code execution failed: {result.error_message}")
-        
+            logger.warning("Mesh code execution failed: %s", result.error_message)
+
+        # Only the latest successful run's output directory is kept for manual reloads
+        if result.output_dir and result.success:
+            self.code_service.cleanup_output_dir(self._last_output_dir)
+            self._last_output_dir = result.output_dir
+        elif result.output_dir:
+            self.code_service.cleanup_output_dir(result.output_dir)
+
         return result_dict
 
+    def fetch_mesh_code_output(
+        self,
+        output_id: str,
+        stream: str = "stdout",
+        offset: int = 0,
+        length: int = DEFAULT_PAGE_CHARS,
+    ):
+        """
+        Read a page of execution output by the handle in mesh_code_result["output"]
+
+        Returns:
+            Dictionary with the page data and next_offset, or an error if the
+            output is unknown or has been evicted
+        """
+        try:
+            page = self.output_store.read(output_id, stream, int(offset), int(length))
+        except ValueError as e:
+            return {"error": str(e)}
+        if page is None:
+            return {"error": f"Output {output_id} is no longer available"}
+        return page
+
+    def _update_scheduler_metrics(self):
+        """Publish execution queue metrics to state"""
+        self.app.state_manager.set(
+            "mesh_code_scheduler_metrics", self.scheduler.get_metrics()
+        )
+
+    def restart_mesh_kernel(self):
+        """Discard persistent kernel state and start a fresh kernel"""
+        logger.info("Restarting persistent mesh kernel")
+        self.code_service.restart_kernel()
+        self._update_kernel_status()
+
+    def _update_kernel_status(self):
+        """Publish persistent kernel status to state"""
+        self.app.state_manager.set(
+            "mesh_kernel_status", self.code_service.get_kernel_status()
+        )
+
     def get_mesh_code_execution_state(self):
         """
         Get the current mesh code execution state
-        
+
         Returns:
             Dictionary containing current execution state
         """
@@ -174,7 +360,7 @@ class MeshController:
     def clear_mesh_code_state(self):
         """Clear all mesh code execution state"""
         self.app.state_manager.clear_mesh_code_execution()
-        print(">>> MESH_CONTROLLER: Cleared mesh code execution state")
+        logger.debug("Cleared mesh code execution state")
 
     def is_mesh_code_running(self):
         """Check if mesh code is currently executing"""
@@ -183,180 +369,103 @@ class MeshController:
     def get_mesh_code_error_message(self):
         """Get the current error message if any"""
         return self.app.state_manager.get("mesh_code_error_message", "")
-    
-    def _handle_post_execution_mesh_loading(self):
-        """Check for generated mesh files and auto-load them into VTK pipeline"""
-        from khorium.app.core.constants import CURRENT_DIRECTORY
-        import glob
-        import time
-        
-        print(f">>> MESH_CONTROLLER: Checking for generated mesh files in: {CURRENT_DIRECTORY}")
-        
-        # List all files in the directory first for debugging
+
+    @traced("mesh_controller._handle_post_execution_mesh_loading")
+    def _handle_post_execution_mesh_loading(
+        self, artifacts: Optional[list[dict[str, str]]] = None
+    ):
+        """Load the mesh artifacts declared by the last code execution into the VTK pipeline"""
+        if artifacts is None:
+            artifacts = self._last_artifacts
+        self._last_artifacts = artifacts
+
+        if not artifacts:
+            logger.debug("No mesh artifacts declared to auto-load")
+            return False
+
+        # The pipeline shows a single generated mesh, so the last declared artifact wins
+        artifact = artifacts[-1]
+        if len(artifacts) > 1:
+            logger.info(
+                "%d artifacts declared, loading the last one: %s",
+                len(artifacts),
+                artifact["name"],
+            )
+
+        path = artifact["path"]
+        logger.debug(
+            "Loading %s artifact '%s' from %s", artifact["kind"], artifact["name"], path
+        )
+
         try:
-            all_files = os.listdir(CURRENT_DIRECTORY)
-            print(f">>> MESH_CONTROLLER: All files in directory: {all_files}")
-        except Exception as e:
-            print(f">>> MESH_CONTROLLER: Error listing directory: {e}")
-            return
-        
-        # Common mesh file patterns that might be generated
-        mesh_patterns = [
-            "*.vtk",
-            "generated_mesh.msh",
-            "generated_mesh.vtk", 
-            "*.vtu",
-            "output.msh",
-            "mesh.vtk",
-            "cube_mesh.msh",
-            "cylinder_mesh.msh",
-            "sphere_mesh.msh",
-            "rectangle_mesh.msh",
-            "circle_mesh.msh",
-            "stl_mesh.msh",
-            "stl_mesh.vtk"
-        ]
-        
-        generated_files = []
-        
-        # Search for generated mesh files
-        for pattern in mesh_patterns:
-            if '*' in pattern:
-                # Use glob for wildcard patterns
-                file_pattern = os.path.join(CURRENT_DIRECTORY, pattern)
-                matches = glob.glob(file_pattern)
-                generated_files.extend(matches)
-                if matches:
-                    print(f">>> MESH_CONTROLLER: Found files matching {pattern}: {matches}")
+            # Use VTK pipeline to load the generated mesh
+            if artifact["kind"] == "mesh":
+                loaded = self.app.vtk_pipeline.load_generated_mesh_data(
+                    load_npz_mesh(path)
+                )
+            elif path.endswith((".vtk", ".vtu")):
+                loaded = self.app.vtk_pipeline.load_file(path, is_generated_mesh=True)
+            elif path.endswith(".msh"):
+                # Convert MSH straight to an in-memory grid for visualization
+                grid = self._convert_msh_to_grid(path)
+                loaded = (
+                    grid is not None
+                    and self.app.vtk_pipeline.load_generated_mesh_data(grid)
+                )
+            elif path.endswith(".stl"):
+                loaded = self.app.vtk_pipeline.load_file(path)
             else:
-                # Check specific file
-                file_path = os.path.join(CURRENT_DIRECTORY, pattern)
-                if os.path.exists(file_path):
-                    generated_files.append(file_path)
-                    print(f">>> MESH_CONTROLLER: Found specific file: {file_path}")
-        
-        if generated_files:
-            print(f">>> MESH_CONTROLLER: Found {len(generated_files)} generated mesh files: {generated_files}")
-            
-            # Load the most recently modified file
-            latest_file = max(generated_files, key=os.path.getmtime)
-            file_age = time.time() - os.path.getmtime(latest_file)
-            print(f">>> MESH_CONTROLLER: Loading latest generated mesh: {os.path.basename(latest_file)} (age: {file_age:.1f}s)")
-            
-            try:
-                # Use VTK pipeline to load the generated mesh
-                if hasattr(self.app, 'vtk_pipeline') and self.app.vtk_pipeline:
-                    if latest_file.endswith('.vtk') or latest_file.endswith('.vtu'):
-                        # Load VTK/VTU files as generated mesh
-                        print(f">>> MESH_CONTROLLER: Loading VTK/VTU file as generated mesh: {latest_file}")
-                        self.app.vtk_pipeline.load_file(latest_file, is_generated_mesh=True)
-                        
-                        # Enable mesh visibility
-                        self.app.state_manager.show_mesh(True)
-                        print(f">>> MESH_CONTROLLER: Successfully loaded VTK file and enabled visibility: {latest_file}")
-                        
-                    elif latest_file.endswith('.msh'):
-                        # Convert MSH to VTK for visualization
-                        print(f">>> MESH_CONTROLLER: Converting MSH file: {latest_file}")
-                        converted_vtk = self._convert_msh_to_vtk(latest_file)
-                        if converted_vtk:
-                            print(f">>> MESH_CONTROLLER: Loading converted VTK file as generated mesh: {converted_vtk}")
-                            self.app.vtk_pipeline.load_file(converted_vtk, is_generated_mesh=True)
-                            # Enable mesh visibility
-                            self.app.state_manager.show_mesh(True)
-                            print(f">>> MESH_CONTROLLER: Successfully loaded converted MSH file and enabled visibility: {latest_file}")
-                        else:
-                            print(f">>> MESH_CONTROLLER: Failed to convert MSH file: {latest_file}")
-                
-            except Exception as e:
-                print(f">>> MESH_CONTROLLER: Error loading generated mesh: {e}")
-                import traceback
-                traceback.print_exc()
-        else:
-            print(">>> MESH_CONTROLLER: No generated mesh files found to auto-load")
-    
-    def _convert_msh_to_vtk(self, msh_file_path: str) -> Optional[str]:
-        """Convert Gmsh MSH file to VTK format for visualization"""
+                logger.warning("Unsupported artifact file type: %s", path)
+                return False
+        except Exception as e:
+            logger.exception("Error loading generated mesh: %s", e)
+            return False
+
+        if not loaded:
+            logger.error("Failed to load artifact: %s", path)
+            return False
+
+        # Enable mesh visibility for generated meshes
+        if not path.endswith(".stl"):
+            self.app.state_manager.show_mesh(True)
+        logger.info("Loaded artifact '%s'", artifact["name"])
+        return True
+
+    @traced("mesh_controller._convert_msh_to_grid")
+    def _convert_msh_to_grid(self, msh_file_path: str):
+        """Convert Gmsh MSH file to an in-memory vtkUnstructuredGrid, reusing cached conversions"""
         try:
-            print(f">>> MESH_CONTROLLER: Attempting to convert MSH file: {msh_file_path}")
-            
             # Check if file exists and has content
             if not os.path.exists(msh_file_path):
-                print(f">>> MESH_CONTROLLER: MSH file does not exist: {msh_file_path}")
+                logger.error("MSH file does not exist: %s", msh_file_path)
                 return None
-            
+
             file_size = os.path.getsize(msh_file_path)
-            print(f">>> MESH_CONTROLLER: MSH file size: {file_size} bytes")
-            
             if file_size == 0:
-                print(f">>> MESH_CONTROLLER: MSH file is empty: {msh_file_path}")
+                logger.error("MSH file is empty: %s", msh_file_path)
                 return None
-            
-            try:
-                import meshio
-                print(">>> MESH_CONTROLLER: meshio imported successfully")
-                
-                # Read MSH file
-                print(f">>> MESH_CONTROLLER: Reading MSH file...")
-                mesh = meshio.read(msh_file_path)
-                print(f">>> MESH_CONTROLLER: MSH file read successfully, cells: {len(mesh.cells) if mesh.cells else 0}, points: {len(mesh.points) if mesh.points is not None else 0}")
-                
-                # Generate VTK file path
-                vtk_path = msh_file_path.replace('.msh', '_converted.vtk')
-                
-                # Write as VTK
-                print(f">>> MESH_CONTROLLER: Writing VTK file: {vtk_path}")
-                meshio.write(vtk_path, mesh)
-                
-                # Verify VTK file was created
-                if os.path.exists(vtk_path) and os.path.getsize(vtk_path) > 0:
-                    print(f">>> MESH_CONTROLLER: Successfully converted {msh_file_path} to {vtk_path}")
-                    return vtk_path
-                else:
-                    print(f">>> MESH_CONTROLLER: VTK file was not created or is empty: {vtk_path}")
-                    return None
-                    
-            except ImportError as ie:
-                print(f">>> MESH_CONTROLLER: meshio not available for MSH conversion: {ie}")
-                # Try alternative approach using gmsh itself
-                return self._convert_msh_to_vtk_with_gmsh(msh_file_path)
-                
-        except Exception as e:
-            print(f">>> MESH_CONTROLLER: Error converting MSH to VTK: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-    
-    def _convert_msh_to_vtk_with_gmsh(self, msh_file_path: str) -> Optional[str]:
-        """Convert MSH to VTK using gmsh itself"""
-        try:
-            import gmsh
-            print(">>> MESH_CONTROLLER: Attempting MSH to VTK conversion using gmsh")
-            
-            gmsh.initialize()
-            gmsh.open(msh_file_path)
-            
-            # Generate VTK file path
-            vtk_path = msh_file_path.replace('.msh', '_converted.vtk')
-            
-            # Write as VTK
-            gmsh.write(vtk_path)
-            gmsh.finalize()
-            
-            # Verify VTK file was created
-            if os.path.exists(vtk_path) and os.path.getsize(vtk_path) > 0:
-                print(f">>> MESH_CONTROLLER: Successfully converted {msh_file_path} to {vtk_path} using gmsh")
-                return vtk_path
-            else:
-                print(f">>> MESH_CONTROLLER: Gmsh VTK file was not created or is empty: {vtk_path}")
-                return None
-                
+
+            start_time = time.time()
+            with MSH_CONVERSION_SECONDS.time(status="failed") as labels:
+                grid = self.msh_conversion_cache.get_or_convert(msh_file_path)
+                labels["status"] = "completed"
+            logger.info(
+                "Converted %s (%d bytes) to %d points, %d cells in %.3fs",
+                msh_file_path,
+                file_size,
+                grid.GetNumberOfPoints(),
+                grid.GetNumberOfCells(),
+                time.time() - start_time,
+            )
+            return grid
+
         except Exception as e:
-            print(f">>> MESH_CONTROLLER: Error converting MSH to VTK with gmsh: {e}")
+            logger.exception("Error converting MSH to VTK: %s", e)
             return None
 
     @controller.set("set_mesh_size_factor")
     def set_mesh_size_factor(self, factor: float):
-        """Update mesh size factor in state"""
+        """Update mesh size factor in state and in the mesh service"""
         self.app.state_manager.set_mesh_size_factor(factor)
-        print(f">>> MESH_CONTROLLER: Mesh size factor updated to {factor}")
\ No newline at end of file
+        self.mesh_service.set_mesh_size_factor(factor)
+        logger.info("Mesh size factor updated to %s", factor)
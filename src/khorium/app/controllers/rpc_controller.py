@@ -0,0 +1,236 @@
+import inspect
+import time
+from typing import Any, Callable, Optional
+
+from khorium.app.services.mesh_stream import MeshStreamService
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+
+class RpcController:
+    """
+    Batched RPC API for the frontend embedding Khorium through iframe.Communicator
+
+    The parent app calls the `khorium_rpc` trigger with a list of commands,
+    `[{"command": "set_mesh_size_factor", "args": {"factor": 0.5}}, ...]`.
+    Commands run in order, each sending its state changes when it returns, and
+    the view is pushed once after the last one. Mesh code runs through the
+    execution scheduler, so the batch waits for its turn without blocking the
+    event loop. Execution stops at the first failing command unless
+    `continue_on_error` is set. The response holds one entry per command that ran:
+    `{"ok": bool, "duration": float, "results": [{"command", "ok", "result" | "error", "duration"}]}`.
+
+    Commands:
+        upload_file(files)                  Load uploaded files, as sent by a file input
+        set_mesh_size_factor(factor)        Mesh size factor for the next generation
+        generate_mesh()                     Generate a mesh of the current model with gmsh
+        execute_mesh_code(code, timeout=None, bypass_cache=False, persistent=False)
+        set_mesh_visible(visible)           Show or hide the generated mesh
+        set_contour_value(value)            Move the contour isovalue
+        reset_camera()                      Reset the camera with the final push
+        get_state(keys)                     Read state values
+
+    The generated mesh is streamed as binary typed-array chunks through
+    `khorium_mesh_stream_open(options)`, `khorium_mesh_stream_next(stream_id,
+    max_chunks, from_seq)` and `khorium_mesh_stream_close(stream_id)`, see
+    MeshStreamService for the encodings.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.mesh_streams = MeshStreamService()
+        self.commands: dict[str, Callable[..., Any]] = {
+            "upload_file": self._upload_file,
+            "set_mesh_size_factor": self._set_mesh_size_factor,
+            "generate_mesh": self._generate_mesh,
+            "execute_mesh_code": self._execute_mesh_code,
+            "set_mesh_visible": self._set_mesh_visible,
+            "set_contour_value": self._set_contour_value,
+            "reset_camera": self._reset_camera,
+            "get_state": self._get_state,
+        }
+        self._register_controllers()
+
+    def _register_controllers(self):
+        """Register RPC entry points"""
+        self.app.ctrl.khorium_rpc = self.run_batch
+        self.app.server.trigger("khorium_rpc")(self.run_batch)
+        self.app.server.trigger("khorium_mesh_stream_open")(self.open_mesh_stream)
+        self.app.server.trigger("khorium_mesh_stream_next")(self.next_mesh_chunks)
+        self.app.server.trigger("khorium_mesh_stream_close")(self.mesh_streams.close)
+
+    @traced("rpc_controller.run_batch")
+    async def run_batch(
+        self, commands: list[dict[str, Any]], continue_on_error: bool = False
+    ) -> dict[str, Any]:
+        """Run commands in order with a single view update at the end"""
+        started = time.perf_counter()
+        results = []
+        # The view is pushed once after the change handlers of every command
+        # have run. State is not held across awaits, see _run_command.
+        with self.app.render_scheduler.hold():
+            for entry in commands or []:
+                result = await self._run_command(entry)
+                results.append(result)
+                if not result["ok"] and not continue_on_error:
+                    break
+
+        ok = all(result["ok"] for result in results)
+        duration = time.perf_counter() - started
+        logger.info(
+            "RPC batch of %d commands %s in %.3fs",
+            len(results),
+            "completed" if ok else "failed",
+            duration,
+        )
+        return {"ok": ok, "duration": duration, "results": results}
+
+    @traced("rpc_controller.open_mesh_stream")
+    def open_mesh_stream(
+        self, options: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        """Snapshot the generated mesh for streaming, returns the stream header or an error"""
+        dataset = self.app.vtk_pipeline.get_generated_mesh_data()
+        if dataset is None:
+            return {"ok": False, "error": "No generated mesh"}
+        try:
+            header = self.mesh_streams.open(dataset, **(options or {}))
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        logger.info(
+            "Opened mesh stream %s: %d points, %d cells, %d bytes in %d chunks",
+            header["stream_id"],
+            header["points"],
+            header["cells"],
+            header["total_bytes"],
+            header["total_chunks"],
+        )
+        return {"ok": True, **header}
+
+    def next_mesh_chunks(
+        self, stream_id: str, max_chunks: int = 1, from_seq: Optional[int] = None
+    ) -> dict[str, Any]:
+        """Next chunks of a mesh stream, at most max_chunks, the client asks again when it has room"""
+        try:
+            return {
+                "ok": True,
+                **self.mesh_streams.next(stream_id, max_chunks, from_seq),
+            }
+        except KeyError as e:
+            return {"ok": False, "error": str(e.args[0])}
+
+    async def _run_command(self, entry: dict[str, Any]) -> dict[str, Any]:
+        name = entry.get("command", "") if isinstance(entry, dict) else ""
+        handler = self.commands.get(name)
+        if handler is None:
+            return {
+                "command": name,
+                "ok": False,
+                "error": f"Unknown command: {name!r}",
+                "duration": 0.0,
+            }
+
+        started = time.perf_counter()
+        try:
+            # State changes of a command are sent together. Async commands only
+            # start here and update state in their own blocks, so state changes
+            # made by other tasks are not held back while they wait.
+            with self.app.state:
+                result = handler(**(entry.get("args") or {}))
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            logger.exception("RPC command %s failed", name)
+            return {
+                "command": name,
+                "ok": False,
+                "error": str(e),
+                "duration": time.perf_counter() - started,
+            }
+        return {
+            "command": name,
+            "ok": True,
+            "result": result,
+            "duration": time.perf_counter() - started,
+        }
+
+    async def _upload_file(self, files):
+        file_controller = self.app.file_controller
+        if files and len(files) > 1:
+            # upload_file only starts multi-file ingestion, wait for it here
+            statuses = await file_controller.upload_files_async(files)
+            loaded = [
+                status["filename"]
+                for status in statuses
+                if status["status"] == "loaded"
+            ]
+            if not loaded:
+                errors = [status["error"] for status in statuses if status.get("error")]
+                raise RuntimeError(
+                    "; ".join(errors)
+                    or file_controller.file_service.last_error
+                    or "Upload failed"
+                )
+            return {"files": loaded, "failed": len(statuses) - len(loaded)}
+
+        # Re-uploading the displayed file succeeds without changing the scene
+        target_file_path = file_controller.upload_file(files)
+        if not target_file_path:
+            raise RuntimeError(
+                file_controller.file_service.last_error or "Upload failed"
+            )
+        return {"file": target_file_path}
+
+    def _set_mesh_size_factor(self, factor: float):
+        self.app.mesh_controller.set_mesh_size_factor(float(factor))
+        return {"factor": float(factor)}
+
+    def _generate_mesh(self):
+        scene_token = self.app.vtk_pipeline.get_scene_token()
+        self.app.mesh_controller.generate_mesh_gmsh()
+        if not self.app.vtk_pipeline.scene_changed_since(scene_token):
+            msg = "Mesh generation failed"
+            raise RuntimeError(msg)
+        return {"has_generated_mesh": self.app.vtk_pipeline.has_generated_mesh}
+
+    async def _execute_mesh_code(
+        self,
+        code: str,
+        timeout=None,
+        bypass_cache: bool = False,
+        persistent: bool = False,
+    ):
+        # Same admission control as state-driven runs: concurrency limits, per-session quotas, queue positions
+        result = await self.app.mesh_controller.execute_mesh_code_async(
+            code, timeout, bypass_cache, persistent
+        )
+        if result is None:
+            raise RuntimeError(
+                self.app.state_manager.get("mesh_code_error_message")
+                or "Mesh code was rejected"
+            )
+        if not result.get("success"):
+            raise RuntimeError(
+                result.get("error_message") or "Mesh code execution failed"
+            )
+        return {
+            key: value
+            for key, value in result.items()
+            if key not in ("stdout", "stderr")
+        }
+
+    def _set_mesh_visible(self, visible: bool):
+        self.app.state_manager.show_mesh(bool(visible))
+        return {"visible": bool(visible)}
+
+    def _set_contour_value(self, value: float):
+        self.app.state_manager.set("contour_value", float(value))
+        return {"value": float(value)}
+
+    def _reset_camera(self):
+        self.app.render_scheduler.request_reset_camera()
+
+    def _get_state(self, keys: list[str]):
+        return {key: self.app.state_manager.get(key) for key in keys}
@@ -1,81 +1,106 @@
 from trame.decorators import change
 
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
 
 class ViewController:
     """Controller for VTK view state management"""
-    
+
     def __init__(self, app):
         self.app = app
         self._register_state_handlers()
-    
+
     def _register_state_handlers(self):
         """Register state change handlers"""
         # Register new state manager handlers
-        self.app.state.change("mesh_visible")(self.on_mesh_visible_change)
-        
+        self.app.state_manager.on_change("mesh_visible", self.on_mesh_visible_change)
+        # The contour slider had no server handler, so moving it (or the RPC
+        # set_contour_value command) never reached the filter. Throttled, the
+        # filter re-executes on every value it receives
+        self.app.state_manager.on_change("contour_value", self.on_contour_value_change)
+
         # Register mesh code execution state handlers
-        self.app.state.change("mesh_code_status")(self.on_mesh_code_status_change)
-        self.app.state.change("mesh_code_error_message")(self.on_mesh_code_error_change)
-    
+        self.app.state_manager.on_change(
+            "mesh_code_status", self.on_mesh_code_status_change
+        )
+        self.app.state_manager.on_change(
+            "mesh_code_error_message", self.on_mesh_code_error_change
+        )
+
     @change("mesh_visible")
     def on_mesh_visible_change(self, mesh_visible, **kwargs):
         """Handle mesh visibility state changes via StateManager"""
-        print(f">>> VIEW_CONTROLLER: [DEBUG] mesh_visible state changed to: {mesh_visible}")
+        logger.debug("mesh_visible state changed to: %s", mesh_visible)
         self._update_mesh_display()
-    
+
     def _update_mesh_display(self):
         """Update VTK pipeline with current mesh state"""
         # Get current mesh state
         mesh_visible = self.app.state_manager.get("mesh_visible", False)
-        
-        print(f">>> VIEW_CONTROLLER: [DEBUG] Has generated mesh: {self.app.vtk_pipeline.has_generated_mesh}")
-        print(f">>> VIEW_CONTROLLER: [DEBUG] Has default mesh: {self.app.vtk_pipeline.has_default_mesh}")
-        
+
+        logger.debug(
+            "Has generated mesh: %s, has default mesh: %s",
+            self.app.vtk_pipeline.has_generated_mesh,
+            self.app.vtk_pipeline.has_default_mesh,
+        )
+
         # Update VTK pipeline
         self.app.vtk_pipeline.set_mesh_visibility(mesh_visible)
-        
+
         # Apply mesh properties if visible
         if mesh_visible:
             # TODO: Add methods to VtkPipeline for opacity, wireframe, etc.
             pass
-        
+
         # Update the view
-        if hasattr(self.app.ctrl, "view_update"):
-            self.app.ctrl.view_update()
-            print(f">>> VIEW_CONTROLLER: [DEBUG] View updated after mesh changes")
-        else:
-            print(f">>> VIEW_CONTROLLER: [DEBUG] Warning: view_update not available")
-    
+        self.app.render_scheduler.request_update()
+        logger.debug("View update requested after mesh changes")
+
+    def on_contour_value_change(self, contour_value=None, **kwargs):
+        """Move the contour isovalue to the slider value"""
+        if contour_value is None:
+            return
+        value = float(contour_value)
+        # An isovalue outside the range of the contoured array yields an empty contour
+        array_ranges = self.app.file_controller.get_preprocessed("array_ranges")
+        if array_ranges:
+            low, high = array_ranges[0]["range"]
+            value = min(max(value, low), high)
+        self.app.vtk_pipeline.set_contour_value(value)
+        self.app.render_scheduler.request_update()
+
     @change("mesh_code_status")
     def on_mesh_code_status_change(self, mesh_code_status, **kwargs):
         """Handle mesh code execution status changes"""
-        print(f">>> VIEW_CONTROLLER: [DEBUG] mesh_code_status changed to: {mesh_code_status}")
-        
+        logger.debug("mesh_code_status changed to: %s", mesh_code_status)
+
         # Get current execution state
         current_code = self.app.state_manager.get("mesh_code_current", "")
         error_message = self.app.state_manager.get("mesh_code_error_message", "")
         execution_time = self.app.state_manager.get("mesh_code_execution_duration", 0.0)
-        
+
         # Log execution state change
         if mesh_code_status == "running":
-            print(f">>> VIEW_CONTROLLER: [DEBUG] Started executing code ({len(current_code)} chars)")
+            logger.debug("Started executing code (%d chars)", len(current_code))
         elif mesh_code_status == "completed":
-            print(f">>> VIEW_CONTROLLER: [DEBUG] Code execution completed successfully in {execution_time:.2f}s")
-            # Trigger view update if mesh-related code was executed
-            if any(keyword in current_code.lower() for keyword in ['mesh', 'vtk', 'generate', 'load', 'update']):
-                print(">>> VIEW_CONTROLLER: [DEBUG] Mesh-related code executed, triggering view update")
-                if hasattr(self.app.ctrl, "view_update"):
-                    self.app.ctrl.view_update()
+            # MeshController requests the view update when loading the artifacts changed the scene
+            logger.debug(
+                "Code execution completed successfully in %.2fs", execution_time
+            )
         elif mesh_code_status == "failed":
-            print(f">>> VIEW_CONTROLLER: [DEBUG] Code execution failed: {error_message}")
-    
+            logger.debug("Code execution failed: %s", error_message)
+
     @change("mesh_code_error_message")
     def on_mesh_code_error_change(self, mesh_code_error_message, **kwargs):
         """Handle mesh code execution error message changes"""
         if mesh_code_error_message:
-            print(f">>> VIEW_CONTROLLER: [DEBUG] mesh_code_error_message updated: {mesh_code_error_message}")
+            logger.debug("mesh_code_error_message updated: %s", mesh_code_error_message)
 
     def setup_view_controllers(self, view):
         """Setup view-related controller methods"""
-        self.app.ctrl.view_update = view.update
-        self.app.ctrl.view_reset_camera = view.reset_camera
\ No newline at end of file
+        # Renders go through the scheduler, which merges requests into one push per frame
+        self.app.render_scheduler.attach(view.update, view.reset_camera)
+        self.app.ctrl.view_update = self.app.render_scheduler.request_update
+        self.app.ctrl.view_reset_camera = self.app.render_scheduler.request_reset_camera
@@ -0,0 +1,323 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from vtkmodules.util.numpy_support import (
+    numpy_to_vtk,
+    numpy_to_vtkIdTypeArray,
+    vtk_to_numpy,
+)
+from vtkmodules.vtkCommonCore import VTK_UNSIGNED_CHAR, vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray, vtkDataSet, vtkUnstructuredGrid
+from vtkmodules.vtkIOGeometry import vtkSTLReader
+from vtkmodules.vtkIOLegacy import vtkUnstructuredGridReader
+from vtkmodules.vtkIOXML import vtkXMLUnstructuredGridReader
+
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Map meshio/gmsh cell type names to VTK cell type ids
+VTK_CELL_TYPES = {
+    "vertex": 1,
+    "line": 3,
+    "triangle": 5,
+    "polygon": 7,
+    "quad": 9,
+    "tetra": 10,
+    "hexahedron": 12,
+    "wedge": 13,
+    "pyramid": 14,
+    "line3": 21,
+    "triangle6": 22,
+    "quad8": 23,
+    "tetra10": 24,
+    "hexahedron20": 25,
+}
+
+# Map linear gmsh element type ids to cell type names
+GMSH_ELEMENT_TYPES = {
+    1: "line",
+    2: "triangle",
+    3: "quad",
+    4: "tetra",
+    5: "hexahedron",
+    6: "wedge",
+    7: "pyramid",
+    15: "vertex",
+}
+
+
+def build_unstructured_grid(points, cells) -> vtkUnstructuredGrid:
+    """
+    Build a vtkUnstructuredGrid directly from point and cell arrays
+
+    Args:
+        points: Array-like of shape (N, 3) or (N, 2) with point coordinates
+        cells: Iterable of (cell_type, connectivity) pairs or a dict mapping
+               cell type names to (M, k) connectivity arrays
+
+    Returns:
+        vtkUnstructuredGrid sharing no memory with the input arrays
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] not in (2, 3):
+        msg = f"Points must have shape (N, 2) or (N, 3), got {points.shape}"
+        raise ValueError(msg)
+    if points.shape[1] == 2:
+        points = np.hstack([points, np.zeros((len(points), 1))])
+
+    blocks = cells.items() if isinstance(cells, dict) else cells
+
+    connectivity_blocks = []
+    size_blocks = []
+    type_blocks = []
+    for cell_type, connectivity in blocks:
+        vtk_type = VTK_CELL_TYPES.get(cell_type)
+        if vtk_type is None:
+            # Skip cell types VTK cannot represent instead of failing the whole mesh
+            continue
+        connectivity = np.asarray(connectivity, dtype=np.int64)
+        if connectivity.size == 0:
+            continue
+        if connectivity.ndim == 1:
+            connectivity = connectivity.reshape(-1, 1)
+        count, nodes_per_cell = connectivity.shape
+        connectivity_blocks.append(connectivity.ravel())
+        size_blocks.append(np.full(count, nodes_per_cell, dtype=np.int64))
+        type_blocks.append(np.full(count, vtk_type, dtype=np.uint8))
+
+    grid = vtkUnstructuredGrid()
+
+    vtk_points = vtkPoints()
+    vtk_points.SetData(numpy_to_vtk(points, deep=True))
+    grid.SetPoints(vtk_points)
+
+    if not connectivity_blocks:
+        return grid
+
+    connectivity = np.concatenate(connectivity_blocks)
+    offsets = np.zeros(sum(len(s) for s in size_blocks) + 1, dtype=np.int64)
+    np.cumsum(np.concatenate(size_blocks), out=offsets[1:])
+    cell_types = np.concatenate(type_blocks)
+
+    cell_array = vtkCellArray()
+    cell_array.SetData(
+        numpy_to_vtkIdTypeArray(offsets, deep=True),
+        numpy_to_vtkIdTypeArray(connectivity, deep=True),
+    )
+    grid.SetCells(
+        numpy_to_vtk(cell_types, deep=True, array_type=VTK_UNSIGNED_CHAR),
+        cell_array,
+    )
+    return grid
+
+
+def extract_mesh_arrays(dataset: vtkDataSet) -> dict[str, np.ndarray]:
+    """
+    Get the points and cells of a dataset as flat arrays
+
+    Returns:
+        Dict with points (N, 3) float64, connectivity and offsets (M + 1
+        entries, VTK layout) int64, and cell_types uint8 arrays
+    """
+    if not isinstance(dataset, vtkUnstructuredGrid):
+        from vtkmodules.vtkFiltersCore import vtkAppendFilter
+
+        append = vtkAppendFilter()
+        append.AddInputData(dataset)
+        append.Update()
+        dataset = append.GetOutput()
+
+    if dataset.GetNumberOfPoints() == 0:
+        points = np.zeros((0, 3), dtype=np.float64)
+    else:
+        points = (
+            vtk_to_numpy(dataset.GetPoints().GetData())
+            .astype(np.float64, copy=False)
+            .reshape(-1, 3)
+        )
+    cells = dataset.GetCells()
+    if cells is None or dataset.GetNumberOfCells() == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {
+            "points": points,
+            "connectivity": empty,
+            "offsets": np.zeros(1, dtype=np.int64),
+            "cell_types": np.zeros(0, dtype=np.uint8),
+        }
+    return {
+        "points": points,
+        "connectivity": vtk_to_numpy(cells.GetConnectivityArray()).astype(
+            np.int64, copy=False
+        ),
+        "offsets": vtk_to_numpy(cells.GetOffsetsArray()).astype(np.int64, copy=False),
+        "cell_types": vtk_to_numpy(dataset.GetCellTypesArray()).astype(
+            np.uint8, copy=False
+        ),
+    }
+
+
+def read_mesh_file(file_path: str) -> vtkDataSet:
+    """
+    Read an STL, VTU or legacy VTK file into a standalone dataset
+
+    Uses its own reader so several files can be parsed concurrently.
+
+    Raises:
+        ValueError: If the file has an unsupported extension or contains no points
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".stl":
+        reader = vtkSTLReader()
+    elif ext == ".vtu":
+        reader = vtkXMLUnstructuredGridReader()
+    elif ext == ".vtk":
+        reader = vtkUnstructuredGridReader()
+    else:
+        msg = f"Unsupported mesh file type: {ext}"
+        raise ValueError(msg)
+
+    reader.SetFileName(file_path)
+    reader.Update()
+    output = reader.GetOutput()
+    if output is None or output.GetNumberOfPoints() == 0:
+        msg = f"No points read from {os.path.basename(file_path)}"
+        raise ValueError(msg)
+
+    # Detach the dataset from the reader so the reader can be released
+    dataset = output.NewInstance()
+    dataset.ShallowCopy(output)
+    return dataset
+
+
+def load_npz_mesh(npz_path: str) -> vtkUnstructuredGrid:
+    """Load a mesh written by the publish_mesh() helper of the code execution context"""
+    with np.load(npz_path, allow_pickle=False) as data:
+        cell_types = [str(t) for t in data["cell_types"]]
+        cells = [
+            (cell_type, data[f"cells_{i}"]) for i, cell_type in enumerate(cell_types)
+        ]
+        return build_unstructured_grid(data["points"], cells)
+
+
+def read_msh(msh_path: str) -> vtkUnstructuredGrid:
+    """Parse a Gmsh MSH file straight into a vtkUnstructuredGrid without an intermediate file"""
+    try:
+        import meshio
+    except ImportError:
+        return _read_msh_with_gmsh(msh_path)
+
+    mesh = meshio.read(msh_path)
+    return build_unstructured_grid(
+        mesh.points, [(block.type, block.data) for block in mesh.cells]
+    )
+
+
+def _read_msh_with_gmsh(msh_path: str) -> vtkUnstructuredGrid:
+    """Parse an MSH file through the gmsh API when meshio is not installed (linear elements only)"""
+    import gmsh
+
+    gmsh.initialize()
+    try:
+        gmsh.open(msh_path)
+        node_tags, coords, _ = gmsh.model.mesh.getNodes()
+        element_types, _, element_node_tags = gmsh.model.mesh.getElements()
+    finally:
+        gmsh.finalize()
+
+    node_tags = np.asarray(node_tags, dtype=np.int64)
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    # Gmsh connectivity uses node tags, map them to point indices in one pass
+    tag_to_index = np.full(
+        node_tags.max() + 1 if len(node_tags) else 1, -1, dtype=np.int64
+    )
+    tag_to_index[node_tags] = np.arange(len(node_tags))
+
+    cells = []
+    for element_type, nodes in zip(element_types, element_node_tags):
+        cell_type = GMSH_ELEMENT_TYPES.get(int(element_type))
+        if cell_type is None:
+            continue
+        connectivity = tag_to_index[np.asarray(nodes, dtype=np.int64)]
+        cells.append((cell_type, connectivity.reshape(-1, _nodes_per_cell(cell_type))))
+    return build_unstructured_grid(points, cells)
+
+
+def _nodes_per_cell(cell_type: str) -> int:
+    return {
+        "vertex": 1,
+        "line": 2,
+        "triangle": 3,
+        "quad": 4,
+        "tetra": 4,
+        "pyramid": 5,
+        "wedge": 6,
+        "hexahedron": 8,
+    }[cell_type]
+
+
+class MeshConversionCache:
+    """
+    Cache of converted meshes keyed by file size, mtime and content hash
+
+    Unchanged files are recognized from (size, mtime) alone; a rewritten file
+    with identical content is recognized from its hash, so only genuinely new
+    meshes are parsed.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._grids: OrderedDict[str, vtkUnstructuredGrid] = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _content_hash(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _lookup(self, path: str) -> tuple[Optional[vtkUnstructuredGrid], str]:
+        """Return (cached grid or None, content hash) for a path"""
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        known = self._stats.get(path)
+        if known and known[0] == signature:
+            content_hash = known[1]
+        else:
+            content_hash = self._content_hash(path)
+            self._stats[path] = (signature, content_hash)
+
+        grid = self._grids.get(content_hash)
+        if grid is not None:
+            self._grids.move_to_end(content_hash)
+        return grid, content_hash
+
+    def get_or_convert(self, path: str, convert=read_msh) -> vtkUnstructuredGrid:
+        """Return the converted grid for a file, converting it only on a cache miss"""
+        path = os.path.abspath(path)
+        with self._lock:
+            grid, content_hash = self._lookup(path)
+            if grid is not None:
+                logger.debug("Conversion cache hit for %s", os.path.basename(path))
+                return grid
+
+        grid = convert(path)
+
+        with self._lock:
+            self._grids[content_hash] = grid
+            self._grids.move_to_end(content_hash)
+            while len(self._grids) > self.max_entries:
+                self._grids.popitem(last=False)
+            # Forget the paths of evicted or unconverted content, so the
+            # signatures stay bounded by the cached grids
+            self._stats = {
+                p: known for p, known in self._stats.items() if known[1] in self._grids
+            }
+        return grid
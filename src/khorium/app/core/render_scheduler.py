@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import time
+from typing import Callable, Optional
+
+from khorium.app.core.metrics import VIEW_PUSH_SECONDS, VIEW_UPDATE_REQUESTS
+from khorium.app.utils.tracing import get_tracer
+
+# Minimum time between two pushes of the scene to the client
+RENDER_FRAME_INTERVAL = 1.0 / 60.0
+
+
+class RenderScheduler:
+    """
+    Coalesces view updates into at most one push per frame
+
+    Callers request an update instead of forcing one. Requests made during the
+    same event loop tick, or within one frame of the last push, are merged into
+    a single view update, with any camera reset requested in between applied
+    in the same pass.
+    """
+
+    def __init__(self, frame_interval: float = RENDER_FRAME_INTERVAL):
+        self.frame_interval = frame_interval
+        self._update: Optional[Callable[[], None]] = None
+        self._reset_camera: Optional[Callable[[], None]] = None
+        self._dirty = False
+        self._reset_pending = False
+        self._scheduled = False
+        self._holds = 0
+        self._last_render = 0.0
+        self._trace_context = (
+            None  # Span of the first request merged into the pending push
+        )
+        self.requested_count = 0
+        self.render_count = 0
+
+    def attach(self, update: Callable[[], None], reset_camera: Callable[[], None]):
+        """Set the view functions that push the scene and the camera to the client"""
+        self._update = update
+        self._reset_camera = reset_camera
+
+    def request_update(self, reset_camera: bool = False):
+        """Mark the view dirty, optionally resetting the camera in the same update"""
+        self.requested_count += 1
+        VIEW_UPDATE_REQUESTS.inc()
+        if not self._dirty:
+            self._trace_context = get_tracer().current_context()
+        self._dirty = True
+        self._reset_pending = self._reset_pending or reset_camera
+        self._schedule()
+
+    def request_reset_camera(self):
+        """Reset the camera with the next view update"""
+        self.request_update(reset_camera=True)
+
+    @contextlib.contextmanager
+    def hold(self):
+        """Defer pushes until the block exits, then push everything requested in it at once"""
+        self._holds += 1
+        try:
+            yield
+        finally:
+            self._holds -= 1
+            if not self._holds and self._dirty:
+                self._schedule()
+
+    def _schedule(self):
+        if self._scheduled or self._holds:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to defer to, push right away
+            self.flush()
+            return
+
+        self._scheduled = True
+        wait = self.frame_interval - (time.monotonic() - self._last_render)
+        if wait > 0:
+            loop.call_later(wait, self.flush)
+        else:
+            loop.call_soon(self.flush)
+
+    def flush(self):
+        """Push pending changes now"""
+        self._scheduled = False
+        if not self._dirty or self._update is None:
+            return
+        reset_camera = self._reset_pending
+        trace_context = self._trace_context
+        self._trace_context = None
+        self._dirty = False
+        self._reset_pending = False
+        self._last_render = time.monotonic()
+        self.render_count += 1
+
+        with VIEW_PUSH_SECONDS.time(reset_camera=str(reset_camera).lower()):
+            if trace_context is None:
+                self._push(reset_camera)
+                return
+            # Pushes happen after the requesting action returned, record them in its trace
+            tracer = get_tracer()
+            with (
+                tracer.activate(trace_context),
+                tracer.span("render_scheduler.push", reset_camera=reset_camera),
+            ):
+                self._push(reset_camera)
+
+    def _push(self, reset_camera: bool):
+        self._update()
+        if reset_camera and self._reset_camera is not None:
+            self._reset_camera()
@@ -1,111 +1,270 @@
-from typing import Dict, Any, Optional, List
+import json
+import time
+from typing import Any, Callable, Optional
+
+from khorium.app.config import (
+    STATE_TRAFFIC_PUBLISH_SECONDS,
+    STATE_TRAFFIC_STATS_ENABLED,
+)
+from khorium.app.core.state_traffic import StateTrafficStats
+from khorium.app.core.update_coalescer import UpdateCoalescer, UpdatePolicy
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Debug key carrying the traffic statistics, itself excluded from them
+STATE_TRAFFIC_KEY = "state_traffic"
 
 
 class StateManager:
     """Centralized state management for Khorium application"""
-    
+
     def __init__(self, trame_state):
         self.state = trame_state
         self._defaults = self._get_default_state()
+        if not STATE_TRAFFIC_STATS_ENABLED:
+            del self._defaults[STATE_TRAFFIC_KEY]  # Nothing would ever publish it
         self._validators = self._get_state_validators()
-        
-    def _get_default_state(self) -> Dict[str, Any]:
+        self._coalescer = UpdateCoalescer(
+            trame_state, self._get_update_policies(), apply=self._apply_updates
+        )
+        self.traffic = (
+            StateTrafficStats(serialize_state_value)
+            if STATE_TRAFFIC_STATS_ENABLED
+            else None
+        )
+        self._traffic_published_at = 0.0
+        self._versions: dict[
+            str, int
+        ] = {}  # Writes of a container that was modified in place
+        self._flushed_versions: dict[str, int] = {}
+
+    def _get_default_state(self) -> dict[str, Any]:
         """Define default state values organized by category"""
         return {
             # Mesh state
             "mesh_visible": False,
             "mesh_size_factor": 1.0,
-            
+            # Upload state
+            "upload_progress": {},  # Progress of the current chunked upload
+            "upload_batch": {},  # Per-file status and timings of the current multi-file upload
+            "preprocessing": {},  # Stage order, status and timings of the background preprocessing job
             # Mesh code execution state
             "execute_mesh_code": "",  # Code to execute via state change
             "mesh_code_current": "",
-            "mesh_code_status": "idle",  # idle, running, completed, failed
+            "mesh_code_status": "idle",  # idle, queued, running, completed, failed
+            "mesh_code_queue_position": 0,  # 1-based position while queued, 0 otherwise
             "mesh_code_error_message": "",
             "mesh_code_execution_start_time": None,
             "mesh_code_execution_end_time": None,
             "mesh_code_execution_duration": 0.0,
             "mesh_code_execution_complete": False,
             "mesh_code_result": {},
+            "mesh_code_bypass_cache": False,  # Force re-execution even if a cached result exists
+            "mesh_code_persistent_kernel": False,  # Keep interpreter state between executions
+            "mesh_kernel_status": {"alive": False, "pid": None, "execution_count": 0},
+            "mesh_code_scheduler_metrics": {},
+            # Debug state
+            STATE_TRAFFIC_KEY: {},  # Per-key update counts, bytes and handler latency, when enabled
         }
-    
-    def _get_state_validators(self) -> Dict[str, callable]:
+
+    def _get_state_validators(self) -> dict[str, callable]:
         """Define validation functions for state variables"""
         return {
             "mesh_size_factor": lambda x: 0.01 <= x <= 100.0,
         }
-    
+
+    def _get_update_policies(self) -> dict[str, UpdatePolicy]:
+        """Define how often handlers of high-frequency keys run while a control is dragged"""
+        return {
+            # Only the value the slider settles on is validated and pushed to the mesh service
+            "set_mesh_size_factor": UpdatePolicy.debounce(0.25),
+            # Keep the contour following the slider without re-executing the filter per event
+            "contour_value": UpdatePolicy.throttle(0.1),
+        }
+
     def initialize_state(self):
         """Initialize state with default values if not already set"""
         for key, default_value in self._defaults.items():
             if not self.state.has(key):
                 setattr(self.state, key, default_value)
-    
-    
+
     def get(self, key: str, default: Any = None) -> Any:
         """Get a state variable with optional default"""
         if self.state.has(key):
             return getattr(self.state, key)
         return default
-    
+
     def set(self, key: str, value: Any):
         """Set a single state variable with validation"""
         if key in self._validators:
             if not self._validators[key](value):
-                raise ValueError(f"Invalid value for {key}: {value}")
-        
+                msg = f"Invalid value for {key}: {value}"
+                raise ValueError(msg)
+
+        self._coalescer.discard([key])
+        self._record_updates({key: value})
+        mutated = self._track_versions({key: value})
         setattr(self.state, key, value)
-    
-    def set_multiple(self, updates: Dict[str, Any]):
+        if mutated:
+            self.flush_state(mutated)
+
+    def set_multiple(self, updates: dict[str, Any]):
         """Set multiple state variables with validation"""
         validated_updates = {}
-        
+
         for key, value in updates.items():
             if key in self._validators:
                 if not self._validators[key](value):
-                    raise ValueError(f"Invalid value for {key}: {value}")
+                    msg = f"Invalid value for {key}: {value}"
+                    raise ValueError(msg)
             validated_updates[key] = value
-        
-        self.state.update(validated_updates)
-    
-    def flush_state(self, keys: Optional[List[str]] = None):
-        """Force synchronization of state changes to client"""
+
+        self._coalescer.discard(validated_updates)
+        self._apply_updates(validated_updates)
+
+    def set_deferred(self, updates: dict[str, Any]):
+        """Validate updates now and apply them with any other deferred updates on the next loop tick"""
+        for key, value in updates.items():
+            if key in self._validators:
+                if not self._validators[key](value):
+                    msg = f"Invalid value for {key}: {value}"
+                    raise ValueError(msg)
+
+        self._coalescer.defer(updates)
+
+    def flush_deferred(self):
+        """Apply deferred updates immediately"""
+        self._coalescer.flush()
+
+    def flush_handlers(self, key: Optional[str] = None):
+        """Run debounced or throttled change handlers still waiting, so their values are applied now"""
+        self._coalescer.run_pending(key)
+
+    def on_change(self, key: str, handler: Callable[..., Any]):
+        """Register a state change handler, coalesced according to the update policy of key"""
+        if self.traffic is None:
+            self.state.change(key)(self._coalescer.wrap(key, handler))
+            return
+
+        traffic = self.traffic
+        handler_name = getattr(handler, "__name__", repr(handler))
+        coalesced = self._coalescer.wrap(key, traffic.instrument(key, handler))
+
+        def counted_handler(**kwargs):
+            traffic.record_event(key, handler_name)
+            coalesced(**kwargs)
+            self._publish_traffic()
+
+        self.state.change(key)(counted_handler)
+
+    def _apply_updates(self, updates: dict[str, Any]):
+        self._record_updates(updates)
+        mutated = self._track_versions(updates)
+        self.state.update(updates)
+        if mutated:
+            self.flush_state(mutated)
+
+    def _track_versions(self, updates: dict[str, Any]) -> list[str]:
+        """Count writes of lists and dicts that are the object already in state"""
+        mutated = []
+        for key, value in updates.items():
+            # trame compares the object with itself and would not send the new content
+            if (
+                isinstance(value, (list, dict))
+                and self.state.has(key)
+                and getattr(self.state, key) is value
+            ):
+                self._versions[key] = self._versions.get(key, 0) + 1
+                mutated.append(key)
+        return mutated
+
+    def _record_updates(self, updates: dict[str, Any]):
+        if self.traffic is None:
+            return
+        for key, value in updates.items():
+            if key != STATE_TRAFFIC_KEY:
+                self.traffic.record_update(key, value)
+        self._publish_traffic()
+
+    def _publish_traffic(self):
+        """Refresh the traffic debug key, at most once per STATE_TRAFFIC_PUBLISH_SECONDS"""
+        now = time.monotonic()
+        if now - self._traffic_published_at < STATE_TRAFFIC_PUBLISH_SECONDS:
+            return
+        self._traffic_published_at = now
+        self._coalescer.defer({STATE_TRAFFIC_KEY: self.traffic.snapshot()})
+
+    def dump_state_traffic(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the per-key traffic statistics to a JSON file, returning its path"""
+        if self.traffic is None:
+            logger.warning("State traffic statistics are disabled")
+            return None
+        path = self.traffic.dump(path)
+        logger.info("State traffic written to %s", path)
+        return path
+
+    def flush_state(self, keys: Optional[list[str]] = None) -> list[str]:
+        """
+        Force synchronization of state changes to client
+
+        Without keys, only the lists and dicts set again after being modified in
+        place since the last flush are sent, the writes trame cannot see.
+
+        Returns:
+            The flushed keys
+        """
+        if keys is None:
+            keys = [
+                key
+                for key, version in self._versions.items()
+                if self._flushed_versions.get(key) != version
+            ]
+
+        for key in keys:
+            self._flushed_versions[key] = self._versions.get(key, 0)
+
+        # trame only pushes keys it saw change, so mark the in-place writes dirty
         if keys:
-            for key in keys:
-                self.state.flush(key)
-        else:
-            # Flush all array/object state variables
-            current_state = self.state.to_dict()
-            for key, value in current_state.items():
-                if isinstance(value, (list, dict)):
-                    self.state.flush(key)
-    
-    
+            self.state.dirty(*keys)
+            self.state.flush()
+            logger.debug("Flushed %d keys: %s", len(keys), ", ".join(keys))
+        return keys
+
     def reset_all(self):
         """Reset all state to default values"""
         self.state.update(self._defaults)
-    
-    def get_state_summary(self) -> Dict[str, Any]:
+
+    def get_state_summary(self) -> dict[str, Any]:
         """Get summary of current state"""
         current_state = self.state.to_dict()
         return {
-            key: value for key, value in current_state.items()
+            key: value
+            for key, value in current_state.items()
             if not key.startswith("trame__")
         }
-    
+
     # Convenience methods for common operations
     def show_mesh(self, visible: bool = True):
         """Show or hide mesh"""
         self.set("mesh_visible", visible)
-    
+
     def set_mesh_size_factor(self, factor: float):
         """Set mesh size factor for mesh generation"""
         self.set("mesh_size_factor", factor)
-    
+
     # Mesh code execution convenience methods
-    def set_mesh_code_execution_state(self, code: str, status: str, error_message: str = "",
-                                     start_time: float = None, end_time: float = None,
-                                     duration: float = 0.0, complete: bool = False,
-                                     result: Dict = None):
+    def set_mesh_code_execution_state(
+        self,
+        code: str,
+        status: str,
+        error_message: str = "",
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        duration: float = 0.0,
+        complete: bool = False,
+        result: Optional[dict] = None,
+    ):
         """Set comprehensive mesh code execution state"""
         updates = {
             "mesh_code_current": code,
@@ -114,69 +273,99 @@ class StateManager:
             "mesh_code_execution_duration": duration,
             "mesh_code_execution_complete": complete,
         }
-        
+
         if start_time is not None:
             updates["mesh_code_execution_start_time"] = start_time
         if end_time is not None:
             updates["mesh_code_execution_end_time"] = end_time
         if result is not None:
             updates["mesh_code_result"] = result
-            
+
         self.set_multiple(updates)
-    
+
+    def queue_mesh_code_execution(self, code: str, position: int):
+        """Mark mesh code as waiting for an execution slot"""
+        self.set_multiple(
+            {
+                "mesh_code_current": code,
+                "mesh_code_status": "queued",
+                "mesh_code_queue_position": position,
+                "mesh_code_error_message": "",
+                "mesh_code_execution_complete": False,
+            }
+        )
+
     def start_mesh_code_execution(self, code: str):
         """Mark start of mesh code execution"""
         import time
-        self.set_multiple({
-            "mesh_code_current": code,
-            "mesh_code_status": "running",
-            "mesh_code_error_message": "",
-            "mesh_code_execution_start_time": time.time(),
-            "mesh_code_execution_complete": False,
-        })
-    
-    def complete_mesh_code_execution(self, success: bool, result: Dict, error_message: str = ""):
+
+        self.set_multiple(
+            {
+                "mesh_code_current": code,
+                "mesh_code_status": "running",
+                "mesh_code_queue_position": 0,
+                "mesh_code_error_message": "",
+                "mesh_code_execution_start_time": time.time(),
+                "mesh_code_execution_complete": False,
+            }
+        )
+
+    def complete_mesh_code_execution(
+        self, success: bool, result: dict, error_message: str = ""
+    ):
         """Mark completion of mesh code execution"""
         import time
+
         end_time = time.time()
         start_time = self.get("mesh_code_execution_start_time", end_time)
         duration = end_time - start_time
-        
-        self.set_multiple({
-            "mesh_code_status": "completed" if success else "failed",
-            "mesh_code_error_message": error_message,
-            "mesh_code_execution_end_time": end_time,
-            "mesh_code_execution_duration": duration,
-            "mesh_code_execution_complete": True,
-            "mesh_code_result": result,
-        })
-    
+
+        self.set_multiple(
+            {
+                "mesh_code_status": "completed" if success else "failed",
+                "mesh_code_error_message": error_message,
+                "mesh_code_execution_end_time": end_time,
+                "mesh_code_execution_duration": duration,
+                "mesh_code_execution_complete": True,
+                "mesh_code_result": result,
+            }
+        )
+
     def clear_mesh_code_execution(self):
         """Clear mesh code execution state"""
-        self.set_multiple({
-            "mesh_code_current": "",
-            "mesh_code_status": "idle",
-            "mesh_code_error_message": "",
-            "mesh_code_execution_start_time": None,
-            "mesh_code_execution_end_time": None,
-            "mesh_code_execution_duration": 0.0,
-            "mesh_code_execution_complete": False,
-            "mesh_code_result": {},
-        })
-    
+        self.set_multiple(
+            {
+                "mesh_code_current": "",
+                "mesh_code_status": "idle",
+                "mesh_code_queue_position": 0,
+                "mesh_code_error_message": "",
+                "mesh_code_execution_start_time": None,
+                "mesh_code_execution_end_time": None,
+                "mesh_code_execution_duration": 0.0,
+                "mesh_code_execution_complete": False,
+                "mesh_code_result": {},
+            }
+        )
+
     def is_mesh_code_running(self) -> bool:
-        """Check if mesh code is currently executing"""
-        return self.get("mesh_code_status") == "running"
-    
-    def get_mesh_code_execution_summary(self) -> Dict[str, Any]:
+        """Check if mesh code is currently executing or waiting to execute"""
+        return self.get("mesh_code_status") in ("queued", "running")
+
+    def get_mesh_code_execution_summary(self) -> dict[str, Any]:
         """Get summary of current mesh code execution state"""
         return {
             "current_code": self.get("mesh_code_current", ""),
             "status": self.get("mesh_code_status", "idle"),
+            "queue_position": self.get("mesh_code_queue_position", 0),
             "error_message": self.get("mesh_code_error_message", ""),
             "execution_complete": self.get("mesh_code_execution_complete", False),
             "execution_duration": self.get("mesh_code_execution_duration", 0.0),
             "start_time": self.get("mesh_code_execution_start_time"),
             "end_time": self.get("mesh_code_execution_end_time"),
             "result": self.get("mesh_code_result", {}),
-        }
\ No newline at end of file
+        }
+
+
+def serialize_state_value(value: Any) -> bytes:
+    """Serialize a state value the way it is measured for websocket traffic (compact JSON)"""
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
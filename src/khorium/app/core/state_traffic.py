@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class StateTrafficStats:
+    """
+    Per-key counters for state updates and change handlers
+
+    Updates record how often a key is written and the serialized size sent for
+    it. Handlers record how often they fire and how long they take.
+    """
+
+    def __init__(self, serialize: Callable[[Any], bytes]):
+        self.serialize = serialize
+        self.started_at = time.time()
+        self._updates: dict[str, dict[str, float]] = {}
+        self._handlers: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record_update(self, key: str, value: Any):
+        """Count one write of key and its serialized size"""
+        try:
+            size = len(self.serialize(value))
+        except (TypeError, ValueError):
+            size = 0
+        with self._lock:
+            entry = self._updates.setdefault(
+                key, {"count": 0, "bytes": 0, "max_bytes": 0, "last_bytes": 0}
+            )
+            entry["count"] += 1
+            entry["bytes"] += size
+            entry["last_bytes"] = size
+            entry["max_bytes"] = max(entry["max_bytes"], size)
+
+    def record_event(self, key: str, handler_name: str):
+        """Count one change event delivered for a handler, before any coalescing"""
+        with self._lock:
+            self._handler_entry(key, handler_name)["events"] += 1
+
+    def record_handler(self, key: str, handler_name: str, duration: float):
+        """Record one handler run and its latency in seconds"""
+        with self._lock:
+            entry = self._handler_entry(key, handler_name)
+            entry["calls"] += 1
+            entry["total_time"] += duration
+            entry["max_time"] = max(entry["max_time"], duration)
+
+    def _handler_entry(self, key: str, handler_name: str) -> dict[str, float]:
+        return self._handlers.setdefault(
+            f"{key}:{handler_name}",
+            {
+                "key": key,
+                "handler": handler_name,
+                "events": 0,
+                "calls": 0,
+                "total_time": 0.0,
+                "max_time": 0.0,
+            },
+        )
+
+    def instrument(self, key: str, handler: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a change handler to record its runs and latency"""
+        handler_name = getattr(handler, "__name__", repr(handler))
+
+        def timed_handler(**kwargs):
+            started = time.perf_counter()
+            try:
+                return handler(**kwargs)
+            finally:
+                self.record_handler(key, handler_name, time.perf_counter() - started)
+
+        timed_handler.__name__ = handler_name
+        return timed_handler
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current counters, hottest keys and slowest handlers first"""
+        with self._lock:
+            updates = sorted(
+                ({"key": key, **entry} for key, entry in self._updates.items()),
+                key=lambda entry: -entry["bytes"],
+            )
+            handlers = sorted(
+                (
+                    {
+                        **entry,
+                        "mean_time": entry["total_time"] / entry["calls"]
+                        if entry["calls"]
+                        else 0.0,
+                    }
+                    for entry in self._handlers.values()
+                ),
+                key=lambda entry: -entry["total_time"],
+            )
+        return {
+            "since": self.started_at,
+            "elapsed": time.time() - self.started_at,
+            "total_updates": sum(entry["count"] for entry in updates),
+            "total_bytes": sum(entry["bytes"] for entry in updates),
+            "updates": updates,
+            "handlers": handlers,
+        }
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Write a snapshot as JSON, returning the file path"""
+        if not path:
+            path = os.path.join(
+                tempfile.gettempdir(), f"khorium_state_traffic_{int(time.time())}.json"
+            )
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+    def reset(self):
+        """Clear all counters"""
+        with self._lock:
+            self._updates.clear()
+            self._handlers.clear()
+            self.started_at = time.time()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Any, Callable, Optional
+
+
+class UpdatePolicy:
+    """How often a high-frequency state key may trigger its handlers"""
+
+    DEBOUNCE = (
+        "debounce"  # Run once the value has stopped changing for interval seconds
+    )
+    THROTTLE = "throttle"  # Run at most once per interval seconds, always including the last value
+
+    def __init__(self, mode: str, interval: float):
+        if mode not in (self.DEBOUNCE, self.THROTTLE):
+            msg = f"Unknown update policy mode: {mode}"
+            raise ValueError(msg)
+        self.mode = mode
+        self.interval = interval
+
+    @classmethod
+    def debounce(cls, interval: float) -> "UpdatePolicy":
+        return cls(cls.DEBOUNCE, interval)
+
+    @classmethod
+    def throttle(cls, interval: float) -> "UpdatePolicy":
+        return cls(cls.THROTTLE, interval)
+
+
+class UpdateCoalescer:
+    """
+    Coalesces state change handlers and batches outgoing state writes
+
+    Handlers wrapped with wrap() see only the settled values of their key
+    according to its UpdatePolicy. Writes passed to defer() are merged and
+    applied as one state update on the next event loop tick.
+    """
+
+    def __init__(
+        self,
+        trame_state,
+        policies: dict[str, UpdatePolicy],
+        apply: Optional[Callable[[dict[str, Any]], None]] = None,
+    ):
+        self.state = trame_state
+        self.policies = policies
+        self.apply = apply or trame_state.update
+        self._timers: dict[Any, asyncio.TimerHandle] = {}
+        self._last_run: dict[Any, float] = {}
+        self._latest_kwargs: dict[Any, dict[str, Any]] = {}
+        self._pending: dict[str, Any] = {}
+        self._flush_scheduled = False
+        self.coalesced_count = 0  # Handler calls absorbed by a policy
+        self.flush_count = 0  # Batched writes applied
+
+    def wrap(self, key: str, handler: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a state change handler with the policy of key, if it has one"""
+        policy = self.policies.get(key)
+        if policy is None:
+            return handler
+
+        # Several handlers may watch the same key, each gets its own timer
+        timer_key = (key, handler)
+
+        def coalesced_handler(**kwargs):
+            loop = self._get_loop()
+            if loop is None:
+                handler(**kwargs)
+                return
+
+            self._latest_kwargs[timer_key] = kwargs
+            pending = self._timers.get(timer_key)
+
+            if policy.mode == UpdatePolicy.DEBOUNCE:
+                if pending is not None:
+                    pending.cancel()
+                    self.coalesced_count += 1
+                self._timers[timer_key] = loop.call_later(
+                    policy.interval, self._run, timer_key, handler
+                )
+                return
+
+            if pending is not None:
+                # A trailing call is already scheduled and will pick up these kwargs
+                self.coalesced_count += 1
+                return
+            elapsed = time.monotonic() - self._last_run.get(timer_key, 0.0)
+            if elapsed >= policy.interval:
+                self._run(timer_key, handler)
+            else:
+                self._timers[timer_key] = loop.call_later(
+                    policy.interval - elapsed, self._run, timer_key, handler
+                )
+
+        coalesced_handler.__name__ = getattr(handler, "__name__", "coalesced_handler")
+        return coalesced_handler
+
+    def run_pending(self, key: Optional[str] = None):
+        """Run handlers waiting on a policy timer now with their latest values, only those of key if given"""
+        for timer_key in [
+            timer_key
+            for timer_key in self._timers
+            if key is None or timer_key[0] == key
+        ]:
+            self._timers[timer_key].cancel()
+            self._run(timer_key, timer_key[1])
+
+    def _run(self, timer_key, handler: Callable[..., Any]):
+        self._timers.pop(timer_key, None)
+        kwargs = self._latest_kwargs.pop(timer_key, {})
+        self._last_run[timer_key] = time.monotonic()
+        # Timer callbacks run outside trame's change context, flush what the handler sets
+        with self.state:
+            handler(**kwargs)
+
+    def defer(self, updates: dict[str, Any]):
+        """Queue state writes to be applied together on the next event loop tick"""
+        loop = self._get_loop()
+        if loop is None:
+            self.apply(updates)
+            return
+
+        self._pending.update(updates)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self.flush)
+
+    def discard(self, keys):
+        """Drop queued writes superseded by a direct write"""
+        for key in keys:
+            self._pending.pop(key, None)
+
+    def flush(self):
+        """Apply queued writes now"""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        updates, self._pending = self._pending, {}
+        self.flush_count += 1
+        with self.state:
+            self.apply(updates)
+
+    def _get_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
@@ -8,9 +8,9 @@ from vtkmodules.vtkFiltersCore import vtkContourFilter
 
 # Required for interactor initialization
 from vtkmodules.vtkInteractionStyle import vtkInteractorStyleSwitch  # noqa: F401
-from vtkmodules.vtkIOXML import vtkXMLUnstructuredGridReader
-from vtkmodules.vtkIOLegacy import vtkUnstructuredGridReader
 from vtkmodules.vtkIOGeometry import vtkSTLReader
+from vtkmodules.vtkIOLegacy import vtkUnstructuredGridReader
+from vtkmodules.vtkIOXML import vtkXMLUnstructuredGridReader
 from vtkmodules.vtkRenderingAnnotation import vtkCubeAxesActor
 from vtkmodules.vtkRenderingCore import (
     vtkActor,
@@ -21,20 +21,36 @@ from vtkmodules.vtkRenderingCore import (
 )
 
 from khorium.app.core.constants import CURRENT_DIRECTORY
+from khorium.app.core.metrics import LOAD_FILE_SECONDS
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+# Surface colors cycled through for the parts of a multi-file upload
+PART_COLORS = [
+    (0.8, 0.8, 0.9),
+    (0.9, 0.7, 0.5),
+    (0.6, 0.8, 0.6),
+    (0.9, 0.6, 0.6),
+    (0.6, 0.7, 0.9),
+    (0.9, 0.9, 0.6),
+    (0.8, 0.6, 0.9),
+    (0.6, 0.9, 0.9),
+]
 
 
 class VtkPipeline:
     def _create_reader(self, file_path):
         """Create appropriate VTK reader based on file extension"""
-        if file_path.lower().endswith('.vtu'):
+        if file_path.lower().endswith(".vtu"):
             return vtkXMLUnstructuredGridReader()
-        elif file_path.lower().endswith('.vtk'):
+        if file_path.lower().endswith(".vtk"):
             return vtkUnstructuredGridReader()
-        elif file_path.lower().endswith('.stl'):
+        if file_path.lower().endswith(".stl"):
             return vtkSTLReader()
-        else:
-            # Default to XML reader
-            return vtkXMLUnstructuredGridReader()
+        # Default to XML reader
+        return vtkXMLUnstructuredGridReader()
 
     def __init__(self):
         # Create renderer, render window, and interactor
@@ -46,19 +62,19 @@ class VtkPipeline:
         self.renderWindowInteractor = vtkRenderWindowInteractor()
         self.renderWindowInteractor.SetRenderWindow(self.renderWindow)
         self.renderWindowInteractor.GetInteractorStyle().SetCurrentStyleToTrackballCamera()
-        
+
         # Track generated mesh actors separately
         self.generated_mesh_reader = None
         self.generated_mesh_mapper = None
         self.generated_mesh_actor = None
         self.has_generated_mesh = False
-        
+
         # Track default fallback mesh
         self.default_mesh_reader = None
         self.default_mesh_mapper = None
         self.default_mesh_actor = None
         self.has_default_mesh = False
-        
+
         # Track STL mesh actors separately
         self.stl_mesh_reader = None
         self.stl_mesh_mapper = None
@@ -66,6 +82,9 @@ class VtkPipeline:
         self.has_stl_mesh = False
         self.current_stl_file = None
 
+        # Track parts of multi-file uploads, one actor per file
+        self.part_actors = {}
+
         # Read Data
         initial_file = os.path.join(CURRENT_DIRECTORY, "blade.stl")
         self.reader = self._create_reader(initial_file)
@@ -74,7 +93,7 @@ class VtkPipeline:
 
         # Extract Array/Field information
         self.dataset_arrays = []
-        if not initial_file.lower().endswith('.stl'):
+        if not initial_file.lower().endswith(".stl"):
             fields = [
                 (
                     self.reader.GetOutput().GetPointData(),
@@ -120,10 +139,12 @@ class VtkPipeline:
         self.mesh_actor.GetProperty().EdgeVisibilityOff()
 
         # Mesh: Configure based on file type
-        if initial_file.lower().endswith('.stl'):
+        if initial_file.lower().endswith(".stl"):
             # STL files don't have scalar data, so disable scalar coloring
             self.mesh_mapper.SetScalarVisibility(False)
-            self.mesh_actor.GetProperty().SetColor(0.8, 0.8, 0.9)  # Light blue color for STL
+            self.mesh_actor.GetProperty().SetColor(
+                0.8, 0.8, 0.9
+            )  # Light blue color for STL
         else:
             # For VTU files with scalar data
             mesh_lut = self.mesh_mapper.GetLookupTable()
@@ -131,7 +152,7 @@ class VtkPipeline:
             mesh_lut.SetSaturationRange(1.0, 1.0)
             mesh_lut.SetValueRange(1.0, 1.0)
             mesh_lut.Build()
-            
+
             # Set solid pastel blue color as default
             self.mesh_mapper.SetScalarVisibility(False)
             self.mesh_actor.GetProperty().SetColor(0.7, 0.8, 1.0)
@@ -147,21 +168,21 @@ class VtkPipeline:
 
         # Contour: Configure based on file type and available data
         self.contour_value = 0.5 * (self.default_max + self.default_min)
-        if self.dataset_arrays and not initial_file.lower().endswith('.stl'):
+        if self.dataset_arrays and not initial_file.lower().endswith(".stl"):
             # For VTU files with scalar data
             default_array = self.dataset_arrays[0]
             self.contour.SetInputArrayToProcess(
                 0, 0, 0, default_array.get("type"), default_array.get("text")
             )
             self.contour.SetValue(0, self.contour_value)
-            
+
             # Apply rainbow color map
             contour_lut = self.contour_mapper.GetLookupTable()
             contour_lut.SetHueRange(0.666, 0.0)
             contour_lut.SetSaturationRange(1.0, 1.0)
             contour_lut.SetValueRange(1.0, 1.0)
             contour_lut.Build()
-            
+
             # Set solid pastel blue color
             self.contour_mapper.SetScalarVisibility(False)
             self.contour_actor.GetProperty().SetColor(0.7, 0.8, 1.0)
@@ -186,7 +207,7 @@ class VtkPipeline:
         self.cube_axes.SetZLabelFormat("%6.1f")
         self.cube_axes.SetFlyModeToOuterEdges()
         self.cube_axes.SetVisibility(True)  # Ensure axes are visible
-        
+
         # Set axes colors to dark gray for visibility against white background
         self.cube_axes.GetXAxesLinesProperty().SetColor(0.3, 0.3, 0.3)
         self.cube_axes.GetYAxesLinesProperty().SetColor(0.3, 0.3, 0.3)
@@ -194,7 +215,7 @@ class VtkPipeline:
         self.cube_axes.GetXAxesGridlinesProperty().SetColor(0.5, 0.5, 0.5)
         self.cube_axes.GetYAxesGridlinesProperty().SetColor(0.5, 0.5, 0.5)
         self.cube_axes.GetZAxesGridlinesProperty().SetColor(0.5, 0.5, 0.5)
-        
+
         # Set label colors to dark for visibility
         self.cube_axes.SetXAxisLabelVisibility(True)
         self.cube_axes.SetYAxisLabelVisibility(True)
@@ -206,7 +227,7 @@ class VtkPipeline:
         # Initial camera setup with proper centering
         self.renderer.ResetCameraClippingRange()
         self.renderer.ResetCamera()
-        
+
         # Load default fallback mesh
         self._load_default_mesh()
 
@@ -235,79 +256,149 @@ class VtkPipeline:
 
         self.renderer.ResetCameraClippingRange()
         self.renderer.ResetCamera()
-    
+
     def _load_default_mesh(self):
         """Load default fallback mesh (cad_000_mesh.vtk)"""
         default_mesh_path = os.path.join(CURRENT_DIRECTORY, "cad_000_mesh.vtk")
-        
+
         if not os.path.exists(default_mesh_path):
-            print(f">>> VTK Pipeline: Default mesh file not found: {default_mesh_path}")
+            logger.warning("Default mesh file not found: %s", default_mesh_path)
             return False
-            
-        print(f">>> VTK Pipeline: Loading default mesh from {default_mesh_path}")
-        
+
+        logger.info("Loading default mesh from %s", default_mesh_path)
+
         try:
             # Create mesh reader and pipeline
             self.default_mesh_reader = self._create_reader(default_mesh_path)
             self.default_mesh_mapper = vtkDataSetMapper()
             self.default_mesh_actor = vtkActor()
             self.default_mesh_actor.SetMapper(self.default_mesh_mapper)
-            
+
             # Update reader with file
             self.default_mesh_reader.SetFileName(default_mesh_path)
             self.default_mesh_reader.Update()
-            self.default_mesh_mapper.SetInputConnection(self.default_mesh_reader.GetOutputPort())
-            
+            self.default_mesh_mapper.SetInputConnection(
+                self.default_mesh_reader.GetOutputPort()
+            )
+
             # Style the mesh (wireframe with green color to differentiate from generated mesh)
             self.default_mesh_actor.GetProperty().SetRepresentationToWireframe()
             self.default_mesh_actor.GetProperty().SetColor(0.0, 1.0, 0.0)  # Green color
             self.default_mesh_actor.GetProperty().SetLineWidth(2)
-            
+
             # Add to renderer but keep hidden initially
             self.renderer.AddActor(self.default_mesh_actor)
             self.default_mesh_actor.SetVisibility(False)
-            
+
             self.has_default_mesh = True
-            print(">>> VTK Pipeline: Default mesh loaded successfully")
+            logger.info("Default mesh loaded successfully")
             return True
-            
+
         except Exception as e:
-            print(f">>> VTK Pipeline: Error loading default mesh: {e}")
+            logger.error("Error loading default mesh: %s", e)
             return False
 
+    @traced("vtk_pipeline.load_file")
     def load_file(self, file_path, is_generated_mesh=False):
         """Load a new VTU, VTK, or STL file and update the pipeline"""
-        if file_path.lower().endswith('.stl'):
-            return self._load_stl_file(file_path)
-        elif is_generated_mesh:
-            return self._load_generated_mesh(file_path)
-        else:
-            return self._load_original_data(file_path)
-    
+        file_type = os.path.splitext(file_path)[1].lower().lstrip(".") or "unknown"
+        with LOAD_FILE_SECONDS.time(type=file_type, status="failed") as labels:
+            if not is_generated_mesh:
+                # A single uploaded file replaces a previously uploaded assembly
+                self.clear_parts()
+            if file_path.lower().endswith(".stl"):
+                loaded = self._load_stl_file(file_path)
+            elif is_generated_mesh:
+                loaded = self._load_generated_mesh(file_path)
+            else:
+                loaded = self._load_original_data(file_path)
+            if loaded:
+                labels["status"] = "loaded"
+        return loaded
+
+    def get_current_file(self):
+        """Path of the original data currently displayed, None while an assembly is shown"""
+        if self.part_actors:
+            return None
+        if self.has_stl_mesh:
+            return self.current_stl_file
+        return self.reader.GetFileName()
+
+    def is_file_loaded(self, file_path):
+        """Check whether a file is the one currently displayed as original data"""
+        if file_path.lower().endswith(".stl"):
+            return self.has_stl_mesh and self.current_stl_file == file_path
+        return (
+            not self.has_stl_mesh
+            and not self.part_actors
+            and self.reader.GetFileName() == file_path
+        )
+
+    @traced("vtk_pipeline.load_parts")
+    def load_parts(self, parts):
+        """
+        Show several parsed datasets as separate actors, replacing previous parts
+
+        Args:
+            parts: List of (name, vtkDataSet) pairs, e.g. the files of an assembly
+        """
+        self.clear_parts()
+
+        for index, (name, dataset) in enumerate(parts):
+            mapper = vtkDataSetMapper()
+            mapper.SetInputData(dataset)
+            mapper.SetScalarVisibility(False)
+            actor = vtkActor()
+            actor.SetMapper(mapper)
+            actor.GetProperty().SetRepresentationToSurface()
+            actor.GetProperty().SetColor(*PART_COLORS[index % len(PART_COLORS)])
+            self.renderer.AddActor(actor)
+            self.part_actors[name] = actor
+
+        # Hide single-file and mesh actors while an assembly is shown
+        if self.has_stl_mesh and self.stl_mesh_actor:
+            self.stl_mesh_actor.SetVisibility(False)
+            self.has_stl_mesh = False
+        if self.has_generated_mesh and self.generated_mesh_actor:
+            self.generated_mesh_actor.SetVisibility(False)
+        if self.has_default_mesh and self.default_mesh_actor:
+            self.default_mesh_actor.SetVisibility(False)
+        self.mesh_actor.SetVisibility(False)
+        self.contour_actor.SetVisibility(False)
+
+        logger.info("Loaded %d parts", len(self.part_actors))
+        return len(self.part_actors) > 0
+
+    def clear_parts(self):
+        """Remove the actors of a previously uploaded assembly"""
+        for actor in self.part_actors.values():
+            self.renderer.RemoveActor(actor)
+        self.part_actors = {}
+
     def _load_original_data(self, file_path):
         """Load original VTU data"""
         # Hide STL mesh if it was previously loaded
         if self.has_stl_mesh and self.stl_mesh_actor:
             self.stl_mesh_actor.SetVisibility(False)
             self.has_stl_mesh = False
-            print(">>> VTK Pipeline: STL mesh hidden for VTU file loading")
-        
+            logger.debug("STL mesh hidden for VTU file loading")
+
         # Show VTU-based visualization elements
         self.mesh_actor.SetVisibility(True)
         self.contour_actor.SetVisibility(True)
-        
+
         # Create appropriate reader for the file type
         current_reader_type = type(self.reader)
         new_reader = self._create_reader(file_path)
-        
+
         # If reader type changed, we need to reconnect the pipeline
-        if type(new_reader) != current_reader_type:
+        if type(new_reader) is not current_reader_type:
             self.reader = new_reader
             # Reconnect mesh mapper
             self.mesh_mapper.SetInputConnection(self.reader.GetOutputPort())
             # Reconnect contour filter
             self.contour.SetInputConnection(self.reader.GetOutputPort())
-        
+
         # Update the reader with new file
         self.reader.SetFileName(file_path)
         self.reader.Modified()  # Force reader to recognize file changes
@@ -316,7 +407,7 @@ class VtkPipeline:
         try:
             self.reader.Update()
         except Exception as e:
-            print(f">>> VTK Pipeline: Error reading VTU file {file_path}: {e}")
+            logger.error("Error reading VTU file %s: %s", file_path, e)
             return False
 
         # Extract new Array/Field information
@@ -386,191 +477,324 @@ class VtkPipeline:
             # Reset camera to fit new data with proper centering
             self.renderer.ResetCameraClippingRange()
             self.renderer.ResetCamera(bounds)
-            
-            print(f">>> VTK Pipeline: VTU bounds: {bounds}")
 
-            print(
-                f">>> VTK Pipeline: Loaded new file {file_path} with {len(self.dataset_arrays)} arrays"
+            logger.debug("VTU bounds: %s", bounds)
+
+            logger.info(
+                "Loaded new file %s with %d arrays", file_path, len(self.dataset_arrays)
             )
             return True
-        print(f">>> VTK Pipeline: No readable arrays found in {file_path}")
+        logger.warning("No readable arrays found in %s", file_path)
         return False
-    
+
     def _load_generated_mesh(self, file_path):
         """Load generated mesh file (VTK format)"""
-        print(f">>> VTK Pipeline: Loading generated mesh from {file_path}")
-        
-        # Create mesh reader and pipeline if not exists
-        if self.generated_mesh_reader is None:
-            self.generated_mesh_reader = self._create_reader(file_path)
-            self.generated_mesh_mapper = vtkDataSetMapper()
-            self.generated_mesh_actor = vtkActor()
-            self.generated_mesh_actor.SetMapper(self.generated_mesh_mapper)
-            
-            # Style the mesh differently (wireframe with different color)
-            self.generated_mesh_actor.GetProperty().SetRepresentationToWireframe()
-            self.generated_mesh_actor.GetProperty().SetColor(1.0, 0.0, 0.0)  # Red color
-            self.generated_mesh_actor.GetProperty().SetLineWidth(3)
-            self.generated_mesh_actor.GetProperty().SetOpacity(1.0)  # Ensure full opacity
-            self.generated_mesh_actor.GetProperty().EdgeVisibilityOn()  # Show edges
-            
-            # Add to renderer but keep hidden initially
-            self.renderer.AddActor(self.generated_mesh_actor)
-            self.generated_mesh_actor.SetVisibility(False)
-        
+        logger.info("Loading generated mesh from %s", file_path)
+
+        # Create mesh reader if not exists or if the file type changed
+        new_reader = self._create_reader(file_path)
+        if self.generated_mesh_reader is None or type(new_reader) is not type(
+            self.generated_mesh_reader
+        ):
+            self.generated_mesh_reader = new_reader
+        self._ensure_generated_mesh_actor()
+
         # Update reader with new file
         self.generated_mesh_reader.SetFileName(file_path)
         self.generated_mesh_reader.Modified()
-        
+
         try:
             self.generated_mesh_reader.Update()
-            self.generated_mesh_mapper.SetInputConnection(self.generated_mesh_reader.GetOutputPort())
+            self.generated_mesh_mapper.SetInputConnection(
+                self.generated_mesh_reader.GetOutputPort()
+            )
             self.has_generated_mesh = True
-            
+
+            # Hide default mesh when generated mesh is loaded
+            if self.has_default_mesh and self.default_mesh_actor:
+                self.default_mesh_actor.SetVisibility(False)
+
+            logger.info("Generated mesh loaded successfully")
+            return True
+        except Exception as e:
+            logger.error("Error loading generated mesh: %s", e)
+            return False
+
+    @traced("vtk_pipeline.load_generated_mesh_data")
+    def load_generated_mesh_data(self, grid):
+        """Show an in-memory vtkUnstructuredGrid as the generated mesh"""
+        logger.info(
+            "Loading generated mesh data (%d points, %d cells)",
+            grid.GetNumberOfPoints(),
+            grid.GetNumberOfCells(),
+        )
+        self._ensure_generated_mesh_actor()
+
+        try:
+            self.generated_mesh_mapper.SetInputData(grid)
+            self.has_generated_mesh = True
+
             # Hide default mesh when generated mesh is loaded
             if self.has_default_mesh and self.default_mesh_actor:
                 self.default_mesh_actor.SetVisibility(False)
-                
-            print(">>> VTK Pipeline: Generated mesh loaded successfully")
+
+            logger.info("Generated mesh data loaded successfully")
             return True
         except Exception as e:
-            print(f">>> VTK Pipeline: Error loading generated mesh: {e}")
+            logger.error("Error loading generated mesh data: %s", e)
             return False
-    
+
+    def get_generated_mesh_data(self):
+        """The dataset shown as the generated mesh, or None if there is none"""
+        if not self.has_generated_mesh or self.generated_mesh_mapper is None:
+            return None
+        self.generated_mesh_mapper.Update()
+        return self.generated_mesh_mapper.GetInput()
+
+    def _ensure_generated_mesh_actor(self):
+        """Create the generated mesh mapper and actor on first use"""
+        if self.generated_mesh_actor is not None:
+            return
+
+        self.generated_mesh_mapper = vtkDataSetMapper()
+        self.generated_mesh_actor = vtkActor()
+        self.generated_mesh_actor.SetMapper(self.generated_mesh_mapper)
+
+        # Style the mesh differently (wireframe with different color)
+        self.generated_mesh_actor.GetProperty().SetRepresentationToWireframe()
+        self.generated_mesh_actor.GetProperty().SetColor(1.0, 0.0, 0.0)  # Red color
+        self.generated_mesh_actor.GetProperty().SetLineWidth(3)
+        self.generated_mesh_actor.GetProperty().SetOpacity(1.0)  # Ensure full opacity
+        self.generated_mesh_actor.GetProperty().EdgeVisibilityOn()  # Show edges
+
+        # Add to renderer but keep hidden initially
+        self.renderer.AddActor(self.generated_mesh_actor)
+        self.generated_mesh_actor.SetVisibility(False)
+
     def _load_stl_file(self, file_path):
         """Load STL file and update the pipeline"""
-        print(f">>> VTK Pipeline: Loading STL file from {file_path}")
-        
+        logger.info("Loading STL file from %s", file_path)
+
         # Create STL mesh reader and pipeline if not exists
         if self.stl_mesh_reader is None:
             self.stl_mesh_reader = vtkSTLReader()
             self.stl_mesh_mapper = vtkDataSetMapper()
             self.stl_mesh_actor = vtkActor()
             self.stl_mesh_actor.SetMapper(self.stl_mesh_mapper)
-            
+
             # Style the STL mesh with default surface properties
             self.stl_mesh_actor.GetProperty().SetRepresentationToSurface()
-            self.stl_mesh_actor.GetProperty().SetColor(0.8, 0.8, 0.9)  # Light blue color
+            self.stl_mesh_actor.GetProperty().SetColor(
+                0.8, 0.8, 0.9
+            )  # Light blue color
             self.stl_mesh_actor.GetProperty().SetOpacity(1.0)
-            
+
             # Add to renderer
             self.renderer.AddActor(self.stl_mesh_actor)
-        
+
         # Update reader with new file
         self.stl_mesh_reader.SetFileName(file_path)
         self.stl_mesh_reader.Modified()
-        
+
         try:
             self.stl_mesh_reader.Update()
-            self.stl_mesh_mapper.SetInputConnection(self.stl_mesh_reader.GetOutputPort())
-            
+            self.stl_mesh_mapper.SetInputConnection(
+                self.stl_mesh_reader.GetOutputPort()
+            )
+
             # STL files don't have scalar data, so disable scalar coloring
             self.stl_mesh_mapper.SetScalarVisibility(False)
-            
+
             self.has_stl_mesh = True
             self.current_stl_file = file_path
-            
+
             # Hide other mesh types when STL is loaded
             if self.has_generated_mesh and self.generated_mesh_actor:
                 self.generated_mesh_actor.SetVisibility(False)
             if self.has_default_mesh and self.default_mesh_actor:
                 self.default_mesh_actor.SetVisibility(False)
-            
+
             # Hide VTU-based visualization elements since STL doesn't have scalar fields
             self.mesh_actor.SetVisibility(False)
             self.contour_actor.SetVisibility(False)
-            
+
             # Update cube axes bounds for STL geometry
             bounds = self.stl_mesh_actor.GetBounds()
             self.cube_axes.SetBounds(bounds)
-            
+
             # Reset camera to fit STL data with proper centering
             self.renderer.ResetCameraClippingRange()
             self.renderer.ResetCamera(bounds)
-            
-            print(f">>> VTK Pipeline: STL bounds: {bounds}")
-            
-            print(">>> VTK Pipeline: STL file loaded successfully")
+
+            logger.debug("STL bounds: %s", bounds)
+
+            logger.info("STL file loaded successfully")
             return True
         except Exception as e:
-            print(f">>> VTK Pipeline: Error loading STL file: {e}")
+            logger.error("Error loading STL file: %s", e)
             return False
-    
+
     def set_mesh_visibility(self, visible):
         """Toggle visibility of generated or default mesh"""
-        print(f">>> VTK Pipeline: [DEBUG] set_mesh_visibility called with visible={visible}")
-        print(f">>> VTK Pipeline: [DEBUG] has_generated_mesh={self.has_generated_mesh}, has_default_mesh={self.has_default_mesh}, has_stl_mesh={self.has_stl_mesh}")
-        
+        logger.debug("set_mesh_visibility called with visible=%s", visible)
+        logger.debug(
+            "has_generated_mesh=%s, has_default_mesh=%s, has_stl_mesh=%s",
+            self.has_generated_mesh,
+            self.has_default_mesh,
+            self.has_stl_mesh,
+        )
+
         # Always try to show/hide generated mesh first (highest priority)
         if self.has_generated_mesh and self.generated_mesh_actor:
             # Show/hide generated mesh
             self.generated_mesh_actor.SetVisibility(visible)
             current_visibility = self.generated_mesh_actor.GetVisibility()
-            print(f">>> VTK Pipeline: [DEBUG] Generated mesh actor visibility set to {visible}, current={current_visibility}")
-            
+            logger.debug(
+                "Generated mesh actor visibility set to %s, current=%s",
+                visible,
+                current_visibility,
+            )
+
             # Ensure default mesh is hidden when showing generated mesh
             if visible and self.has_default_mesh and self.default_mesh_actor:
                 self.default_mesh_actor.SetVisibility(False)
-                print(f">>> VTK Pipeline: [DEBUG] Default mesh hidden when showing generated mesh")
-            print(f">>> VTK Pipeline: Generated mesh visibility set to {visible}")
+                logger.debug("Default mesh hidden when showing generated mesh")
+            logger.debug("Generated mesh visibility set to %s", visible)
         elif self.has_default_mesh and self.default_mesh_actor:
             # Fallback to default mesh
             self.default_mesh_actor.SetVisibility(visible)
             current_visibility = self.default_mesh_actor.GetVisibility()
-            print(f">>> VTK Pipeline: [DEBUG] Default mesh actor visibility set to {visible}, current={current_visibility}")
-            print(f">>> VTK Pipeline: Default mesh visibility set to {visible} (fallback)")
+            logger.debug(
+                "Default mesh actor visibility set to %s, current=%s",
+                visible,
+                current_visibility,
+            )
+            logger.debug("Default mesh visibility set to %s (fallback)", visible)
         else:
-            print(">>> VTK Pipeline: [DEBUG] No mesh available to toggle - check if mesh was loaded properly")
-            
+            logger.debug(
+                "No mesh available to toggle - check if mesh was loaded properly"
+            )
+
+    def set_contour_value(self, value):
+        """Move the contour isovalue, re-executing the contour filter on the next render"""
+        self.contour_value = value
+        self.contour.SetValue(0, value)
+
+    def get_scene_token(self):
+        """
+        Latest modification time of the readers, filters, actors, mappers and
+        mapper inputs making up the scene
+
+        VTK modification times come from one global counter, so any change to a
+        tracked object, or adding/removing an actor, yields a different token.
+        The camera is not tracked, its changes do not require a scene push.
+        """
+        # GetActors() rebuilds its collection on every call, the view props only
+        # change when an actor is added or removed
+        props = self.renderer.GetViewProps()
+        mtime = max(props.GetMTime(), self.reader.GetMTime(), self.contour.GetMTime())
+        for i in range(props.GetNumberOfItems()):
+            actor = props.GetItemAsObject(i)
+            if not actor.IsA("vtkActor"):
+                continue
+            # Includes the property; GetProperty() would create a missing one
+            mtime = max(mtime, actor.GetMTime())
+            mapper = actor.GetMapper()
+            if mapper is not None:
+                mtime = max(mtime, mapper.GetMTime())
+                data = mapper.GetInput()
+                if data is not None:
+                    mtime = max(mtime, data.GetMTime())
+        return mtime
+
+    def scene_changed_since(self, token):
+        """Check whether the scene changed after get_scene_token() returned token"""
+        return token is None or self.get_scene_token() != token
+
     def has_mesh(self):
         """Check if any mesh (generated, default, or STL) is available"""
         return self.has_generated_mesh or self.has_default_mesh or self.has_stl_mesh
-    
-    def center_camera_on_all_actors(self):
-        """Center camera on all visible actors in the scene"""
-        print(">>> VTK Pipeline: Centering camera on all visible actors")
-        
+
+    def center_camera_on_all_actors(self, original_bounds=None):
+        """
+        Center camera on all visible actors in the scene
+
+        original_bounds are the precomputed bounds of the original data, used
+        instead of querying the mesh actor when the background preprocessing
+        already has them.
+        """
+        logger.debug("Centering camera on all visible actors")
+
         # Get bounds of all visible actors
-        all_bounds = [float('inf'), float('-inf'), float('inf'), float('-inf'), float('inf'), float('-inf')]
+        all_bounds = [
+            float("inf"),
+            float("-inf"),
+            float("inf"),
+            float("-inf"),
+            float("inf"),
+            float("-inf"),
+        ]
         has_visible_actors = False
-        
+
         # Check main mesh actor
         if self.mesh_actor and self.mesh_actor.GetVisibility():
-            bounds = self.mesh_actor.GetBounds()
+            bounds = (
+                original_bounds
+                if original_bounds and not self.has_stl_mesh
+                else self.mesh_actor.GetBounds()
+            )
             self._update_combined_bounds(all_bounds, bounds)
             has_visible_actors = True
-            print(f">>> VTK Pipeline: Main mesh bounds: {bounds}")
-        
+            logger.debug("Main mesh bounds: %s", bounds)
+
         # Check STL mesh actor
-        if self.has_stl_mesh and self.stl_mesh_actor and self.stl_mesh_actor.GetVisibility():
-            bounds = self.stl_mesh_actor.GetBounds()
+        if (
+            self.has_stl_mesh
+            and self.stl_mesh_actor
+            and self.stl_mesh_actor.GetVisibility()
+        ):
+            bounds = original_bounds or self.stl_mesh_actor.GetBounds()
             self._update_combined_bounds(all_bounds, bounds)
             has_visible_actors = True
-            print(f">>> VTK Pipeline: STL mesh bounds: {bounds}")
-        
+            logger.debug("STL mesh bounds: %s", bounds)
+
+        # Check assembly part actors
+        for actor in self.part_actors.values():
+            if actor.GetVisibility():
+                self._update_combined_bounds(all_bounds, actor.GetBounds())
+                has_visible_actors = True
+
         # Check generated mesh actor
-        if self.has_generated_mesh and self.generated_mesh_actor and self.generated_mesh_actor.GetVisibility():
+        if (
+            self.has_generated_mesh
+            and self.generated_mesh_actor
+            and self.generated_mesh_actor.GetVisibility()
+        ):
             bounds = self.generated_mesh_actor.GetBounds()
             self._update_combined_bounds(all_bounds, bounds)
             has_visible_actors = True
-            print(f">>> VTK Pipeline: Generated mesh bounds: {bounds}")
-        
+            logger.debug("Generated mesh bounds: %s", bounds)
+
         # Check default mesh actor
-        if self.has_default_mesh and self.default_mesh_actor and self.default_mesh_actor.GetVisibility():
+        if (
+            self.has_default_mesh
+            and self.default_mesh_actor
+            and self.default_mesh_actor.GetVisibility()
+        ):
             bounds = self.default_mesh_actor.GetBounds()
             self._update_combined_bounds(all_bounds, bounds)
             has_visible_actors = True
-            print(f">>> VTK Pipeline: Default mesh bounds: {bounds}")
-        
+            logger.debug("Default mesh bounds: %s", bounds)
+
         if has_visible_actors:
-            print(f">>> VTK Pipeline: Combined bounds: {all_bounds}")
+            logger.debug("Combined bounds: %s", all_bounds)
             self.cube_axes.SetBounds(all_bounds)
             self.renderer.ResetCameraClippingRange()
             self.renderer.ResetCamera(all_bounds)
-            print(">>> VTK Pipeline: Camera centered on all visible actors")
+            logger.debug("Camera centered on all visible actors")
         else:
-            print(">>> VTK Pipeline: No visible actors found for camera centering")
-    
+            logger.warning("No visible actors found for camera centering")
+
     def _update_combined_bounds(self, combined_bounds, new_bounds):
         """Update combined bounds with new bounds"""
         if new_bounds and len(new_bounds) >= 6:
@@ -578,5 +802,5 @@ class VtkPipeline:
             combined_bounds[1] = max(combined_bounds[1], new_bounds[1])  # xmax
             combined_bounds[2] = min(combined_bounds[2], new_bounds[2])  # ymin
             combined_bounds[3] = max(combined_bounds[3], new_bounds[3])  # ymax
-            combined_bounds[4] = min(combined_bounds[4], new_bounds[4])  # zmin  
+            combined_bounds[4] = min(combined_bounds[4], new_bounds[4])  # zmin
             combined_bounds[5] = max(combined_bounds[5], new_bounds[5])  # zmax
@@ -1,19 +1,53 @@
-from .app import MyTrameApp
+import sys
+
+from .utils.startup_profiler import StartupProfiler
+
+PROFILE_STARTUP_FLAG = "--profile-startup"
 
 
 def main(server=None, **kwargs):
+    # Checked before the application is imported so its imports can be timed
+    profiler = None
+    if PROFILE_STARTUP_FLAG in sys.argv:
+        profiler = StartupProfiler()
+        profiler.install()
+
+    # Imported here so that importing khorium.app does not load trame, VTK and the controllers
+    from .app import MyTrameApp
+
+    if profiler:
+        profiler.mark("imports done")
+
     app = MyTrameApp(server)
-    
+    app.server.cli.add_argument(
+        PROFILE_STARTUP_FLAG,
+        action="store_true",
+        help="Report import times and the time until the first page is served",
+    )
+    if profiler:
+        profiler.mark("app constructed")
+        app.server.controller.on_server_ready.add(
+            lambda **_: profiler.mark("server ready")
+        )
+
+        def on_first_client(**_kwargs):
+            profiler.mark("first page served")
+            profiler.print_report()
+
+        app.server.controller.on_client_connected.add(on_first_client)
+
     # Configure server for CORS and iframe support
     default_kwargs = {
         "host": "0.0.0.0",
         "cors": True,
     }
     default_kwargs.update(kwargs)
-    
+
     # Print startup message for launcher detection
     print("Starting server...")
-    print(f">>> ENGINE: Starting trame server with CORS enabled on {default_kwargs.get('host', '0.0.0.0')}:{default_kwargs.get('port', 10000)}")
+    print(
+        f">>> ENGINE: Starting trame server with CORS enabled on {default_kwargs.get('host', '0.0.0.0')}:{default_kwargs.get('port', 10000)}"
+    )
     app.server.start(**default_kwargs)
 
 
@@ -1,17 +1,116 @@
+import json
 import os
+import shutil
 import subprocess
+import sys
 import tempfile
+import threading
 import time
-from typing import Dict, List, Optional
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+import contextlib
 
+from khorium.app.config import (
+    CODE_EXEC_CACHE_DIR,
+    CODE_EXEC_CACHE_ENABLED,
+    CODE_EXEC_CACHE_MAX_MB,
+    CODE_EXEC_KERNEL_IDLE_TIMEOUT,
+    CODE_EXEC_KERNEL_MAX_MEMORY_MB,
+    CODE_EXEC_MAX_CPU_SECONDS,
+    CODE_EXEC_MAX_FILE_SIZE_MB,
+    CODE_EXEC_MAX_MEMORY_MB,
+    CODE_EXEC_MAX_OPEN_FILES,
+)
 from khorium.app.core.constants import CURRENT_DIRECTORY
+from khorium.app.services.execution_cache import ExecutionCache
+from khorium.app.services.kernel_session import KernelSession, kill_process_tree
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import TRACE_HELPERS_CODE, get_tracer, trace_span, traced
+
+logger = get_logger(__name__)
+
+
+ARTIFACT_MANIFEST_NAME = "artifacts.json"
+
+# Applies the rlimits passed as JSON in argv[1], then execs the command that
+# follows. Limits are set in a fresh interpreter instead of a preexec_fn, which
+# is unsafe to run between fork and exec in a threaded server.
+RLIMIT_EXEC_CODE = """
+import json, os, resource, sys
+for limit, value in json.loads(sys.argv[1]).items():
+    try:
+        hard = resource.getrlimit(int(limit))[1]
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(int(limit), (value, hard))
+    except (ValueError, OSError):
+        pass
+os.execvp(sys.argv[2], sys.argv[2:])
+"""
+TRACE_EVENTS_NAME = "trace_events.jsonl"
+
+# Helpers injected into mesh code so scripts declare their outputs explicitly
+ARTIFACT_HELPERS_CODE = '''
+
+def _declare_artifact(entry):
+    import json
+    artifacts = []
+    if os.path.exists(_artifact_manifest_path):
+        with open(_artifact_manifest_path) as f:
+            artifacts = json.load(f)
+    artifacts.append(entry)
+    with open(_artifact_manifest_path, "w") as f:
+        json.dump(artifacts, f)
+
+
+def publish_mesh(points, cells, name="mesh"):
+    """Publish a mesh for display. cells: {cell_type: (M, k) array} or [(cell_type, array), ...]"""
+    import numpy as np
+    arrays = {"points": np.asarray(points, dtype=np.float64)}
+    items = cells.items() if isinstance(cells, dict) else cells
+    cell_types = []
+    for i, (cell_type, connectivity) in enumerate(items):
+        arrays[f"cells_{i}"] = np.asarray(connectivity, dtype=np.int64)
+        cell_types.append(str(cell_type))
+    arrays["cell_types"] = np.array(cell_types, dtype=str)
+    path = os.path.join(output_dir, f"{name}.npz")
+    np.savez(path, **arrays)
+    _declare_artifact({"name": name, "kind": "mesh", "path": path})
+    return path
+
+
+def publish_file(path, name=None):
+    """Publish a mesh file (.vtk, .vtu, .msh, .stl) written by the script for display"""
+    path = os.path.abspath(path)
+    _declare_artifact({"name": name or os.path.basename(path), "kind": "file", "path": path})
+    return path
+'''
 
 
 class CodeExecutionResult:
     """Container for code execution results"""
-    
-    def __init__(self, success: bool, stdout: str, stderr: str, 
-                 exit_code: int, execution_time: float, error_message: str = ""):
+
+    def __init__(
+        self,
+        success: bool,
+        stdout: str,
+        stderr: str,
+        exit_code: int,
+        execution_time: float,
+        error_message: str = "",
+        peak_rss_bytes: int = 0,
+        user_cpu_time: float = 0.0,
+        system_cpu_time: float = 0.0,
+        child_process_count: int = 0,
+        artifacts: Optional[list[dict[str, str]]] = None,
+        output_dir: str = "",
+        cached: bool = False,
+    ):
         self.success = success
         self.stdout = stdout
         self.stderr = stderr
@@ -19,116 +118,148 @@ class CodeExecutionResult:
         self.execution_time = execution_time
         self.error_message = error_message
 
+        # Resource usage of the child process tree
+        self.peak_rss_bytes = peak_rss_bytes
+        self.user_cpu_time = user_cpu_time
+        self.system_cpu_time = system_cpu_time
+        self.child_process_count = child_process_count
+
+        # Outputs declared by the script through publish_mesh/publish_file
+        self.artifacts = artifacts or []
+        self.output_dir = output_dir
+        self.cached = cached  # True when served from the execution cache
+
+    def to_dict(self) -> dict:
+        """Convert result to a dictionary suitable for Trame state"""
+        return {
+            "success": self.success,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "exit_code": self.exit_code,
+            "execution_time": self.execution_time,
+            "error_message": self.error_message,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "user_cpu_time": self.user_cpu_time,
+            "system_cpu_time": self.system_cpu_time,
+            "child_process_count": self.child_process_count,
+            "artifacts": self.artifacts,
+            "cached": self.cached,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, cached: bool = False) -> "CodeExecutionResult":
+        """Rebuild a result from the dictionary produced by to_dict()"""
+        fields = {key: value for key, value in data.items() if key != "cached"}
+        return cls(cached=cached, **fields)
+
+
+class ResourceLimits:
+    """Per-run resource limits applied to child processes (POSIX only)
+
+    A value of 0 or None leaves the corresponding limit unset.
+    """
+
+    def __init__(
+        self,
+        max_memory_mb: Optional[int] = CODE_EXEC_MAX_MEMORY_MB,
+        max_cpu_seconds: Optional[int] = CODE_EXEC_MAX_CPU_SECONDS,
+        max_open_files: Optional[int] = CODE_EXEC_MAX_OPEN_FILES,
+        max_file_size_mb: Optional[int] = CODE_EXEC_MAX_FILE_SIZE_MB,
+    ):
+        self.max_memory_mb = max_memory_mb  # RLIMIT_AS
+        self.max_cpu_seconds = max_cpu_seconds  # RLIMIT_CPU
+        self.max_open_files = max_open_files  # RLIMIT_NOFILE
+        self.max_file_size_mb = (
+            max_file_size_mb  # RLIMIT_FSIZE, caps files written by the script
+        )
+
+    def as_rlimits(self) -> dict[int, int]:
+        """Map configured limits to resource.RLIMIT_* values"""
+        if resource is None:
+            return {}
+
+        limits = {}
+        if self.max_memory_mb:
+            limits[resource.RLIMIT_AS] = self.max_memory_mb * 1024 * 1024
+        if self.max_cpu_seconds:
+            limits[resource.RLIMIT_CPU] = self.max_cpu_seconds
+        if self.max_open_files:
+            limits[resource.RLIMIT_NOFILE] = self.max_open_files
+        if self.max_file_size_mb:
+            limits[resource.RLIMIT_FSIZE] = self.max_file_size_mb * 1024 * 1024
+        return limits
+
+    def to_dict(self) -> dict[str, Optional[int]]:
+        """Get configured limits as a dictionary"""
+        return {
+            "max_memory_mb": self.max_memory_mb,
+            "max_cpu_seconds": self.max_cpu_seconds,
+            "max_open_files": self.max_open_files,
+            "max_file_size_mb": self.max_file_size_mb,
+        }
+
 
 class CodeExecutionService:
     """Simple service for executing Python code strings"""
-    
-    def __init__(self, default_timeout: int = 60):
+
+    def __init__(
+        self,
+        default_timeout: int = 60,
+        resource_limits: Optional[ResourceLimits] = None,
+        cache: Optional[ExecutionCache] = None,
+        file_service=None,
+    ):
         self.default_timeout = default_timeout
+        self.file_service = file_service  # Resolves the session's uploads, if given
         self.max_output_size = 1024 * 1024  # 1MB max output
-        
-    def execute_code(self, code: str, args: Optional[List[str]] = None,
-                    timeout: Optional[int] = None, working_dir: Optional[str] = None,
-                    env_vars: Optional[Dict[str, str]] = None) -> CodeExecutionResult:
+        self.resource_limits = resource_limits or ResourceLimits()
+
+        # Result memoization for execute_mesh_code is opt-in
+        if cache is None and CODE_EXEC_CACHE_ENABLED:
+            cache = ExecutionCache(
+                CODE_EXEC_CACHE_DIR, CODE_EXEC_CACHE_MAX_MB * 1024 * 1024
+            )
+        self.cache = cache
+
+        # Persistent interpreter, started on the first persistent execution
+        self.kernel: Optional[KernelSession] = None
+
+    def execute_code(
+        self,
+        code: str,
+        args: Optional[list[str]] = None,
+        timeout: Optional[int] = None,
+        working_dir: Optional[str] = None,
+        env_vars: Optional[dict[str, str]] = None,
+    ) -> CodeExecutionResult:
         """
         Execute Python code from a string
-        
+
         Args:
             code: Python code string to execute
             args: List of command line arguments
             timeout: Maximum execution time in seconds
             working_dir: Working directory for execution
             env_vars: Additional environment variables
-            
+
         Returns:
             CodeExecutionResult containing execution details
         """
-        print(f">>> CODE_EXECUTION_SERVICE: Starting execution ({len(code)} chars)")
-        
-        # Set up execution parameters
-        timeout = timeout or self.default_timeout
-        working_dir = working_dir or os.getcwd()
-        args = args or []
-        
-        # Create temporary file with the code
-        temp_script_path = None
-        try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
-                temp_file.write(code)
-                temp_script_path = temp_file.name
-            
-            print(f">>> CODE_EXECUTION_SERVICE: Created temporary script: {temp_script_path}")
-            
-            # Build command
-            cmd = ["python", temp_script_path] + args
-            
-            # Set up environment
-            env = os.environ.copy()
-            if env_vars:
-                env.update(env_vars)
-            
-            start_time = time.time()
-            
-            # Execute the script
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=working_dir,
-                env=env,
-                text=True,
-                universal_newlines=True
-            )
-            
-            try:
-                stdout, stderr = process.communicate(timeout=timeout)
-                exit_code = process.returncode
-                execution_time = time.time() - start_time
-                
-                # Truncate output if too large
-                stdout = self._truncate_output(stdout)
-                stderr = self._truncate_output(stderr)
-                
-                success = exit_code == 0
-                
-                if success:
-                    print(f">>> CODE_EXECUTION_SERVICE: Code executed successfully in {execution_time:.2f}s")
-                else:
-                    print(f">>> CODE_EXECUTION_SERVICE: Code failed with exit code {exit_code}")
-                
-                return CodeExecutionResult(success, stdout, stderr, exit_code, execution_time)
-                
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
-                execution_time = time.time() - start_time
-                error_msg = f"Code execution timed out after {timeout} seconds"
-                print(f">>> CODE_EXECUTION_SERVICE: {error_msg}")
-                return CodeExecutionResult(False, "", error_msg, -1, execution_time, error_msg)
-                
-        except Exception as e:
-            execution_time = time.time() - start_time if 'start_time' in locals() else 0
-            error_msg = f"Error executing code: {str(e)}"
-            print(f">>> CODE_EXECUTION_SERVICE: {error_msg}")
-            return CodeExecutionResult(False, "", error_msg, -1, execution_time, error_msg)
-            
-        finally:
-            # Clean up temporary file
-            if temp_script_path and os.path.exists(temp_script_path):
-                try:
-                    os.unlink(temp_script_path)
-                    print(f">>> CODE_EXECUTION_SERVICE: Cleaned up temporary script")
-                except:
-                    pass
-    
-    def execute_code_with_input(self, code: str, stdin_input: str,
-                               args: Optional[List[str]] = None,
-                               timeout: Optional[int] = None,
-                               working_dir: Optional[str] = None,
-                               env_vars: Optional[Dict[str, str]] = None) -> CodeExecutionResult:
+        logger.debug("Starting execution (%d chars)", len(code))
+        return self._execute(code, args, timeout, working_dir, env_vars)
+
+    def execute_code_with_input(
+        self,
+        code: str,
+        stdin_input: str,
+        args: Optional[list[str]] = None,
+        timeout: Optional[int] = None,
+        working_dir: Optional[str] = None,
+        env_vars: Optional[dict[str, str]] = None,
+    ) -> CodeExecutionResult:
         """
         Execute Python code from a string with stdin input
-        
+
         Args:
             code: Python code string to execute
             stdin_input: Input to pass to the code via stdin
@@ -136,201 +267,654 @@ class CodeExecutionService:
             timeout: Maximum execution time in seconds
             working_dir: Working directory for execution
             env_vars: Additional environment variables
-            
+
         Returns:
             CodeExecutionResult containing execution details
         """
-        print(f">>> CODE_EXECUTION_SERVICE: Starting execution with stdin ({len(code)} chars)")
-        
+        logger.debug("Starting execution with stdin (%d chars)", len(code))
+        return self._execute(
+            code, args, timeout, working_dir, env_vars, stdin_input=stdin_input
+        )
+
+    def _execute(
+        self,
+        code: str,
+        args: Optional[list[str]],
+        timeout: Optional[int],
+        working_dir: Optional[str],
+        env_vars: Optional[dict[str, str]],
+        stdin_input: Optional[str] = None,
+    ) -> CodeExecutionResult:
+        """Write code to a temporary script and run it under the configured resource limits"""
         # Set up execution parameters
         timeout = timeout or self.default_timeout
         working_dir = working_dir or os.getcwd()
         args = args or []
-        
+
         # Create temporary file with the code
         temp_script_path = None
+        start_time = None
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
+            with tempfile.NamedTemporaryFile(
+                mode="w", suffix=".py", delete=False
+            ) as temp_file:
                 temp_file.write(code)
                 temp_script_path = temp_file.name
-            
-            print(f">>> CODE_EXECUTION_SERVICE: Created temporary script for stdin execution")
-            
+
+            logger.debug("Created temporary script: %s", temp_script_path)
+
             # Build command
-            cmd = ["python", temp_script_path] + args
-            
+            cmd = ["python", temp_script_path, *args]
+
             # Set up environment
             env = os.environ.copy()
             if env_vars:
                 env.update(env_vars)
-            
+
             start_time = time.time()
-            
-            # Execute the script with stdin
-            process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=working_dir,
-                env=env,
-                text=True,
-                universal_newlines=True
+            with trace_span("code_execution_service.run_process", timeout=timeout):
+                run = self._run_process(cmd, working_dir, env, timeout, stdin_input)
+            execution_time = time.time() - start_time
+
+            usage = {
+                "peak_rss_bytes": run["peak_rss_bytes"],
+                "user_cpu_time": run["user_cpu_time"],
+                "system_cpu_time": run["system_cpu_time"],
+                "child_process_count": run["child_process_count"],
+            }
+
+            if run["timed_out"]:
+                error_msg = f"Code execution timed out after {timeout} seconds"
+                logger.warning(error_msg)
+                return CodeExecutionResult(
+                    False,
+                    run["stdout"],
+                    error_msg,
+                    -1,
+                    execution_time,
+                    error_msg,
+                    **usage,
+                )
+
+            exit_code = run["exit_code"]
+            success = exit_code == 0
+
+            if success:
+                logger.info("Code executed successfully in %.2fs", execution_time)
+            else:
+                logger.warning("Code failed with exit code %s", exit_code)
+
+            logger.debug(
+                "Peak RSS %.1fMB, CPU user %.2fs / sys %.2fs, %d child processes",
+                usage["peak_rss_bytes"] / (1024 * 1024),
+                usage["user_cpu_time"],
+                usage["system_cpu_time"],
+                usage["child_process_count"],
+                extra=usage,
             )
-            
-            try:
-                stdout, stderr = process.communicate(input=stdin_input, timeout=timeout)
-                exit_code = process.returncode
-                execution_time = time.time() - start_time
-                
-                # Truncate output if too large
-                stdout = self._truncate_output(stdout)
-                stderr = self._truncate_output(stderr)
-                
-                success = exit_code == 0
-                
-                if success:
-                    print(f">>> CODE_EXECUTION_SERVICE: Code with stdin executed successfully in {execution_time:.2f}s")
-                else:
-                    print(f">>> CODE_EXECUTION_SERVICE: Code with stdin failed with exit code {exit_code}")
-                
-                return CodeExecutionResult(success, stdout, stderr, exit_code, execution_time)
-                
-            except subprocess.TimeoutExpired:
-                process.kill()
-                process.wait()
-                execution_time = time.time() - start_time
-                error_msg = f"Code execution with stdin timed out after {timeout} seconds"
-                print(f">>> CODE_EXECUTION_SERVICE: {error_msg}")
-                return CodeExecutionResult(False, "", error_msg, -1, execution_time, error_msg)
-                
+
+            return CodeExecutionResult(
+                success,
+                run["stdout"],
+                run["stderr"],
+                exit_code,
+                execution_time,
+                **usage,
+            )
+
         except Exception as e:
-            execution_time = time.time() - start_time if 'start_time' in locals() else 0
-            error_msg = f"Error executing code with stdin: {str(e)}"
-            print(f">>> CODE_EXECUTION_SERVICE: {error_msg}")
-            return CodeExecutionResult(False, "", error_msg, -1, execution_time, error_msg)
-            
+            execution_time = time.time() - start_time if start_time is not None else 0
+            error_msg = f"Error executing code: {e!s}"
+            logger.exception(error_msg)
+            return CodeExecutionResult(
+                False, "", error_msg, -1, execution_time, error_msg
+            )
+
         finally:
             # Clean up temporary file
             if temp_script_path and os.path.exists(temp_script_path):
                 try:
                     os.unlink(temp_script_path)
-                    print(f">>> CODE_EXECUTION_SERVICE: Cleaned up temporary script")
+                    logger.debug("Cleaned up temporary script")
                 except:
                     pass
-    
-    def _truncate_output(self, output: str) -> str:
-        """Truncate output if it exceeds maximum size"""
-        if len(output) > self.max_output_size:
-            truncated = output[:self.max_output_size]
-            truncated += f"\n... [Output truncated - exceeded {self.max_output_size} bytes]"
-            return truncated
+
+    def _run_process(
+        self,
+        cmd: list[str],
+        working_dir: str,
+        env: dict[str, str],
+        timeout: int,
+        stdin_input: Optional[str] = None,
+    ) -> dict:
+        """
+        Run a command with rlimits applied and collect its output and resource usage
+
+        Output is drained by reader threads so that at most max_output_size bytes
+        per stream are ever held in memory, however much the script prints.
+        """
+        process = subprocess.Popen(
+            self._limited_command(cmd),
+            stdin=subprocess.PIPE if stdin_input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=working_dir,
+            env=env,
+            # Own process group, so a timeout also kills what the script spawned
+            start_new_session=os.name == "posix",
+        )
+
+        stdout_captured = {"chunks": [], "truncated": False}
+        stderr_captured = {"chunks": [], "truncated": False}
+        readers = [
+            threading.Thread(
+                target=self._drain_stream,
+                args=(process.stdout, stdout_captured),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._drain_stream,
+                args=(process.stderr, stderr_captured),
+                daemon=True,
+            ),
+        ]
+        if stdin_input is not None:
+            readers.append(
+                threading.Thread(
+                    target=self._feed_stdin,
+                    args=(process.stdin, stdin_input),
+                    daemon=True,
+                )
+            )
+        for reader in readers:
+            reader.start()
+
+        # Sample the process tree to count spawned children
+        descendants = set()
+        finished = threading.Event()
+        monitor = threading.Thread(
+            target=self._monitor_descendants,
+            args=(process.pid, descendants, finished),
+            daemon=True,
+        )
+        monitor.start()
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            if process.returncode is None:
+                timed_out.set()
+                kill_process_tree(process)
+
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
+
+        usage = None
+        try:
+            if hasattr(os, "wait4"):
+                _pid, status, usage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+            else:
+                process.wait()
+        finally:
+            timer.cancel()
+            finished.set()
+
+        for reader in readers:
+            reader.join(timeout=5)
+        monitor.join(timeout=1)
+
+        peak_rss_bytes = 0
+        user_cpu_time = system_cpu_time = 0.0
+        if usage is not None:
+            # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+            peak_rss_bytes = (
+                usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+            )
+            user_cpu_time = usage.ru_utime
+            system_cpu_time = usage.ru_stime
+
+        return {
+            "stdout": self._decode_output(stdout_captured),
+            "stderr": self._decode_output(stderr_captured),
+            "exit_code": process.returncode,
+            "timed_out": timed_out.is_set(),
+            "peak_rss_bytes": peak_rss_bytes,
+            "user_cpu_time": user_cpu_time,
+            "system_cpu_time": system_cpu_time,
+            "child_process_count": len(descendants),
+        }
+
+    def _limited_command(
+        self, cmd: list[str], include_cpu_limit: bool = True
+    ) -> list[str]:
+        """Prefix a command so it runs under the configured rlimits"""
+        rlimits = self.resource_limits.as_rlimits()
+        if not include_cpu_limit and resource is not None:
+            # RLIMIT_CPU is cumulative over the process lifetime
+            rlimits.pop(resource.RLIMIT_CPU, None)
+        if not rlimits:
+            return cmd
+        return ["python", "-c", RLIMIT_EXEC_CODE, json.dumps(rlimits), *cmd]
+
+    def _drain_stream(self, stream, captured: dict):
+        """Read a pipe to EOF, keeping only the first max_output_size bytes"""
+        kept = 0
+        try:
+            for chunk in iter(lambda: stream.read(65536), b""):
+                remaining = self.max_output_size - kept
+                if len(chunk) > remaining:
+                    captured["truncated"] = True
+                    chunk = chunk[:remaining]
+                if chunk:
+                    captured["chunks"].append(chunk)
+                    kept += len(chunk)
+        finally:
+            stream.close()
+
+    def _decode_output(self, captured: dict) -> str:
+        """Join captured chunks and append a truncation notice if output was dropped"""
+        output = b"".join(captured["chunks"]).decode("utf-8", errors="replace")
+        if captured["truncated"]:
+            output += (
+                f"\n... [Output truncated - exceeded {self.max_output_size} bytes]"
+            )
         return output
-    
+
+    def _feed_stdin(self, stream, stdin_input: str):
+        """Write stdin input to the child without blocking the output readers"""
+        try:
+            stream.write(stdin_input.encode("utf-8"))
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            with contextlib.suppress(OSError):
+                stream.close()
+
+    def _monitor_descendants(
+        self, pid: int, descendants: set, finished: threading.Event
+    ):
+        """Record every descendant PID seen while the process runs (Linux /proc only)"""
+        if not os.path.isdir(f"/proc/{pid}"):
+            return
+
+        while not finished.wait(0.1):
+            pending = [pid]
+            while pending:
+                parent = pending.pop()
+                try:
+                    tasks = os.listdir(f"/proc/{parent}/task")
+                except OSError:
+                    continue
+                for tid in tasks:
+                    try:
+                        with open(f"/proc/{parent}/task/{tid}/children") as f:
+                            children = [int(c) for c in f.read().split()]
+                    except (OSError, ValueError):
+                        continue
+                    for child in children:
+                        if child not in descendants:
+                            descendants.add(child)
+                        pending.append(child)
+
     def set_timeout(self, timeout: int):
         """Set the default execution timeout"""
         self.default_timeout = max(1, timeout)  # Minimum 1 second
-        print(f">>> CODE_EXECUTION_SERVICE: Set timeout to {self.default_timeout}s")
-    
+        logger.info("Set timeout to %ds", self.default_timeout)
+
     def set_max_output_size(self, size: int):
         """Set the maximum output size"""
         self.max_output_size = max(1024, size)  # Minimum 1KB
-        print(f">>> CODE_EXECUTION_SERVICE: Set max output size to {self.max_output_size} bytes")
-    
-    def _get_mesh_file_context(self) -> Dict[str, str]:
+        logger.info("Set max output size to %d bytes", self.max_output_size)
+
+    def set_resource_limits(self, resource_limits: ResourceLimits):
+        """Set the resource limits applied to child processes"""
+        self.resource_limits = resource_limits
+        logger.info("Set resource limits to %s", resource_limits.to_dict())
+
+    def _get_mesh_file_context(self) -> dict[str, str]:
         """Get context information about available mesh files"""
         context = {}
-        
+
         # Check for uploaded STL file
-        uploaded_stl_path = os.path.join(CURRENT_DIRECTORY, "uploaded.stl")
+        if self.file_service is not None:
+            uploaded_stl_path = self.file_service.get_uploaded_stl_file()
+        else:
+            uploaded_stl_path = os.path.join(CURRENT_DIRECTORY, "uploaded.stl")
         blade_stl_path = os.path.join(CURRENT_DIRECTORY, "blade.stl")
-        
+
         if os.path.exists(uploaded_stl_path):
-            context['UPLOADED_STL_PATH'] = uploaded_stl_path
-            context['HAS_UPLOADED_STL'] = 'true'
-            print(f">>> CODE_EXECUTION_SERVICE: Found STL file: {uploaded_stl_path}")
+            context["UPLOADED_STL_PATH"] = uploaded_stl_path
+            context["HAS_UPLOADED_STL"] = "true"
+            logger.debug("Found STL file: %s", uploaded_stl_path)
         elif os.path.exists(blade_stl_path):
-            context['UPLOADED_STL_PATH'] = blade_stl_path
-            context['HAS_UPLOADED_STL'] = 'true'
-            print(f">>> CODE_EXECUTION_SERVICE: Using default STL file: {blade_stl_path}")
+            context["UPLOADED_STL_PATH"] = blade_stl_path
+            context["HAS_UPLOADED_STL"] = "true"
+            logger.debug("Using default STL file: %s", blade_stl_path)
         else:
-            context['UPLOADED_STL_PATH'] = ''
-            context['HAS_UPLOADED_STL'] = 'false'
-            print(f">>> CODE_EXECUTION_SERVICE: No STL file found at: {uploaded_stl_path}")
-        
+            context["UPLOADED_STL_PATH"] = ""
+            context["HAS_UPLOADED_STL"] = "false"
+            logger.debug("No STL file found at: %s", uploaded_stl_path)
+
         # Check for uploaded VTU file
-        uploaded_vtu_path = os.path.join(CURRENT_DIRECTORY, "cad_000.vtu")
+        if self.file_service is not None:
+            uploaded_vtu_path = self.file_service.get_current_vtu_file()
+        else:
+            uploaded_vtu_path = os.path.join(CURRENT_DIRECTORY, "cad_000.vtu")
         if os.path.exists(uploaded_vtu_path):
-            context['UPLOADED_VTU_PATH'] = uploaded_vtu_path
-            context['HAS_UPLOADED_VTU'] = 'true'
-            print(f">>> CODE_EXECUTION_SERVICE: Found VTU file: {uploaded_vtu_path}")
+            context["UPLOADED_VTU_PATH"] = uploaded_vtu_path
+            context["HAS_UPLOADED_VTU"] = "true"
+            logger.debug("Found VTU file: %s", uploaded_vtu_path)
         else:
-            context['UPLOADED_VTU_PATH'] = ''
-            context['HAS_UPLOADED_VTU'] = 'false'
-        
+            context["UPLOADED_VTU_PATH"] = ""
+            context["HAS_UPLOADED_VTU"] = "false"
+
         # Set working directory
-        context['MESH_WORKING_DIR'] = CURRENT_DIRECTORY
-        
+        context["MESH_WORKING_DIR"] = CURRENT_DIRECTORY
+
         return context
-    
-    def _prepare_code_with_context(self, code: str) -> str:
+
+    def _prepare_code_with_context(
+        self, code: str, file_context: Optional[dict[str, str]] = None
+    ) -> str:
         """Prepare code with mesh file context variables"""
-        file_context = self._get_mesh_file_context()
-        
+        file_context = file_context or self._get_mesh_file_context()
+        output_dir = file_context.get(
+            "MESH_OUTPUT_DIR", file_context["MESH_WORKING_DIR"]
+        )
+
         # Create context setup code
-        context_code = f'''
+        context_code = (
+            f'''
 # Auto-generated mesh file context
 import os
 import sys
 
 # File paths (automatically set based on uploads)
-uploaded_stl_path = "{file_context['UPLOADED_STL_PATH']}"
-uploaded_vtu_path = "{file_context['UPLOADED_VTU_PATH']}"
-working_dir = "{file_context['MESH_WORKING_DIR']}"
-has_uploaded_stl = {file_context['HAS_UPLOADED_STL'] == 'true'}
-has_uploaded_vtu = {file_context['HAS_UPLOADED_VTU'] == 'true'}
-
+uploaded_stl_path = "{file_context["UPLOADED_STL_PATH"]}"
+uploaded_vtu_path = "{file_context["UPLOADED_VTU_PATH"]}"
+working_dir = "{file_context["MESH_WORKING_DIR"]}"
+output_dir = {output_dir!r}
+_artifact_manifest_path = os.path.join(output_dir, {ARTIFACT_MANIFEST_NAME!r})
+has_uploaded_stl = {file_context["HAS_UPLOADED_STL"] == "true"}
+has_uploaded_vtu = {file_context["HAS_UPLOADED_VTU"] == "true"}
+'''
+            + ARTIFACT_HELPERS_CODE
+            + TRACE_HELPERS_CODE
+            + """
 # Print context for user awareness
 print(f"=== Mesh Execution Context ===")
-print(f"Working directory: {{working_dir}}")
-print(f"Has uploaded STL: {{has_uploaded_stl}}")
+print(f"Working directory: {working_dir}")
+print(f"Output directory: {output_dir}")
+print(f"Has uploaded STL: {has_uploaded_stl}")
 if has_uploaded_stl:
-    print(f"Uploaded STL file: {{uploaded_stl_path}}")
+    print(f"Uploaded STL file: {uploaded_stl_path}")
 if has_uploaded_vtu:
-    print(f"Uploaded VTU file: {{uploaded_vtu_path}}")
+    print(f"Uploaded VTU file: {uploaded_vtu_path}")
+print("Publish results with publish_mesh(points, cells) or publish_file(path), time steps with trace_span(name)")
 print("=== User Code Output ===")
 
 # User code starts below
-'''
-        
+"""
+        )
+
         return context_code + code
-    
-    def execute_mesh_code(self, code: str, timeout: Optional[int] = None, 
-                         working_dir: Optional[str] = None) -> CodeExecutionResult:
+
+    def _create_output_dir(self) -> str:
+        """Create a private output directory for one mesh code run"""
+        return tempfile.mkdtemp(prefix="khorium_run_")
+
+    def cleanup_output_dir(self, output_dir: Optional[str]):
+        """Remove a run output directory once its artifacts are no longer needed"""
+        if output_dir and os.path.isdir(output_dir):
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    def _collect_artifacts(self, output_dir: str) -> list[dict[str, str]]:
+        """Read the artifact manifest written by publish_mesh/publish_file"""
+        manifest_path = os.path.join(output_dir, ARTIFACT_MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return []
+
+        try:
+            with open(manifest_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Invalid artifact manifest: %s", e)
+            return []
+
+        artifacts = []
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict) or entry.get("kind") not in ("mesh", "file"):
+                continue
+            path = entry.get("path", "")
+            if not path or not os.path.isfile(path):
+                logger.warning("Declared artifact is missing: %s", path)
+                continue
+            artifacts.append(
+                {
+                    "name": str(entry.get("name") or os.path.basename(path)),
+                    "kind": entry["kind"],
+                    "path": path,
+                }
+            )
+
+        logger.debug("Collected %d declared artifacts", len(artifacts))
+        return artifacts
+
+    @traced("code_execution_service.execute_mesh_code")
+    def execute_mesh_code(
+        self,
+        code: str,
+        timeout: Optional[int] = None,
+        working_dir: Optional[str] = None,
+        bypass_cache: bool = False,
+        persistent: bool = False,
+    ) -> CodeExecutionResult:
         """
         Execute Python code with mesh file context
-        
+
+        Each run gets a private output directory, and only the artifacts the
+        script declares through publish_mesh/publish_file are returned.
+
         Args:
             code: Python code string to execute
             timeout: Maximum execution time in seconds
-            working_dir: Working directory for execution (defaults to CURRENT_DIRECTORY)
-            
+            working_dir: Working directory for execution (defaults to the app directory)
+            bypass_cache: Always execute, even if a cached result exists
+            persistent: Run in the persistent kernel so interpreter state carries
+                        over between executions (POSIX only)
+
         Returns:
-            CodeExecutionResult containing execution details
+            CodeExecutionResult containing execution details and declared artifacts
         """
-        # Use default mesh working directory if not specified
-        if not working_dir:
-            working_dir = CURRENT_DIRECTORY
-        
         # Get mesh file context as environment variables
         env_vars = self._get_mesh_file_context()
-        
+
+        if persistent and os.name != "posix":
+            logger.warning("Persistent kernel requires POSIX, using a fresh process")
+            persistent = False
+
+        # Results of stateful kernel executions depend on earlier cells, so never cache them
+        cache_key = None
+        if self.cache is not None and not persistent:
+            cache_key = self.cache.make_key(
+                code,
+                [env_vars["UPLOADED_STL_PATH"], env_vars["UPLOADED_VTU_PATH"]],
+                # Whether a run succeeds depends on the limits it ran under
+                extra=json.dumps(
+                    [
+                        working_dir or "",
+                        timeout or self.default_timeout,
+                        self.resource_limits.to_dict(),
+                    ],
+                    sort_keys=True,
+                ),
+            )
+            cached = None if bypass_cache else self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Cache hit for mesh code (%s)", cache_key[:12])
+                return CodeExecutionResult.from_dict(cached, cached=True)
+
+        output_dir = self._create_output_dir()
+
+        # Relative paths in scripts keep resolving against the app directory,
+        # published outputs go to the private output directory
+        if not working_dir:
+            working_dir = env_vars["MESH_WORKING_DIR"]
+
+        env_vars["MESH_OUTPUT_DIR"] = output_dir
+        env_vars["MESH_WORKING_DIR"] = working_dir
+        trace_file = os.path.join(output_dir, TRACE_EVENTS_NAME)
+        env_vars.update(get_tracer().get_worker_env(trace_file))
+
         # Prepare code with context variables
-        enhanced_code = self._prepare_code_with_context(code)
-        
-        print(f">>> CODE_EXECUTION_SERVICE: Executing mesh code with STL context")
-        print(f">>> CODE_EXECUTION_SERVICE: Working dir: {working_dir}")
-        print(f">>> CODE_EXECUTION_SERVICE: Has STL: {env_vars['HAS_UPLOADED_STL']}")
-        print(f">>> CODE_EXECUTION_SERVICE: Has VTU: {env_vars['HAS_UPLOADED_VTU']}")
-        
-        return self.execute_code(enhanced_code, timeout=timeout, working_dir=working_dir, env_vars=env_vars)
\ No newline at end of file
+        enhanced_code = self._prepare_code_with_context(code, env_vars)
+
+        logger.debug(
+            "Executing mesh code in %s (has STL: %s, has VTU: %s)",
+            working_dir,
+            env_vars["HAS_UPLOADED_STL"],
+            env_vars["HAS_UPLOADED_VTU"],
+        )
+
+        if persistent:
+            result = self._execute_in_kernel(
+                enhanced_code, timeout, working_dir, env_vars
+            )
+        else:
+            result = self.execute_code(
+                enhanced_code,
+                timeout=timeout,
+                working_dir=working_dir,
+                env_vars=env_vars,
+            )
+        result.output_dir = output_dir
+        get_tracer().collect_worker_events(trace_file)
+        result.artifacts = self._collect_artifacts(output_dir)
+
+        # Only successful runs are worth replaying
+        if cache_key is not None and result.success:
+            try:
+                self.cache.put(cache_key, result.to_dict())
+                logger.debug("Cached mesh code result (%s)", cache_key[:12])
+            except OSError as e:
+                logger.warning("Error caching result: %s", e)
+        return result
+
+    def _get_kernel(self) -> KernelSession:
+        """Get the persistent kernel session, creating it on first use"""
+        if self.kernel is None:
+            self.kernel = KernelSession(
+                idle_timeout=CODE_EXEC_KERNEL_IDLE_TIMEOUT,
+                max_memory_mb=CODE_EXEC_KERNEL_MAX_MEMORY_MB,
+                wrap_command=lambda cmd: self._limited_command(
+                    cmd, include_cpu_limit=False
+                ),
+            )
+        return self.kernel
+
+    def _execute_in_kernel(
+        self,
+        code: str,
+        timeout: Optional[int],
+        working_dir: str,
+        env_vars: dict[str, str],
+    ) -> CodeExecutionResult:
+        """Execute code in the persistent kernel, keeping interpreter state between calls"""
+        timeout = timeout or self.default_timeout
+        kernel = self._get_kernel()
+        kernel.start()
+        logger.debug(
+            "Executing in persistent kernel (pid %s, %d previous executions)",
+            kernel.pid,
+            kernel.execution_count,
+        )
+
+        descendants = set()
+        finished = threading.Event()
+        monitor = threading.Thread(
+            target=self._monitor_descendants,
+            args=(kernel.pid, descendants, finished),
+            daemon=True,
+        )
+        monitor.start()
+
+        start_time = time.time()
+        try:
+            with trace_span("code_execution_service.kernel_execute", pid=kernel.pid):
+                run = kernel.execute(code, working_dir, env_vars, timeout)
+        finally:
+            finished.set()
+        execution_time = time.time() - start_time
+        monitor.join(timeout=1)
+
+        try:
+            stdout = self._decode_output(self._read_capture(run["stdout_path"]))
+            stderr = self._decode_output(self._read_capture(run["stderr_path"]))
+        finally:
+            shutil.rmtree(run["capture_dir"], ignore_errors=True)
+
+        usage = {
+            "peak_rss_bytes": run["peak_rss_bytes"],
+            "user_cpu_time": run["user_cpu_time"],
+            "system_cpu_time": run["system_cpu_time"],
+            "child_process_count": len(descendants),
+        }
+
+        error_msg = ""
+        if run["timed_out"]:
+            error_msg = f"Code execution timed out after {timeout} seconds, kernel state was reset"
+        elif run["kernel_died"]:
+            error_msg = "Kernel process died during execution, kernel state was reset"
+        elif run["memory_cap_exceeded"]:
+            error_msg = f"Kernel exceeded {kernel.max_memory_mb}MB after execution, kernel state was reset"
+
+        if error_msg:
+            logger.warning(error_msg)
+
+        # Exceeding the memory cap after a successful cell still returns its output
+        success = run["exit_code"] == 0 and not (run["timed_out"] or run["kernel_died"])
+        if success:
+            logger.info("Kernel execution succeeded in %.2fs", execution_time)
+        else:
+            logger.warning(
+                "Kernel execution failed with exit code %s", run["exit_code"]
+            )
+        return CodeExecutionResult(
+            success,
+            stdout,
+            stderr or error_msg,
+            run["exit_code"],
+            execution_time,
+            error_msg,
+            **usage,
+        )
+
+    def _read_capture(self, path: str) -> dict:
+        """Read a capture file into the structure used by _decode_output"""
+        captured = {"chunks": [], "truncated": False}
+        try:
+            with open(path, "rb") as f:
+                data = f.read(self.max_output_size + 1)
+        except OSError:
+            return captured
+        if len(data) > self.max_output_size:
+            captured["truncated"] = True
+            data = data[: self.max_output_size]
+        captured["chunks"].append(data)
+        return captured
+
+    def restart_kernel(self):
+        """Discard persistent kernel state and start a fresh kernel"""
+        self._get_kernel().restart()
+
+    def shutdown_kernel(self):
+        """Stop the persistent kernel if it is running"""
+        if self.kernel is not None:
+            self.kernel.shutdown()
+
+    def get_kernel_status(self) -> dict:
+        """Get the persistent kernel status for state reporting"""
+        if self.kernel is None:
+            return {"alive": False, "pid": None, "execution_count": 0}
+        return self.kernel.get_status()
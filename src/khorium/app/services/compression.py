@@ -0,0 +1,200 @@
+import hashlib
+import os
+import zipfile
+import zlib
+from typing import BinaryIO, Callable, Optional
+
+# Compressed upload suffixes and the codec used for each
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+    ".zip": "zip",
+}
+
+# Codecs that can be decoded incrementally as chunks arrive; zip needs the
+# central directory at the end of the archive and is extracted once complete
+STREAMING_CODECS = ("gzip", "zstd")
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# zstd input is decoded in slices this small because a decompressobj returns
+# all the output of its input at once: an RLE block of 4 bytes expands to
+# 128 KiB, so a slice produces at most about 8 MiB before the size limit check
+ZSTD_INPUT_SLICE = 256
+
+
+class DecompressionError(OSError):
+    """Raised when a compressed upload is invalid or decompresses past the size limit"""
+
+
+def split_compression_suffix(filename: str) -> tuple[str, Optional[str]]:
+    """
+    Split a compression suffix off a file name
+
+    Returns:
+        (inner file name, codec) such as ("part.stl", "gzip") for "part.stl.gz",
+        or (filename, None) for uncompressed files
+    """
+    stem, ext = os.path.splitext(filename)
+    codec = COMPRESSION_SUFFIXES.get(ext.lower())
+    if codec is None:
+        return filename, None
+    return stem, codec
+
+
+class StreamDecompressor:
+    """
+    Incremental gzip/zstd decoder emitting bounded output chunks
+
+    Each call to feed() passes decompressed data to a sink in chunks of at most
+    CHUNK_SIZE bytes, so neither the input nor the output is held in memory.
+    """
+
+    def __init__(self, codec: str, max_output_bytes: int = 0):
+        self.codec = codec
+        self.max_output_bytes = max_output_bytes  # 0 disables the limit
+        self.output_bytes = 0
+        self._sink: Optional[Callable[[bytes], None]] = None
+
+        if codec == "gzip":
+            self._obj = zlib.decompressobj(GZIP_WBITS)
+        elif codec == "zstd":
+            try:
+                import zstandard
+            except ImportError as e:
+                msg = "Zstandard uploads require the 'zstandard' package"
+                raise DecompressionError(msg) from e
+            self._zstd_error = zstandard.ZstdError
+            self._zstd = zstandard.ZstdDecompressor()
+            self._obj = self._zstd.decompressobj()
+        else:
+            msg = f"Codec {codec} cannot be decoded incrementally"
+            raise DecompressionError(msg)
+
+    def feed(self, data: bytes, sink: Callable[[bytes], None]):
+        """Decompress a chunk of input, passing the output to sink"""
+        self._sink = sink
+        try:
+            if self.codec == "gzip":
+                self._feed_gzip(data)
+            else:
+                self._feed_zstd(data)
+        except zlib.error as e:
+            msg = f"Invalid gzip data: {e}"
+            raise DecompressionError(msg) from e
+        except Exception as e:
+            if self.codec == "zstd" and isinstance(e, self._zstd_error):
+                msg = f"Invalid zstd data: {e}"
+                raise DecompressionError(msg) from e
+            raise
+
+    def finish(self, sink: Callable[[bytes], None]):
+        """Flush remaining output and check the stream was complete"""
+        self._sink = sink
+        if not self._obj.eof:
+            msg = f"Truncated {self.codec} stream"
+            raise DecompressionError(msg)
+
+    def _feed_gzip(self, data: bytes):
+        while True:
+            out = self._obj.decompress(data, CHUNK_SIZE)
+            self._emit(out)
+            if self._obj.eof:
+                # Concatenated gzip members decode as one stream
+                data = self._obj.unused_data
+                if not data:
+                    return
+                self._obj = zlib.decompressobj(GZIP_WBITS)
+            else:
+                data = self._obj.unconsumed_tail
+                if not data and len(out) < CHUNK_SIZE:
+                    return
+
+    def _feed_zstd(self, data: bytes):
+        view = memoryview(data)
+        for start in range(0, len(view), ZSTD_INPUT_SLICE):
+            piece = view[start : start + ZSTD_INPUT_SLICE]
+            while piece:
+                if self._obj.eof:
+                    # Concatenated frames decode as one stream
+                    self._obj = self._zstd.decompressobj()
+                out = self._obj.decompress(piece)
+                for offset in range(0, len(out), CHUNK_SIZE):
+                    self._emit(out[offset : offset + CHUNK_SIZE])
+                piece = self._obj.unused_data if self._obj.eof else b""
+
+    def _emit(self, data: bytes):
+        if not data:
+            return
+        self.output_bytes += len(data)
+        if self.max_output_bytes and self.output_bytes > self.max_output_bytes:
+            msg = f"Decompressed size exceeds the {self.max_output_bytes} byte limit"
+            raise DecompressionError(msg)
+        self._sink(data)
+
+
+def decompress_stream(
+    source: BinaryIO, target_path: str, codec: str, max_output_bytes: int = 0
+) -> tuple[str, int, Optional[str]]:
+    """
+    Decompress a file object to target_path chunk by chunk
+
+    Args:
+        source: Readable binary file object with the compressed data
+                (must be seekable for zip archives)
+        target_path: Where to write the decompressed content
+        codec: "gzip", "zstd" or "zip"
+        max_output_bytes: Reject archives that decompress past this size (0 disables)
+
+    Returns:
+        (SHA-256 of the decompressed content, its size, archive member name or None)
+
+    Raises:
+        DecompressionError: If the data is invalid, too large, or a zip archive
+                            does not contain exactly one file
+    """
+    digest = hashlib.sha256()
+    with open(target_path, "wb") as target:
+
+        def sink(data: bytes):
+            digest.update(data)
+            target.write(data)
+
+        if codec == "zip":
+            member_name, size = _extract_single_member(source, sink, max_output_bytes)
+            return digest.hexdigest(), size, member_name
+
+        decompressor = StreamDecompressor(codec, max_output_bytes)
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            decompressor.feed(chunk, sink)
+        decompressor.finish(sink)
+        return digest.hexdigest(), decompressor.output_bytes, None
+
+
+def _extract_single_member(
+    source: BinaryIO, sink: Callable[[bytes], None], max_output_bytes: int
+) -> tuple[str, int]:
+    try:
+        with zipfile.ZipFile(source) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            if len(members) != 1:
+                msg = f"Zip uploads must contain exactly one file, found {len(members)}"
+                raise DecompressionError(msg)
+            member = members[0]
+            if max_output_bytes and member.file_size > max_output_bytes:
+                msg = f"Decompressed size exceeds the {max_output_bytes} byte limit"
+                raise DecompressionError(msg)
+
+            size = 0
+            with archive.open(member) as stream:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if max_output_bytes and size > max_output_bytes:
+                        msg = f"Decompressed size exceeds the {max_output_bytes} byte limit"
+                        raise DecompressionError(msg)
+                    sink(chunk)
+            return os.path.basename(member.filename), size
+    except (zipfile.BadZipFile, zlib.error) as e:
+        msg = f"Invalid zip archive: {e}"
+        raise DecompressionError(msg) from e
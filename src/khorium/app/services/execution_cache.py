@@ -0,0 +1,166 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+from typing import Optional
+
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ExecutionCache:
+    """Size-bounded on-disk cache of mesh code execution results and artifacts
+
+    Entries are keyed by a hash of the code, the content of its input files
+    and the interpreter/package versions, and evicted least-recently-used first.
+    """
+
+    RESULT_FILE = "result.json"
+    VERSIONED_PACKAGES = ("gmsh", "numpy", "vtk", "meshio")
+    FILE_HASH_MEMO_SIZE = 256  # Input files whose content hash is remembered
+
+    def __init__(self, cache_dir: str, max_size_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._file_hashes: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+        self._environment_fingerprint = self._get_environment_fingerprint()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_environment_fingerprint(self) -> str:
+        """Describe the interpreter and package versions that affect results"""
+        parts = [sys.version, shutil.which("python") or ""]
+        for package in self.VERSIONED_PACKAGES:
+            try:
+                parts.append(f"{package}=={metadata.version(package)}")
+            except metadata.PackageNotFoundError:
+                parts.append(f"{package}==none")
+        return "\n".join(parts)
+
+    def _hash_file(self, path: str) -> str:
+        """Hash file content, reusing the previous hash while size and mtime are unchanged"""
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._file_hashes.get(path)
+            if cached:
+                self._file_hashes.move_to_end(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+        with self._lock:
+            self._file_hashes[path] = (stat.st_size, stat.st_mtime_ns, file_hash)
+            self._file_hashes.move_to_end(path)
+            while len(self._file_hashes) > self.FILE_HASH_MEMO_SIZE:
+                self._file_hashes.popitem(last=False)
+        return file_hash
+
+    def make_key(self, code: str, input_files: list[str], extra: str = "") -> str:
+        """Build the cache key for a code string and the files it can read"""
+        digest = hashlib.sha256()
+        digest.update(self._environment_fingerprint.encode())
+        digest.update(b"\0" + code.encode())
+        digest.update(b"\0" + extra.encode())
+        # Only the content counts, the same upload stored under another path is a hit
+        file_hashes = [
+            self._hash_file(p) if os.path.isfile(p) else "missing"
+            for p in input_files
+            if p
+        ]
+        for file_hash in sorted(file_hashes):
+            digest.update(f"\0{file_hash}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the stored result dictionary for a key, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        result_path = os.path.join(entry_dir, self.RESULT_FILE)
+        with self._lock:
+            try:
+                with open(result_path) as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                return None
+
+            # Drop entries whose artifacts were removed behind our back
+            if not all(os.path.isfile(a["path"]) for a in result.get("artifacts", [])):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+
+            # Touch the entry so eviction is least-recently-used
+            now = time.time()
+            os.utime(entry_dir, (now, now))
+            return result
+
+    def put(self, key: str, result: dict) -> dict:
+        """
+        Store a result dictionary and copy its artifacts into the cache
+
+        Returns:
+            The stored result with artifact paths pointing into the cache
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        with self._lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.makedirs(entry_dir)
+
+            stored = dict(result)
+            stored_artifacts = []
+            for i, artifact in enumerate(result.get("artifacts", [])):
+                target = os.path.join(
+                    entry_dir, f"{i}_{os.path.basename(artifact['path'])}"
+                )
+                shutil.copy2(artifact["path"], target)
+                stored_artifacts.append({**artifact, "path": target})
+            stored["artifacts"] = stored_artifacts
+
+            with open(os.path.join(entry_dir, self.RESULT_FILE), "w") as f:
+                json.dump(stored, f)
+
+            self._evict(keep=key)
+            return stored
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def _entry_size(self, entry_dir: str) -> int:
+        """Total size in bytes of the files in a cache entry"""
+        total = 0
+        for name in os.listdir(entry_dir):
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(entry_dir, name))
+        return total
+
+    def _evict(self, keep: str):
+        """Evict least-recently-used entries until the cache fits max_size_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if os.path.isdir(entry_dir):
+                entries.append(
+                    (os.path.getmtime(entry_dir), name, self._entry_size(entry_dir))
+                )
+
+        total = sum(size for _mtime, _name, size in entries)
+        for _mtime, name, size in sorted(entries):
+            if total <= self.max_size_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+            logger.debug("Evicted entry %s (%d bytes)", name[:12], size)
@@ -0,0 +1,284 @@
+import asyncio
+import contextvars
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Host-wide slots are POSIX only
+    fcntl = None
+
+from khorium.app.config import (
+    CODE_EXEC_MAX_CONCURRENT,
+    CODE_EXEC_MAX_PER_SESSION,
+    CODE_EXEC_MAX_QUEUED_PER_SESSION,
+    CODE_EXEC_SLOTS_DIR,
+)
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a session already has its maximum number of queued executions"""
+
+
+class HostSlots:
+    """Host-wide concurrency slots shared by every Khorium process via file locks"""
+
+    def __init__(self, slots_dir: str, count: int):
+        self.slots_dir = slots_dir
+        self.count = count
+        os.makedirs(slots_dir, exist_ok=True)
+
+    def try_acquire(self) -> Optional[int]:
+        """Lock a free slot without blocking, returning its file descriptor"""
+        for i in range(self.count):
+            fd = os.open(
+                os.path.join(self.slots_dir, f"slot_{i}.lock"),
+                os.O_RDWR | os.O_CREAT,
+                0o644,
+            )
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        return None
+
+    def release(self, fd: int):
+        """Release a slot acquired with try_acquire"""
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class _Ticket:
+    """A queued execution request"""
+
+    def __init__(
+        self,
+        seq: int,
+        session_id: str,
+        on_queue_update: Optional[Callable[[int, int], None]],
+    ):
+        self.seq = seq
+        self.session_id = session_id
+        self.on_queue_update = on_queue_update
+        self.enqueued_at = time.monotonic()
+        self.admitted = asyncio.get_running_loop().create_future()
+        self.slot_fd = None
+        self.position = None
+
+
+class ExecutionScheduler:
+    """
+    Bounded, fair admission control in front of CodeExecutionService
+
+    At most max_concurrent executions run at once and each session may run at
+    most max_per_session and queue at most max_queued_per_session. Waiting
+    requests are admitted FIFO, except that sessions with fewer running
+    executions go first so one busy session cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_per_session: int = 1,
+        max_queued_per_session: int = 4,
+        host_slots: Optional[HostSlots] = None,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_session = max(1, max_per_session)
+        self.max_queued_per_session = max(1, max_queued_per_session)
+        self.host_slots = host_slots
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="khorium-exec"
+        )
+        self._seq = itertools.count()
+        self._waiting: list[_Ticket] = []
+        self._running: dict[str, int] = {}
+        self._retry_handle = None
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+
+    async def run(
+        self,
+        session_id: str,
+        fn: Callable[..., Any],
+        *args,
+        on_queue_update: Optional[Callable[[int, int], None]] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Wait for admission, then run fn(*args, **kwargs) in the worker pool
+
+        Args:
+            session_id: Identifier used for per-session quotas and fairness
+            fn: Blocking callable to run once admitted
+            on_queue_update: Called with (position, queue_depth) while waiting;
+                             position 0 means the request is now running
+
+        Raises:
+            QueueFullError: If the session already has too many queued requests
+        """
+        queued = sum(1 for t in self._waiting if t.session_id == session_id)
+        if queued >= self.max_queued_per_session:
+            self._rejected += 1
+            msg = f"Session already has {queued} queued executions (limit {self.max_queued_per_session})"
+            raise QueueFullError(msg)
+
+        ticket = _Ticket(next(self._seq), session_id, on_queue_update)
+        self._waiting.append(ticket)
+        self._submitted += 1
+        self._dispatch()
+
+        try:
+            await ticket.admitted
+        except asyncio.CancelledError:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                self._dispatch()
+                raise
+            # Admitted concurrently with the cancellation, give the slot back
+            self._release(ticket)
+            raise
+
+        wait_time = time.monotonic() - ticket.enqueued_at
+        self._record_wait(wait_time)
+        logger.debug(
+            "Admitted session %s after %.2fs (%d running, %d waiting)",
+            session_id,
+            wait_time,
+            self.running_count,
+            len(self._waiting),
+        )
+
+        try:
+            loop = asyncio.get_running_loop()
+            # Run in the caller's context so spans of the execution join its trace
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                self._executor, partial(context.run, fn, *args, **kwargs)
+            )
+        finally:
+            self._completed += 1
+            self._release(ticket)
+
+    @property
+    def running_count(self) -> int:
+        return sum(self._running.values())
+
+    def _admission_order(self) -> list[_Ticket]:
+        """Waiting tickets in the order they will be admitted"""
+        return sorted(
+            self._waiting, key=lambda t: (self._running.get(t.session_id, 0), t.seq)
+        )
+
+    def _dispatch(self):
+        """Admit as many waiting requests as the limits allow and publish queue positions"""
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+
+        blocked_on_host = False
+        for ticket in self._admission_order():
+            if self.running_count >= self.max_concurrent:
+                break
+            if self._running.get(ticket.session_id, 0) >= self.max_per_session:
+                continue
+
+            if self.host_slots is not None:
+                ticket.slot_fd = self.host_slots.try_acquire()
+                if ticket.slot_fd is None:
+                    blocked_on_host = True
+                    break
+
+            self._waiting.remove(ticket)
+            self._running[ticket.session_id] = (
+                self._running.get(ticket.session_id, 0) + 1
+            )
+            if ticket.on_queue_update:
+                ticket.on_queue_update(0, len(self._waiting))
+            ticket.admitted.set_result(True)
+
+        # Other processes hold the host slots, poll until one frees up
+        if blocked_on_host:
+            self._retry_handle = asyncio.get_running_loop().call_later(
+                0.5, self._dispatch
+            )
+
+        self._publish_positions()
+
+    def _publish_positions(self):
+        """Notify waiting requests whose queue position changed"""
+        depth = len(self._waiting)
+        for position, ticket in enumerate(self._admission_order(), start=1):
+            if ticket.position != position and ticket.on_queue_update:
+                ticket.on_queue_update(position, depth)
+            ticket.position = position
+
+    def _release(self, ticket: _Ticket):
+        """Free the slots held by a finished request and admit the next ones"""
+        if ticket.slot_fd is not None:
+            self.host_slots.release(ticket.slot_fd)
+            ticket.slot_fd = None
+        remaining = self._running.get(ticket.session_id, 0) - 1
+        if remaining > 0:
+            self._running[ticket.session_id] = remaining
+        else:
+            self._running.pop(ticket.session_id, None)
+        self._dispatch()
+
+    def _record_wait(self, wait_time: float):
+        self._wait_count += 1
+        self._wait_total += wait_time
+        self._wait_max = max(self._wait_max, wait_time)
+        self._last_wait = wait_time
+
+    def get_metrics(self) -> dict[str, Any]:
+        """Get queue depth, throughput and wait-time metrics"""
+        return {
+            "queue_depth": len(self._waiting),
+            "running": self.running_count,
+            "max_concurrent": self.max_concurrent,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "wait_time_avg": self._wait_total / self._wait_count
+            if self._wait_count
+            else 0.0,
+            "wait_time_max": self._wait_max,
+            "wait_time_last": self._last_wait,
+        }
+
+
+_default_scheduler = None
+
+
+def get_execution_scheduler() -> ExecutionScheduler:
+    """Get the process-wide scheduler configured from the environment"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        host_slots = None
+        if CODE_EXEC_SLOTS_DIR and fcntl is not None:
+            host_slots = HostSlots(CODE_EXEC_SLOTS_DIR, CODE_EXEC_MAX_CONCURRENT)
+        _default_scheduler = ExecutionScheduler(
+            max_concurrent=CODE_EXEC_MAX_CONCURRENT,
+            max_per_session=CODE_EXEC_MAX_PER_SESSION,
+            max_queued_per_session=CODE_EXEC_MAX_QUEUED_PER_SESSION,
+            host_slots=host_slots,
+        )
+    return _default_scheduler
@@ -1,89 +1,552 @@
+import hashlib
+import io
 import os
 import re
-import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 from trame.app.file_upload import ClientFile
 
+from khorium.app.config import UPLOAD_INGEST_WORKERS, UPLOAD_MAX_DECOMPRESSED_MB
 from khorium.app.core.constants import CURRENT_DIRECTORY
+from khorium.app.services.compression import (
+    STREAMING_CODECS,
+    DecompressionError,
+    StreamDecompressor,
+    decompress_stream,
+    split_compression_suffix,
+)
+from khorium.app.services.upload_store import UploadStore, get_upload_store
+from khorium.app.services.upload_validation import (
+    UploadValidationError,
+    validate_mesh_bytes,
+    validate_mesh_file,
+)
+from khorium.app.utils.log import get_logger
+from khorium.app.utils.tracing import traced
+
+logger = get_logger(__name__)
+
+# Logical names under which a session sees its uploads in the store
+UPLOADED_STL_NAME = "uploaded.stl"
+UPLOADED_VTU_NAME = "cad_000.vtu"
+PART_NAME_PREFIX = "part_"  # Parts of a multi-file upload
+
+
+class ChunkedUpload:
+    """
+    In-flight chunked upload written to a partial file in the store's staging area
+
+    gzip and zstd uploads are decompressed as chunks arrive; zip uploads are
+    spooled compressed and extracted when the upload completes.
+    """
+
+    def __init__(
+        self,
+        upload_id: str,
+        filename: str,
+        temp_path: str,
+        total_size: int,
+        max_decompressed_bytes: int = 0,
+    ):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.total_size = total_size
+        self.received = 0
+        self.started_at = time.time()
+        self.hasher = (
+            hashlib.sha256()
+        )  # Over the bytes as sent, for checksum verification
+        self.content_hasher = hashlib.sha256()  # Over the decompressed content
+        self.temp_path = temp_path
+        self.max_decompressed_bytes = max_decompressed_bytes
+
+        self.stored_name, self.codec = split_compression_suffix(filename)
+        self.decompressor = None
+        if self.codec in STREAMING_CODECS:
+            self.decompressor = StreamDecompressor(self.codec, max_decompressed_bytes)
+        self.spool_path = f"{temp_path}.zip" if self.codec == "zip" else None
+        self._file = open(self.spool_path or self.temp_path, "wb")
+
+    def write(self, data: bytes):
+        """Write a chunk and feed it to the running hash"""
+        self.hasher.update(data)
+        self.received += len(data)
+        if self.decompressor is not None:
+            self.decompressor.feed(data, self._write_content)
+        elif self.codec == "zip":
+            self._file.write(data)
+        else:
+            self._write_content(data)
+
+    def _write_content(self, data: bytes):
+        self.content_hasher.update(data)
+        self._file.write(data)
+
+    def close(self) -> str:
+        """Finish decompression and close the partial file, returning the content SHA-256"""
+        if self.decompressor is not None:
+            self.decompressor.finish(self._write_content)
+        self._file.close()
+        if self.codec != "zip":
+            return self.content_hasher.hexdigest()
+
+        with open(self.spool_path, "rb") as source:
+            content_hash, _size, self.stored_name = decompress_stream(
+                source, self.temp_path, "zip", self.max_decompressed_bytes
+            )
+        os.remove(self.spool_path)
+        return content_hash
+
+    def abort(self):
+        """Close and delete the partial files"""
+        self._file.close()
+        for path in (self.temp_path, self.spool_path):
+            try:
+                if path:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def get_progress(self) -> dict[str, Any]:
+        elapsed = time.time() - self.started_at
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "received": self.received,
+            "total": self.total_size,
+            "percent": 100.0 * self.received / self.total_size
+            if self.total_size
+            else 0.0,
+            "bytes_per_second": self.received / elapsed if elapsed > 0 else 0.0,
+        }
 
 
 class FileService:
-    """Service for handling file operations"""
-    
-    def __init__(self):
-        pass
-    
+    """Service for handling file operations within one session's upload namespace"""
+
+    def __init__(self, session_id: str = "default", store: UploadStore | None = None):
+        self.session_id = session_id
+        self.store = store or get_upload_store()
+        self.content_hashes: dict[
+            str, str
+        ] = {}  # SHA-256 of the last upload per stored path
+        self._uploads: dict[str, ChunkedUpload] = {}
+        self._ingest_executor = None
+        self.last_error = ""  # Reason the most recent upload was rejected
+
+    @traced("file_service.process_uploaded_files")
     def process_uploaded_files(self, files) -> str | None:
         """
         Process uploaded files and save to target location
-        
+
         Args:
             files: List of uploaded files from Trame
-            
+
         Returns:
             Path to processed file if successful, None otherwise
         """
+        self.last_error = ""
         if not files or len(files) == 0:
-            print(">>> FILE_SERVICE: No files selected for upload")
+            logger.warning("No files selected for upload")
             return None
-        
+
         if len(files) > 1:
-            print(">>> FILE_SERVICE: Multiple files detected, processing only the first one")
-        
+            logger.warning(
+                "Multiple files detected, processing only the first one (use ingest_file for batches)"
+            )
+
         # Process only the first file
         file = files[0]
         file_helper = ClientFile(file)
-        print(f">>> FILE_SERVICE: Uploading file: {file_helper.info}")
+        logger.info("Uploading file: %s", file_helper.info)
 
         # Get filename - file_helper.info might be a string or dict
         filename = self._extract_filename(file_helper, file)
-        
-        # Validate file extension
-        if not (filename.lower().endswith(".vtu") or filename.lower().endswith(".stl")):
-            print(f">>> FILE_SERVICE: Invalid file format. Expected .vtu or .stl, got: {filename}")
+
+        error = self._validate_upload(filename, file_helper.content)
+        if error:
+            self._reject(error)
+            return None
+
+        try:
+            return self._store_upload(filename, file_helper.content)
+        except (OSError, UploadValidationError) as e:
+            self._reject(f"Error storing uploaded file {filename}: {e}")
             return None
 
+    def begin_batch(self):
+        """Release the parts of a previous multi-file upload before ingesting a new one"""
+        for name in self.store.list_names(self.session_id):
+            if name.startswith(PART_NAME_PREFIX):
+                self.store.release(self.session_id, name)
+
+    @traced("file_service.ingest_file")
+    def ingest_file(
+        self, index: int, file, parse: Callable[[str], Any] | None = None
+    ) -> dict[str, Any]:
+        """
+        Validate, store and optionally parse one file of a multi-file upload
+
+        Safe to call concurrently from ingest_executor workers. Each file is
+        stored under its own logical name so the parts of an assembly coexist.
+
+        Args:
+            index: Position of the file in the batch
+            file: Uploaded file from Trame
+            parse: Called with the stored path, its return value is kept as "dataset"
+
+        Returns:
+            Dictionary with the file name, status ("loaded", "stored" or "failed"),
+            error message, stored path, SHA-256, size, per-stage timings and dataset
+        """
+        started = time.perf_counter()
+        file_helper = ClientFile(file)
+        filename = self._extract_filename(file_helper, file)
+        result = {
+            "index": index,
+            "filename": filename,
+            "status": "failed",
+            "error": "",
+            "path": None,
+            "sha256": "",
+            "size": len(file_helper.content or b""),
+            "timings": {},
+            "dataset": None,
+        }
+
+        error = self._validate_upload(filename, file_helper.content)
+        result["timings"]["validate"] = time.perf_counter() - started
+        if error:
+            result["error"] = error
+            return result
+
+        stage_start = time.perf_counter()
+        try:
+            target_file_path = self._store_upload(
+                filename, file_helper.content, f"{PART_NAME_PREFIX}{index:03d}_"
+            )
+        except UploadValidationError as e:
+            result["error"] = str(e)
+            return result
+        except OSError as e:
+            result["error"] = f"Error storing file: {e}"
+            return result
+        result["timings"]["store"] = time.perf_counter() - stage_start
+        result["path"] = target_file_path
+        result["sha256"] = self.content_hashes.get(target_file_path, "")
+        result["status"] = "stored"
+
+        if parse is not None:
+            stage_start = time.perf_counter()
+            try:
+                result["dataset"] = parse(target_file_path)
+            except (ValueError, RuntimeError, OSError) as e:
+                result["status"] = "failed"
+                result["error"] = f"Error parsing file: {e}"
+                return result
+            finally:
+                result["timings"]["parse"] = time.perf_counter() - stage_start
+            result["status"] = "loaded"
+
+        result["timings"]["total"] = time.perf_counter() - started
+        return result
+
+    @property
+    def ingest_executor(self) -> ThreadPoolExecutor:
+        """Worker pool for multi-file uploads, created on first use"""
+        if self._ingest_executor is None:
+            self._ingest_executor = ThreadPoolExecutor(
+                max_workers=max(1, UPLOAD_INGEST_WORKERS),
+                thread_name_prefix="khorium-ingest",
+            )
+        return self._ingest_executor
+
+    def _validate_upload(self, filename: str, content: bytes) -> str | None:
+        """Check an in-memory upload before storing it, returning an error message if invalid"""
+        # Validate file extension
+        if not self._is_supported_file(filename):
+            return f"Invalid file format. Expected .vtu or .stl (optionally .gz, .zst or .zip), got: {filename}"
+
         # Validate file content
-        if not file_helper.content or len(file_helper.content) == 0:
-            print(f">>> FILE_SERVICE: Error - Empty file: {filename}")
+        if not content or len(content) == 0:
+            return f"Error - Empty file: {filename}"
+
+        # Compressed uploads are checked once decompressed
+        if split_compression_suffix(filename)[1]:
+            return None
+        return validate_mesh_bytes(content, filename)
+
+    def _store_upload(
+        self, filename: str, content: bytes, name_prefix: str = ""
+    ) -> str:
+        """
+        Store an in-memory upload, decompressing it if needed
+
+        Returns:
+            Path to the stored file
+
+        Raises:
+            OSError: If the upload cannot be decompressed or stored
+            UploadValidationError: If the decompressed content fails header validation
+        """
+        if split_compression_suffix(filename)[1]:
+            target_file_path = self._store_compressed(filename, content, name_prefix)
+        else:
+            # Store by content; identical content already in the store is not written again
+            target_file_path = self.store.put_bytes(
+                self.session_id,
+                name_prefix + self.get_logical_name(filename),
+                content,
+                self._get_extension(filename),
+            )
+
+        content_hash = self._hash_from_path(target_file_path)
+        self.content_hashes[target_file_path] = content_hash
+        logger.info("Stored %s (sha256 %s)", filename, content_hash[:12])
+        return target_file_path
+
+    def _store_compressed(
+        self, filename: str, content: bytes, name_prefix: str = ""
+    ) -> str:
+        """Decompress an in-memory upload into the staging area and move it into the store"""
+        _, codec = split_compression_suffix(filename)
+        temp_file_path = self.store.staging_path(f"{uuid.uuid4().hex}.part")
+        try:
+            content_hash, size, member_name = decompress_stream(
+                io.BytesIO(content),
+                temp_file_path,
+                codec,
+                UPLOAD_MAX_DECOMPRESSED_MB * 1024 * 1024,
+            )
+            stored_name = member_name or split_compression_suffix(filename)[0]
+            if not self._is_uncompressed_mesh_file(stored_name):
+                msg = f"Invalid archive content. Expected .vtu or .stl, got: {stored_name}"
+                raise DecompressionError(msg)
+            error = validate_mesh_file(temp_file_path, stored_name)
+            if error:
+                raise UploadValidationError(error)
+            logger.info("Decompressed %s: %d -> %d bytes", filename, len(content), size)
+            return self.store.put_file(
+                self.session_id,
+                name_prefix + self.get_logical_name(stored_name),
+                temp_file_path,
+                content_hash,
+                self._get_extension(stored_name),
+            )
+        except (OSError, ValueError):
+            self._cleanup_temp_file(temp_file_path)
+            raise
+
+    def get_logical_name(self, filename: str) -> str:
+        """Determine the session-level name of an upload based on file type"""
+        filename = split_compression_suffix(filename)[0]
+        if self.is_stl_file(filename):
+            return UPLOADED_STL_NAME
+        return UPLOADED_VTU_NAME
+
+    def link_existing_upload(self, filename: str, sha256: str) -> str | None:
+        """
+        Reuse content that is already stored, without transferring it again
+
+        Returns:
+            Path to the stored file if the content is known, None otherwise
+        """
+        # Hashes identify decompressed content, which is unknown for zip archives
+        if (
+            not self._is_uncompressed_mesh_file(split_compression_suffix(filename)[0])
+            or not sha256
+        ):
+            return None
+        try:
+            target_file_path = self.store.link_existing(
+                self.session_id,
+                self.get_logical_name(filename),
+                sha256.lower(),
+                self._get_extension(filename),
+            )
+        except OSError as e:
+            logger.error("Error linking stored upload: %s", e)
             return None
 
-        # Save the uploaded file temporarily
-        if not file_helper.name:
-            print(">>> FILE_SERVICE: Error - No temporary file name available")
+        if target_file_path:
+            self.content_hashes[target_file_path] = sha256.lower()
+            logger.info(
+                "Reused stored content for %s (sha256 %s)", filename, sha256[:12]
+            )
+        return target_file_path
+
+    def release_uploads(self):
+        """Drop this session's uploads from the store"""
+        self.store.release_session(self.session_id)
+
+    # Chunked streaming upload protocol
+    def begin_chunked_upload(self, filename: str, total_size: int) -> str | None:
+        """
+        Start a chunked upload that streams to the store's staging area
+
+        Args:
+            filename: Original file name, used to validate and route the upload
+            total_size: Expected size in bytes
+
+        Returns:
+            Upload id to pass to write_chunk/finish_chunked_upload, None if rejected
+        """
+        if not self._is_supported_file(filename):
+            self._reject(
+                f"Invalid file format. Expected .vtu or .stl (optionally .gz, .zst or .zip), got: {filename}"
+            )
+            return None
+        if total_size <= 0:
+            self._reject(f"Error - Empty file: {filename}")
             return None
 
+        upload_id = uuid.uuid4().hex
         try:
-            with open(file_helper.name, "wb") as f:
-                f.write(file_helper.content)
-            temp_file_path = file_helper.name
-            print(f">>> FILE_SERVICE: File saved temporarily to: {temp_file_path}")
-        except IOError as e:
-            print(f">>> FILE_SERVICE: Error saving temporary file: {e}")
+            upload = ChunkedUpload(
+                upload_id,
+                filename,
+                self.store.staging_path(f"{upload_id}.part"),
+                total_size,
+                max_decompressed_bytes=UPLOAD_MAX_DECOMPRESSED_MB * 1024 * 1024,
+            )
+        except OSError as e:
+            self._reject(f"Error starting chunked upload: {e}")
             return None
 
-        # Determine target file path based on file type
-        if filename.lower().endswith(".stl"):
-            target_file_path = os.path.join(CURRENT_DIRECTORY, "uploaded.stl")
-        else:
-            target_file_path = os.path.join(CURRENT_DIRECTORY, "cad_000.vtu")
+        self._uploads[upload_id] = upload
+        logger.info(
+            "Started chunked upload %s for %s (%d bytes)",
+            upload_id,
+            filename,
+            total_size,
+        )
+        return upload_id
+
+    def write_chunk(self, upload_id: str, offset: int, data: bytes) -> bool:
+        """Append a chunk to an upload; chunks must arrive in order"""
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            self._reject(f"Unknown upload id: {upload_id}")
+            return False
+        if offset != upload.received:
+            self._reject(
+                f"Out of order chunk for {upload_id}: offset {offset}, expected {upload.received}"
+            )
+            return False
+        if upload.received + len(data) > upload.total_size:
+            self._reject(f"Chunk exceeds declared size for {upload_id}")
+            self.abort_chunked_upload(upload_id)
+            return False
+
         try:
-            shutil.copy2(temp_file_path, target_file_path)
-            print(f">>> FILE_SERVICE: Replaced {target_file_path} with uploaded file")
+            upload.write(data)
+        except OSError as e:
+            self._reject(f"Error writing chunk for {upload_id}: {e}")
+            self.abort_chunked_upload(upload_id)
+            return False
+        return True
 
-            # Verify file was written correctly
-            if not os.path.exists(target_file_path) or os.path.getsize(target_file_path) == 0:
-                print(">>> FILE_SERVICE: Error - Target file not properly written")
-                return None
+    @traced("file_service.finish_chunked_upload")
+    def finish_chunked_upload(
+        self, upload_id: str, expected_sha256: str | None = None
+    ) -> str | None:
+        """
+        Complete an upload and move it into the store
 
-        except (IOError, OSError) as e:
-            print(f">>> FILE_SERVICE: Error copying file to target: {e}")
+        Returns:
+            Path to processed file if successful, None otherwise
+        """
+        self.last_error = ""
+        upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            self._reject(f"Unknown upload id: {upload_id}")
+            return None
+
+        if upload.received != upload.total_size:
+            self._reject(
+                f"Upload {upload_id} incomplete: {upload.received}/{upload.total_size} bytes"
+            )
+            upload.abort()
+            return None
+
+        received_hash = upload.hasher.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != received_hash:
+            self._reject(
+                f"Checksum mismatch for {upload_id}: expected {expected_sha256}, got {received_hash}"
+            )
+            upload.abort()
+            return None
+
+        try:
+            content_hash = upload.close()
+            if not self._is_uncompressed_mesh_file(upload.stored_name):
+                self._reject(
+                    f"Invalid archive content. Expected .vtu or .stl, got: {upload.stored_name}"
+                )
+                upload.abort()
+                return None
+            error = validate_mesh_file(upload.temp_path, upload.stored_name)
+            if error:
+                self._reject(error)
+                upload.abort()
+                return None
+            target_file_path = self.store.put_file(
+                self.session_id,
+                self.get_logical_name(upload.stored_name),
+                upload.temp_path,
+                content_hash,
+                self._get_extension(upload.stored_name),
+            )
+        except OSError as e:
+            self._reject(f"Error finalizing upload {upload_id}: {e}")
+            upload.abort()
             return None
 
-        # Clean up temporary file
-        self._cleanup_temp_file(temp_file_path)
-        
+        self.content_hashes[target_file_path] = content_hash
+        logger.info(
+            "Completed chunked upload %s (sha256 %s)", upload_id, content_hash[:12]
+        )
         return target_file_path
-    
+
+    def abort_chunked_upload(self, upload_id: str):
+        """Cancel an upload and remove its partial file"""
+        upload = self._uploads.pop(upload_id, None)
+        if upload is not None:
+            upload.abort()
+            logger.info("Aborted chunked upload %s", upload_id)
+
+    def get_upload_progress(self, upload_id: str) -> dict[str, Any]:
+        """Get progress information for an in-flight upload"""
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            return {}
+        return upload.get_progress()
+
+    def _is_supported_file(self, filename: str) -> bool:
+        """Check if filename has a supported upload extension, optionally compressed"""
+        stored_name, codec = split_compression_suffix(filename)
+        if codec == "zip":
+            return True  # The archive member is checked once extracted
+        return self._is_uncompressed_mesh_file(stored_name)
+
+    def _is_uncompressed_mesh_file(self, filename: str) -> bool:
+        return filename.lower().endswith(".vtu") or filename.lower().endswith(".stl")
+
+    def _reject(self, message: str):
+        """Report why an upload was rejected"""
+        self.last_error = message
+        logger.warning("Upload rejected: %s", message)
+
+    def _get_extension(self, filename: str) -> str:
+        return os.path.splitext(filename)[1].lower()
+
+    def _hash_from_path(self, stored_path: str) -> str:
+        """Stored files are named after their SHA-256"""
+        return os.path.splitext(os.path.basename(stored_path))[0]
+
     def _extract_filename(self, file_helper: ClientFile, file) -> str:
         """Extract filename from file helper or file object"""
         filename = ""
@@ -93,33 +556,34 @@ class FileService:
             # If info is a string like "File: cad_378.vtu of size 5639377 and type "
             # Extract the filename from the string
             match = re.search(r"File: ([^\s]+)", file_helper.info)
-            if match:
-                filename = match.group(1)
-            else:
-                filename = file_helper.info
+            filename = match.group(1) if match else file_helper.info
         else:
             # Try to get name attribute from the file object
             filename = getattr(file, "name", "")
-        
+
         return filename
-    
+
     def _cleanup_temp_file(self, temp_file_path: str):
         """Clean up temporary file"""
         try:
             if temp_file_path:
                 os.remove(temp_file_path)
-            print(f">>> FILE_SERVICE: Cleaned up temporary file: {temp_file_path}")
+            logger.debug("Cleaned up temporary file: %s", temp_file_path)
         except OSError:
             pass  # Ignore if temp file cleanup fails
-    
+
     def get_current_vtu_file(self) -> str:
-        """Get path to current VTU file"""
-        return os.path.join(CURRENT_DIRECTORY, "cad_000.vtu")
-    
+        """Get path to the session's current VTU file, falling back to the bundled one"""
+        return self.store.resolve(self.session_id, UPLOADED_VTU_NAME) or os.path.join(
+            CURRENT_DIRECTORY, UPLOADED_VTU_NAME
+        )
+
     def get_uploaded_stl_file(self) -> str:
-        """Get path to uploaded STL file"""
-        return os.path.join(CURRENT_DIRECTORY, "uploaded.stl")
-    
+        """Get path to the session's uploaded STL file, falling back to the bundled location"""
+        return self.store.resolve(self.session_id, UPLOADED_STL_NAME) or os.path.join(
+            CURRENT_DIRECTORY, UPLOADED_STL_NAME
+        )
+
     def is_stl_file(self, filename: str) -> bool:
         """Check if filename is an STL file"""
-        return filename.lower().endswith(".stl")
\ No newline at end of file
+        return filename.lower().endswith(".stl")
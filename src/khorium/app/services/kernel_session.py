@@ -0,0 +1,275 @@
+import json
+import os
+import select
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Runs inside the kernel process: executes cells in one persistent namespace.
+# Requests arrive as JSON lines on stdin, responses go to a dedicated pipe so
+# user output (including output from C extensions such as gmsh) cannot corrupt
+# the protocol; fds 1 and 2 are redirected to per-cell capture files.
+KERNEL_BOOTSTRAP_CODE = r"""
+import json, os, sys, traceback
+try:
+    import resource
+except ImportError:
+    resource = None
+
+responses = os.fdopen(int(os.environ["KHORIUM_KERNEL_FD"]), "w")
+commands = os.fdopen(os.dup(0), "r")
+sys.stdin = open(os.devnull)
+namespace = {"__name__": "__main__"}
+saved_stdout, saved_stderr = os.dup(1), os.dup(2)
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+for line in commands:
+    request = json.loads(line)
+    os.environ.update(request.get("env", {}))
+    os.chdir(request["working_dir"])
+    before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    exit_code = 0
+    with open(request["stdout_path"], "wb") as out, open(request["stderr_path"], "wb") as err:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            exec(compile(request["code"], "<mesh-code>", "exec"), namespace)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_stdout, 1)
+            os.dup2(saved_stderr, 2)
+    after = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    responses.write(json.dumps({
+        "exit_code": exit_code,
+        "peak_rss_bytes": after.ru_maxrss * rss_scale if after else 0,
+        "current_rss_bytes": current_rss_bytes(),
+        "user_cpu_time": after.ru_utime - before.ru_utime if after else 0.0,
+        "system_cpu_time": after.ru_stime - before.ru_stime if after else 0.0,
+    }) + "\n")
+    responses.flush()
+"""
+
+
+def kill_process_tree(process: subprocess.Popen):
+    """Kill a process started with start_new_session together with its process group"""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+class KernelSession:
+    """Persistent Python interpreter that keeps state between mesh code executions
+
+    The kernel is started lazily, shut down after idle_timeout seconds without
+    use, and restarted when it exceeds max_memory_mb or a cell times out.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float,
+        max_memory_mb: Optional[int] = None,
+        wrap_command: Optional[Callable[[list[str]], list[str]]] = None,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_memory_mb = max_memory_mb
+        self.wrap_command = (
+            wrap_command  # E.g. to apply rlimits before the kernel starts
+        )
+        self.execution_count = 0
+        self._process = None
+        self._responses = None
+        self._idle_timer = None
+        self._last_used = time.monotonic()
+        self._lock = threading.RLock()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self.is_alive() else None
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Start the kernel process if it is not running"""
+        with self._lock:
+            if self.is_alive():
+                return
+
+            read_fd, write_fd = os.pipe()
+            env = os.environ.copy()
+            env["KHORIUM_KERNEL_FD"] = str(write_fd)
+            try:
+                command = ["python", "-u", "-c", KERNEL_BOOTSTRAP_CODE]
+                self._process = subprocess.Popen(
+                    self.wrap_command(command) if self.wrap_command else command,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=env,
+                    pass_fds=(write_fd,),
+                    start_new_session=os.name == "posix",
+                    text=True,
+                )
+            finally:
+                os.close(write_fd)
+            self._responses = os.fdopen(read_fd, "r")
+            self.execution_count = 0
+            logger.info("Started kernel (pid %d)", self._process.pid)
+
+    def shutdown(self, reason: str = "shutdown", force: bool = False):
+        """Stop the kernel process, discarding its interpreter state"""
+        with self._lock:
+            self._cancel_idle_timer()
+            if self._process is None:
+                return
+
+            if not force and self._process.poll() is None:
+                # Closing stdin ends the command loop for a clean exit
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            if self._process.poll() is None:
+                kill_process_tree(self._process)
+                self._process.wait()
+            logger.info("Kernel (pid %d) stopped: %s", self._process.pid, reason)
+
+            if self._responses is not None:
+                self._responses.close()
+            self._process = None
+            self._responses = None
+
+    def restart(self):
+        """Discard interpreter state and start a fresh kernel"""
+        with self._lock:
+            self.shutdown("restart requested")
+            self.start()
+
+    def execute(
+        self, code: str, working_dir: str, env: dict[str, str], timeout: float
+    ) -> dict:
+        """
+        Execute code in the persistent namespace
+
+        Returns:
+            Dictionary with the paths of the captured stdout/stderr files, the
+            exit code, CPU times and memory figures, and whether the cell timed
+            out, the kernel died or the memory cap was exceeded
+        """
+        with self._lock:
+            self._cancel_idle_timer()
+            self.start()
+
+            capture_dir = tempfile.mkdtemp(prefix="khorium_kernel_")
+            stdout_path = os.path.join(capture_dir, "stdout")
+            stderr_path = os.path.join(capture_dir, "stderr")
+            request = {
+                "code": code,
+                "working_dir": working_dir,
+                "env": env,
+                "stdout_path": stdout_path,
+                "stderr_path": stderr_path,
+            }
+
+            response = None
+            timed_out = False
+            try:
+                self._process.stdin.write(json.dumps(request) + "\n")
+                self._process.stdin.flush()
+
+                ready, _, _ = select.select([self._responses], [], [], timeout)
+                if ready:
+                    line = self._responses.readline()
+                    response = json.loads(line) if line else None
+                else:
+                    timed_out = True
+            except (OSError, ValueError) as e:
+                logger.warning("Kernel communication failed: %s", e)
+
+            result = {
+                "stdout_path": stdout_path,
+                "stderr_path": stderr_path,
+                "capture_dir": capture_dir,
+                "timed_out": timed_out,
+                "kernel_died": response is None and not timed_out,
+                "exit_code": response["exit_code"] if response else -1,
+                "peak_rss_bytes": response["peak_rss_bytes"] if response else 0,
+                "user_cpu_time": response["user_cpu_time"] if response else 0.0,
+                "system_cpu_time": response["system_cpu_time"] if response else 0.0,
+                "memory_cap_exceeded": False,
+            }
+
+            if response is None:
+                # A hung or crashed kernel has unknown state, start over next time
+                self.shutdown("timed out" if timed_out else "kernel died", force=True)
+                return result
+
+            self.execution_count += 1
+            if (
+                self.max_memory_mb
+                and response["current_rss_bytes"] > self.max_memory_mb * 1024 * 1024
+            ):
+                result["memory_cap_exceeded"] = True
+                self.shutdown(f"memory cap of {self.max_memory_mb}MB exceeded")
+            else:
+                self._schedule_idle_shutdown()
+            return result
+
+    def _schedule_idle_shutdown(self):
+        """Shut the kernel down if it is not used again within idle_timeout"""
+        if not self.idle_timeout:
+            return
+        self._last_used = time.monotonic()
+        self._idle_timer = threading.Timer(self.idle_timeout, self._shutdown_if_idle)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _shutdown_if_idle(self):
+        """Idle timer callback, ignoring timers that raced with a new execution"""
+        with self._lock:
+            if time.monotonic() - self._last_used >= self.idle_timeout:
+                self.shutdown("idle timeout")
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def get_status(self) -> dict:
+        """Get a summary of the kernel for state reporting"""
+        return {
+            "alive": self.is_alive(),
+            "pid": self.pid,
+            "execution_count": self.execution_count,
+            "idle_timeout": self.idle_timeout,
+            "max_memory_mb": self.max_memory_mb,
+        }
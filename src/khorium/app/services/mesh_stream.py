@@ -0,0 +1,253 @@
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Optional
+
+import numpy as np
+
+from khorium.app.config import (
+    MESH_STREAM_CHUNK_BYTES,
+    MESH_STREAM_IDLE_TIMEOUT,
+    MESH_STREAM_MAX_CHUNKS_PER_REQUEST,
+    MESH_STREAM_MAX_OPEN,
+)
+from khorium.app.core.mesh_data import extract_mesh_arrays
+
+MESH_ARRAYS = ("points", "connectivity", "offsets", "cell_types")
+POINT_FORMATS = ("float32", "float16", "uint16")
+INDEX_FORMATS = ("int32", "auto")
+
+# Smallest chunk accepted from a client, so a stream cannot be split into millions of messages
+MIN_CHUNK_BYTES = 16 * 1024
+FLOAT16_MAX = 65504.0
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class MeshStream:
+    """A snapshot of one mesh encoded as typed arrays, handed out in chunks"""
+
+    def __init__(
+        self,
+        arrays: dict[str, np.ndarray],
+        components: dict[str, int],
+        chunk_bytes: int,
+        header: dict[str, Any],
+    ):
+        self.id = uuid.uuid4().hex
+        # Chunks address flat elements, points are (N, 3)
+        self.arrays = {name: array.reshape(-1) for name, array in arrays.items()}
+        self.header = header
+        self.last_used = time.monotonic()
+        self.next_seq = 0
+        # (array name, first element, element count) of each chunk, in sending order
+        self.chunks = []
+        for name, array in arrays.items():
+            itemsize = array.dtype.itemsize * components[name]
+            step = max(1, chunk_bytes // itemsize) * components[name]
+            for start in range(0, array.size, step):
+                self.chunks.append((name, start, min(step, array.size - start)))
+
+    def get_chunk(self, seq: int) -> dict[str, Any]:
+        name, start, count = self.chunks[seq]
+        array = self.arrays[name]
+        return {
+            "seq": seq,
+            "array": name,
+            "dtype": array.dtype.name,
+            "offset": start,
+            "count": count,
+            "data": array[start : start + count].tobytes(),
+        }
+
+
+class MeshStreamService:
+    """
+    Streams meshes to a client as binary typed-array chunks
+
+    The client pulls: open() snapshots and encodes the mesh and returns a header,
+    next() returns at most as many chunks as the client asks for, so a slow
+    consumer is never sent more than it can take. Chunks are numbered and can be
+    requested again from any sequence number, so a lost reply is recovered by
+    asking from the last chunk received. Idle streams are dropped.
+
+    Each open stream holds its own encoded copy of the mesh until it is closed,
+    expires or is evicted, so memory grows up to max_open (MESH_STREAM_MAX_OPEN)
+    times the encoded size. Clients should close streams they are done with.
+
+    Encodings (little-endian, element offsets and counts in array elements):
+        points        float32, float16, or uint16 quantized over the bounds per
+                      axis, decoded as q * scale[axis] + offset[axis]
+        connectivity  int32, or uint16 with index_format="auto" when it fits
+        offsets       int32, VTK layout with one entry per cell plus one
+        cell_types    uint8 VTK cell type ids
+    """
+
+    def __init__(
+        self,
+        chunk_bytes: int = MESH_STREAM_CHUNK_BYTES,
+        max_chunks_per_request: int = MESH_STREAM_MAX_CHUNKS_PER_REQUEST,
+        max_open: int = MESH_STREAM_MAX_OPEN,
+        idle_timeout: float = MESH_STREAM_IDLE_TIMEOUT,
+    ):
+        self.chunk_bytes = max(MIN_CHUNK_BYTES, chunk_bytes)
+        self.max_chunks_per_request = max(1, max_chunks_per_request)
+        self.max_open = max(1, max_open)
+        self.idle_timeout = idle_timeout
+        self.streams: OrderedDict[str, MeshStream] = OrderedDict()
+
+    def open(
+        self,
+        dataset,
+        point_format: str = "float32",
+        index_format: str = "int32",
+        chunk_bytes: Optional[int] = None,
+        arrays: Optional[Sequence[str]] = None,
+    ) -> dict[str, Any]:
+        """
+        Encode a dataset for streaming and describe it
+
+        Raises:
+            ValueError: If an option is not supported, float16 cannot hold the
+                        coordinates, or indices do not fit in int32
+        """
+        if point_format not in POINT_FORMATS:
+            msg = f"Unsupported point_format {point_format!r}, expected one of {POINT_FORMATS}"
+            raise ValueError(msg)
+        if index_format not in INDEX_FORMATS:
+            msg = f"Unsupported index_format {index_format!r}, expected one of {INDEX_FORMATS}"
+            raise ValueError(msg)
+        names = list(arrays or MESH_ARRAYS)
+        unknown = [name for name in names if name not in MESH_ARRAYS]
+        if unknown:
+            msg = f"Unknown mesh arrays {unknown}, expected some of {MESH_ARRAYS}"
+            raise ValueError(msg)
+        chunk_bytes = min(
+            self.chunk_bytes, max(MIN_CHUNK_BYTES, int(chunk_bytes or self.chunk_bytes))
+        )
+
+        source = extract_mesh_arrays(dataset)
+        points = source["points"]
+        bounds = [0.0] * 6
+        if len(points):
+            lower, upper = points.min(axis=0), points.max(axis=0)
+            bounds = [float(value) for pair in zip(lower, upper) for value in pair]
+
+        # Offsets count connectivity entries, which can pass 2^31 before the point count does
+        offsets = source["offsets"]
+        if len(points) > INT32_MAX or (len(offsets) and int(offsets[-1]) > INT32_MAX):
+            msg = "Mesh is too large for 32-bit connectivity and offsets"
+            raise ValueError(msg)
+
+        header: dict[str, Any] = {
+            "points": int(len(points)),
+            "cells": int(len(source["cell_types"])),
+            "bounds": bounds,
+            "point_format": point_format,
+        }
+        encoded = {}
+        if "points" in names:
+            encoded["points"] = self._encode_points(points, point_format, header)
+        index_dtype = (
+            np.uint16 if index_format == "auto" and len(points) <= 65536 else np.int32
+        )
+        if "connectivity" in names:
+            encoded["connectivity"] = source["connectivity"].astype(index_dtype)
+        if "offsets" in names:
+            encoded["offsets"] = offsets.astype(np.int32)
+        if "cell_types" in names:
+            encoded["cell_types"] = source["cell_types"]
+
+        components = {name: 3 if name == "points" else 1 for name in encoded}
+        stream = MeshStream(encoded, components, chunk_bytes, header)
+        header.update(
+            {
+                "stream_id": stream.id,
+                "chunk_bytes": chunk_bytes,
+                "total_chunks": len(stream.chunks),
+                "total_bytes": int(sum(array.nbytes for array in encoded.values())),
+                "arrays": {
+                    name: {
+                        "dtype": array.dtype.name,
+                        "length": int(array.size),
+                        "components": components[name],
+                    }
+                    for name, array in encoded.items()
+                },
+            }
+        )
+
+        self._expire()
+        self.streams[stream.id] = stream
+        while len(self.streams) > self.max_open:
+            self.streams.popitem(last=False)
+        return header
+
+    def next(
+        self, stream_id: str, max_chunks: int = 1, from_seq: Optional[int] = None
+    ) -> dict[str, Any]:
+        """
+        Get the next chunks of a stream
+
+        Args:
+            max_chunks: Chunks the client is ready to receive, capped per request
+            from_seq: Resume from this chunk instead of the one after the last sent
+
+        Raises:
+            KeyError: If the stream is unknown or expired
+        """
+        self._expire()
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            msg = f"Unknown or expired mesh stream: {stream_id}"
+            raise KeyError(msg)
+        stream.last_used = time.monotonic()
+
+        if from_seq is not None:
+            stream.next_seq = min(max(0, int(from_seq)), len(stream.chunks))
+        count = min(max(1, int(max_chunks)), self.max_chunks_per_request)
+        end = min(stream.next_seq + count, len(stream.chunks))
+        chunks: list[dict[str, Any]] = [
+            stream.get_chunk(seq) for seq in range(stream.next_seq, end)
+        ]
+        stream.next_seq = end
+
+        done = end == len(stream.chunks)
+        return {"stream_id": stream_id, "chunks": chunks, "next_seq": end, "done": done}
+
+    def close(self, stream_id: str) -> bool:
+        """Release a stream, returns False if it was unknown"""
+        return self.streams.pop(stream_id, None) is not None
+
+    def _encode_points(
+        self, points: np.ndarray, point_format: str, header: dict[str, Any]
+    ) -> np.ndarray:
+        if point_format == "float32":
+            return points.astype(np.float32)
+        if point_format == "float16":
+            if len(points) and np.abs(points).max() > FLOAT16_MAX:
+                msg = "Coordinates exceed the float16 range, use float32 or uint16"
+                raise ValueError(msg)
+            return points.astype(np.float16)
+
+        # uint16 quantized over the bounding box of each axis
+        lower = points.min(axis=0) if len(points) else np.zeros(3)
+        extent = (points.max(axis=0) - lower) if len(points) else np.zeros(3)
+        scale = np.where(extent > 0, extent / 65535.0, 0.0)
+        safe_scale = np.where(scale > 0, scale, 1.0)
+        quantized = (
+            np.rint((points - lower) / safe_scale).clip(0, 65535).astype(np.uint16)
+        )
+        header["scale"] = [float(value) for value in scale]
+        header["offset"] = [float(value) for value in lower]
+        header["max_error"] = [float(value) / 2 for value in scale]
+        return quantized
+
+    def _expire(self):
+        now = time.monotonic()
+        for stream_id in [
+            sid
+            for sid, s in self.streams.items()
+            if now - s.last_used > self.idle_timeout
+        ]:
+            del self.streams[stream_id]
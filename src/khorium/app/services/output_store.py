@@ -0,0 +1,107 @@
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from khorium.app.config import CODE_EXEC_OUTPUT_PREVIEW_CHARS, CODE_EXEC_OUTPUT_RETAINED
+
+OUTPUT_STREAMS = ("stdout", "stderr")
+DEFAULT_PAGE_CHARS = 64 * 1024
+MAX_PAGE_CHARS = 1024 * 1024
+
+
+class OutputStore:
+    """
+    Server-side storage for code execution output
+
+    Full stdout/stderr is kept here under an output id, and only a summary with
+    a short preview goes into synchronized state. Clients page through the rest
+    with read(). Offsets and lengths count characters, so a page never splits
+    a multi-byte character.
+    """
+
+    def __init__(
+        self,
+        max_outputs: int = CODE_EXEC_OUTPUT_RETAINED,
+        preview_chars: int = CODE_EXEC_OUTPUT_PREVIEW_CHARS,
+    ):
+        self.max_outputs = max(1, max_outputs)
+        self.preview_chars = preview_chars
+        self._outputs: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, stdout: str, stderr: str) -> str:
+        """Store the output of one execution, evicting the oldest beyond max_outputs"""
+        output_id = uuid.uuid4().hex
+        with self._lock:
+            self._outputs[output_id] = {"stdout": stdout or "", "stderr": stderr or ""}
+            while len(self._outputs) > self.max_outputs:
+                self._outputs.popitem(last=False)
+        return output_id
+
+    def summarize(self, output_id: str) -> dict:
+        """Handle and sizes of a stored output, with the tail of each stream as preview"""
+        with self._lock:
+            output = self._outputs.get(output_id)
+        if output is None:
+            return {}
+
+        summary = {"output_id": output_id}
+        for stream in OUTPUT_STREAMS:
+            text = output[stream]
+            summary[f"{stream}_size"] = len(text)
+            summary[f"{stream}_lines"] = text.count("\n") + (
+                1 if text and not text.endswith("\n") else 0
+            )
+            # The end of the output is usually where the result or the error is
+            summary[f"{stream}_preview"] = (
+                text[-self.preview_chars :] if self.preview_chars else ""
+            )
+            summary[f"{stream}_preview_complete"] = len(text) <= self.preview_chars
+        return summary
+
+    def read(
+        self,
+        output_id: str,
+        stream: str = "stdout",
+        offset: int = 0,
+        length: int = DEFAULT_PAGE_CHARS,
+    ) -> Optional[dict]:
+        """
+        Read a page of a stored output stream
+
+        Args:
+            output_id: Handle returned by put()
+            stream: "stdout" or "stderr"
+            offset: First character to return, negative values count from the end
+            length: Number of characters to return, capped at MAX_PAGE_CHARS
+
+        Returns:
+            The page and the offset of the next one, or None for an unknown output
+        """
+        if stream not in OUTPUT_STREAMS:
+            msg = f"Unknown output stream: {stream}"
+            raise ValueError(msg)
+        with self._lock:
+            output = self._outputs.get(output_id)
+        if output is None:
+            return None
+
+        text = output[stream]
+        total = len(text)
+        start = max(0, total + offset) if offset < 0 else min(offset, total)
+        end = min(total, start + max(0, min(length, MAX_PAGE_CHARS)))
+        return {
+            "output_id": output_id,
+            "stream": stream,
+            "offset": start,
+            "next_offset": end,
+            "total_size": total,
+            "data": text[start:end],
+            "eof": end >= total,
+        }
+
+    def discard(self, output_id: str):
+        """Forget a stored output"""
+        with self._lock:
+            self._outputs.pop(output_id, None)
@@ -0,0 +1,356 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from vtkmodules.vtkCommonDataModel import vtkDataObject, vtkPolyData
+from vtkmodules.vtkFiltersCore import (
+    vtkCleanPolyData,
+    vtkQuadricDecimation,
+    vtkTriangleFilter,
+)
+from vtkmodules.vtkFiltersGeometry import vtkGeometryFilter
+from vtkmodules.vtkIOGeometry import vtkSTLWriter
+
+from khorium.app.config import PREPROCESS_LOD_TARGET_CELLS, PREPROCESS_WORKERS
+from khorium.app.core.mesh_data import read_mesh_file
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# Stage name -> (dependencies, function taking the dependency results as keyword arguments)
+StageGraph = dict[str, tuple[list[str], Callable[..., Any]]]
+
+
+class PreprocessingJob:
+    """
+    Dependency graph of preprocessing stages for one uploaded file
+
+    A stage is submitted to the worker pool as soon as all of its dependencies
+    have finished, so independent stages run concurrently. Results are kept in
+    artifacts under the stage name.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        stages: StageGraph,
+        executor: ThreadPoolExecutor,
+        output_dir: str,
+        on_update: Optional[Callable[["PreprocessingJob"], None]] = None,
+    ):
+        self.file_path = file_path
+        self.stages = stages
+        self.executor = executor
+        self.output_dir = output_dir
+        self.on_update = on_update
+        self.order = self._topological_order()
+        self.artifacts: dict[str, Any] = {}
+        self.status = {name: "pending" for name in stages}
+        self.errors: dict[str, str] = {}
+        self.timings: dict[str, float] = {}
+        self.started_at = time.time()
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _topological_order(self) -> list[str]:
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                msg = f"Preprocessing graph has a cycle at stage {name}"
+                raise ValueError(msg)
+            visiting.add(name)
+            for dependency in self.stages[name][0]:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def start(self):
+        """Submit the stages that have no dependencies"""
+        with self._lock:
+            self._submit_ready()
+
+    def cancel(self):
+        """Skip every stage that has not started yet"""
+        with self._lock:
+            self.cancelled = True
+            for name, status in self.status.items():
+                if status == "pending":
+                    self.status[name] = "cancelled"
+            self._check_done()
+
+    def get(self, name: str) -> Any:
+        """Get a stage result, or None if the stage has not completed"""
+        with self._lock:
+            return (
+                self.artifacts.get(name)
+                if self.status.get(name) == "completed"
+                else None
+            )
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every stage has finished, failed or been cancelled"""
+        return self._done.wait(timeout)
+
+    @property
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def _submit_ready(self):
+        for name in self.order:
+            if self.status[name] != "pending":
+                continue
+            dependencies = self.stages[name][0]
+            if any(
+                self.status[d] in ("failed", "skipped", "cancelled")
+                for d in dependencies
+            ):
+                self.status[name] = "skipped"
+                continue
+            if all(self.status[d] == "completed" for d in dependencies):
+                self.status[name] = "running"
+                kwargs = {d: self.artifacts[d] for d in dependencies}
+                self.executor.submit(self._run_stage, name, kwargs)
+        self._check_done()
+
+    def _run_stage(self, name: str, kwargs: dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            result = self.stages[name][1](**kwargs)
+            error = None
+        except Exception as e:  # A failed stage only skips the stages depending on it
+            result = None
+            error = str(e)
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            self.timings[name] = duration
+            if error is None:
+                self.artifacts[name] = result
+                self.status[name] = "completed"
+            else:
+                self.errors[name] = error
+                self.status[name] = "failed"
+                logger.warning(
+                    "Stage %s failed for %s: %s",
+                    name,
+                    os.path.basename(self.file_path),
+                    error,
+                )
+            if not self.cancelled:
+                self._submit_ready()
+            else:
+                self._check_done()
+
+        if self.on_update:
+            self.on_update(self)
+
+    def _check_done(self):
+        if all(status not in ("pending", "running") for status in self.status.values()):
+            self._done.set()
+
+    def get_summary(self) -> dict[str, Any]:
+        """Describe the job for state reporting"""
+        with self._lock:
+            statuses = set(self.status.values())
+            if self.cancelled:
+                overall = "cancelled"
+            elif statuses & {"pending", "running"}:
+                overall = "running"
+            elif statuses & {"failed", "skipped"}:
+                overall = "failed"
+            else:
+                overall = "completed"
+
+            stages = {
+                name: {
+                    "status": self.status[name],
+                    "depends_on": list(self.stages[name][0]),
+                    "duration": self.timings.get(name, 0.0),
+                    "error": self.errors.get(name, ""),
+                }
+                for name in self.order
+            }
+
+            products = {}
+            if self.status.get("bounds") == "completed":
+                products["bounds"] = self.artifacts["bounds"]
+            if self.status.get("array_ranges") == "completed":
+                products["array_ranges"] = self.artifacts["array_ranges"]
+            if self.status.get("lod") == "completed":
+                products["lod_cells"] = self.artifacts["lod"].GetNumberOfCells()
+            if self.status.get("triangles") == "completed":
+                products["surface_cells"] = self.artifacts[
+                    "triangles"
+                ].GetNumberOfCells()
+
+            return {
+                "file": os.path.basename(self.file_path),
+                "status": overall,
+                "order": list(self.order),
+                "stages": stages,
+                "products": products,
+                "elapsed": time.time() - self.started_at,
+            }
+
+
+class PreprocessingService:
+    """Computes derived products of an upload in the background so later actions can reuse them"""
+
+    def __init__(
+        self,
+        max_workers: int = PREPROCESS_WORKERS,
+        lod_target_cells: int = PREPROCESS_LOD_TARGET_CELLS,
+    ):
+        self.lod_target_cells = lod_target_cells
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="khorium-preprocess"
+        )
+        self.current_job: Optional[PreprocessingJob] = None
+
+    def submit(
+        self,
+        file_path: str,
+        on_update: Optional[Callable[[PreprocessingJob], None]] = None,
+    ) -> PreprocessingJob:
+        """
+        Start preprocessing a stored file, replacing the job of the previous upload
+
+        The job reads the file on the worker pool, so it runs while the VTK
+        pipeline loads the same file. A job that already covers the same file
+        is reused unless it failed.
+        """
+        job = self.current_job
+        if (
+            job is not None
+            and job.file_path == file_path
+            and job.get_summary()["status"] in ("running", "completed")
+        ):
+            return job
+
+        if job is not None:
+            job.cancel()
+            shutil.rmtree(job.output_dir, ignore_errors=True)
+
+        output_dir = tempfile.mkdtemp(prefix="khorium_preprocess_")
+        job = PreprocessingJob(
+            file_path,
+            self.build_stages(file_path, output_dir),
+            self.executor,
+            output_dir,
+            on_update,
+        )
+        self.current_job = job
+        logger.info(
+            "Preprocessing %s: %s", os.path.basename(file_path), " -> ".join(job.order)
+        )
+        job.start()
+        return job
+
+    def get_artifact(self, file_path: Optional[str], name: str) -> Any:
+        """Get a finished product for a file, or None if it is not available yet"""
+        job = self.current_job
+        if job is None or not file_path or job.file_path != file_path:
+            return None
+        return job.get(name)
+
+    def build_stages(self, file_path: str, output_dir: str) -> StageGraph:
+        """The default preprocessing graph for an uploaded mesh file"""
+        return {
+            "read": ([], lambda: self._read(file_path)),
+            "bounds": (["read"], lambda read: list(read.GetBounds())),
+            "array_ranges": (["read"], lambda read: self._array_ranges(read)),
+            "surface": (["read"], lambda read: self._extract_surface(read)),
+            "triangles": (["surface"], lambda surface: self._triangulate(surface)),
+            "lod": (["triangles"], lambda triangles: self._decimate(triangles)),
+            "meshing_surface": (
+                ["triangles"],
+                lambda triangles: self._write_meshing_surface(triangles, output_dir),
+            ),
+        }
+
+    def _read(self, file_path: str):
+        dataset = read_mesh_file(file_path)
+        # Compute and cache the bounds now, stages reading them run concurrently
+        dataset.GetBounds()
+        return dataset
+
+    def _array_ranges(self, dataset) -> list[dict[str, Any]]:
+        """Array names and ranges in the format of VtkPipeline.dataset_arrays"""
+        ranges = []
+        fields = [
+            (dataset.GetPointData(), vtkDataObject.FIELD_ASSOCIATION_POINTS),
+            (dataset.GetCellData(), vtkDataObject.FIELD_ASSOCIATION_CELLS),
+        ]
+        for field_arrays, association in fields:
+            for i in range(field_arrays.GetNumberOfArrays()):
+                array = field_arrays.GetArray(i)
+                if array is None:
+                    continue
+                ranges.append(
+                    {
+                        "text": array.GetName(),
+                        "value": i,
+                        "range": list(array.GetRange()),
+                        "type": association,
+                    }
+                )
+        return ranges
+
+    def _extract_surface(self, dataset) -> vtkPolyData:
+        if isinstance(dataset, vtkPolyData):
+            return dataset
+        geometry_filter = vtkGeometryFilter()
+        geometry_filter.SetInputData(dataset)
+        geometry_filter.Update()
+        surface = vtkPolyData()
+        surface.ShallowCopy(geometry_filter.GetOutput())
+        return surface
+
+    def _triangulate(self, surface: vtkPolyData) -> vtkPolyData:
+        triangle_filter = vtkTriangleFilter()
+        triangle_filter.SetInputData(surface)
+        clean_filter = vtkCleanPolyData()
+        clean_filter.SetInputConnection(triangle_filter.GetOutputPort())
+        clean_filter.Update()
+        triangles = vtkPolyData()
+        triangles.ShallowCopy(clean_filter.GetOutput())
+        return triangles
+
+    def _decimate(self, triangles: vtkPolyData) -> vtkPolyData:
+        """Reduced surface for interactive rendering"""
+        cell_count = triangles.GetNumberOfCells()
+        if cell_count <= self.lod_target_cells:
+            return triangles
+        decimate = vtkQuadricDecimation()
+        decimate.SetInputData(triangles)
+        decimate.SetTargetReduction(1.0 - self.lod_target_cells / cell_count)
+        decimate.Update()
+        lod = vtkPolyData()
+        lod.ShallowCopy(decimate.GetOutput())
+        return lod
+
+    def _write_meshing_surface(self, triangles: vtkPolyData, output_dir: str) -> str:
+        """Clean triangulated surface written as STL, ready for gmsh"""
+        path = os.path.join(output_dir, "meshing_surface.stl")
+        writer = vtkSTLWriter()
+        writer.SetFileName(path)
+        writer.SetInputData(triangles)
+        writer.SetFileTypeToBinary()
+        if not writer.Write():
+            msg = f"Failed to write {path}"
+            raise RuntimeError(msg)
+        return path
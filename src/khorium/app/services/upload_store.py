@@ -0,0 +1,359 @@
+import contextlib
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Cross-process locking is POSIX only
+    fcntl = None
+
+from khorium.app.config import (
+    UPLOAD_SESSION_QUOTA_MB,
+    UPLOAD_STAGING_MAX_AGE_SECONDS,
+    UPLOAD_STORE_DIR,
+    UPLOAD_STORE_MAX_MB,
+)
+from khorium.app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class UploadQuotaExceededError(OSError):
+    """Raised when storing an upload would exceed a disk quota"""
+
+
+class UploadStore:
+    """
+    Content-addressed upload store shared by all sessions on a host
+
+    Blobs are stored once per SHA-256 under blobs/, and each session sees them
+    through logical names ("uploaded.stl", "cad_000.vtu") in its own namespace
+    under sessions/. Reference markers under refs/ count the (session, name)
+    pairs using a blob, and a blob is deleted when its last reference goes.
+    Each session namespace records the PID of its process under owners/, so
+    sweep() can reclaim what a crashed process never released.
+    """
+
+    def __init__(self, root: str, max_total_bytes: int = 0, max_session_bytes: int = 0):
+        self.root = root
+        self.max_total_bytes = max_total_bytes  # 0 disables the quota
+        self.max_session_bytes = max_session_bytes  # 0 disables the quota
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.refs_dir = os.path.join(root, "refs")
+        self.sessions_dir = os.path.join(root, "sessions")
+        self.staging_dir = os.path.join(root, "staging")
+        self.owners_dir = os.path.join(root, "owners")
+        for directory in (
+            self.blobs_dir,
+            self.refs_dir,
+            self.sessions_dir,
+            self.staging_dir,
+            self.owners_dir,
+        ):
+            os.makedirs(directory, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Serialize store mutations across threads and processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, ".lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def blob_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(self.blobs_dir, f"{content_hash}{ext.lower()}")
+
+    def staging_path(self, name: str) -> str:
+        """Path for a partial upload on the same filesystem as the blobs"""
+        return os.path.join(self.staging_dir, name)
+
+    def has_blob(self, content_hash: str, ext: str) -> bool:
+        return os.path.exists(self.blob_path(content_hash, ext))
+
+    def resolve(self, session_id: str, name: str) -> Optional[str]:
+        """Get the blob path a session's logical name points to"""
+        entry = self._read_entry(session_id, name)
+        if entry is None:
+            return None
+        path = self.blob_path(*entry)
+        return path if os.path.exists(path) else None
+
+    def put_bytes(self, session_id: str, name: str, content: bytes, ext: str) -> str:
+        """Store in-memory content under a logical name, skipping the write if already stored"""
+        content_hash = hashlib.sha256(content).hexdigest()
+        with self._locked():
+            path = self.blob_path(content_hash, ext)
+            if not os.path.exists(path):
+                self._check_quota(session_id, name, len(content), new_blob=True)
+                staging = self.staging_path(f"{content_hash}.part")
+                with open(staging, "wb") as f:
+                    f.write(content)
+                os.replace(staging, path)
+            else:
+                self._check_quota(session_id, name, len(content), new_blob=False)
+                logger.debug("Deduplicated %s (%s)", name, content_hash[:12])
+            self._link(session_id, name, content_hash, ext)
+        return path
+
+    def put_file(
+        self, session_id: str, name: str, staged_path: str, content_hash: str, ext: str
+    ) -> str:
+        """Move a fully staged file into the store, discarding it if the content is already stored"""
+        size = os.path.getsize(staged_path)
+        with self._locked():
+            path = self.blob_path(content_hash, ext)
+            if os.path.exists(path):
+                self._check_quota(session_id, name, size, new_blob=False)
+                os.remove(staged_path)
+                logger.debug("Deduplicated %s (%s)", name, content_hash[:12])
+            else:
+                self._check_quota(session_id, name, size, new_blob=True)
+                os.replace(staged_path, path)
+            self._link(session_id, name, content_hash, ext)
+        return path
+
+    def link_existing(
+        self, session_id: str, name: str, content_hash: str, ext: str
+    ) -> Optional[str]:
+        """Point a logical name at an already stored blob without transferring any data"""
+        with self._locked():
+            path = self.blob_path(content_hash, ext)
+            if not os.path.exists(path):
+                return None
+            self._check_quota(session_id, name, os.path.getsize(path), new_blob=False)
+            self._link(session_id, name, content_hash, ext)
+        return path
+
+    def list_names(self, session_id: str) -> list[str]:
+        """List the logical names in a session's namespace"""
+        session_dir = os.path.join(self.sessions_dir, session_id)
+        if not os.path.isdir(session_dir):
+            return []
+        return sorted(os.listdir(session_dir))
+
+    def release(self, session_id: str, name: str):
+        """Drop a session's logical name, deleting the blob if nothing else uses it"""
+        with self._locked():
+            self._unlink(session_id, name)
+
+    def release_session(self, session_id: str):
+        """Drop every logical name of a session"""
+        session_dir = os.path.join(self.sessions_dir, session_id)
+        if not os.path.isdir(session_dir):
+            return
+        with self._locked():
+            for name in os.listdir(session_dir):
+                self._unlink(session_id, name)
+            with contextlib.suppress(OSError):
+                os.rmdir(session_dir)
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(self.owners_dir, session_id))
+        logger.debug("Released session %s", session_id)
+
+    def sweep(
+        self, staging_max_age: float = UPLOAD_STAGING_MAX_AGE_SECONDS
+    ) -> dict[str, int]:
+        """
+        Reclaim space left behind by processes that exited without releasing it
+
+        Releases the namespaces of sessions whose owning process is gone, drops
+        reference markers no namespace entry matches, deletes staging files not
+        modified for staging_max_age seconds, then deletes blobs nothing refers to.
+
+        Returns:
+            Number of sessions, references, staging files and blobs removed
+        """
+        removed = {"sessions": 0, "refs": 0, "staging": 0, "blobs": 0}
+        with self._locked():
+            for session_id in os.listdir(self.sessions_dir):
+                if self._owner_alive(session_id):
+                    continue
+                session_dir = os.path.join(self.sessions_dir, session_id)
+                for name in os.listdir(session_dir):
+                    self._unlink(session_id, name)
+                with contextlib.suppress(OSError):
+                    os.rmdir(session_dir)
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.owners_dir, session_id))
+                removed["sessions"] += 1
+
+            for blob_name in os.listdir(self.refs_dir):
+                ref_dir = os.path.join(self.refs_dir, blob_name)
+                for ref_name in os.listdir(ref_dir):
+                    session_id, _, name = ref_name.partition("__")
+                    entry = self._read_entry(session_id, name)
+                    if entry is None or "".join(entry) != blob_name:
+                        os.remove(os.path.join(ref_dir, ref_name))
+                        removed["refs"] += 1
+                if not os.listdir(ref_dir):
+                    os.rmdir(ref_dir)
+
+            now = time.time()
+            for name in os.listdir(self.staging_dir):
+                path = os.path.join(self.staging_dir, name)
+                with contextlib.suppress(OSError):
+                    if now - os.path.getmtime(path) > staging_max_age:
+                        os.remove(path)
+                        removed["staging"] += 1
+
+            for name in os.listdir(self.blobs_dir):
+                if not os.path.isdir(os.path.join(self.refs_dir, name)):
+                    with contextlib.suppress(OSError):
+                        os.remove(os.path.join(self.blobs_dir, name))
+                        removed["blobs"] += 1
+
+        if any(removed.values()):
+            logger.info(
+                "Upload store sweep removed %d sessions, %d references, %d staging files and %d blobs",
+                removed["sessions"],
+                removed["refs"],
+                removed["staging"],
+                removed["blobs"],
+            )
+        return removed
+
+    def get_usage(self, session_id: Optional[str] = None) -> dict[str, int]:
+        """Get total store usage and, optionally, one session's usage in bytes"""
+        usage = {"total_bytes": self._total_bytes()}
+        if session_id is not None:
+            usage["session_bytes"] = self._session_bytes(session_id)
+        return usage
+
+    # Internal bookkeeping, callers must hold the store lock
+    def _entry_path(self, session_id: str, name: str) -> str:
+        return os.path.join(self.sessions_dir, session_id, name)
+
+    def _ref_path(self, content_hash: str, ext: str, session_id: str, name: str) -> str:
+        return os.path.join(
+            self.refs_dir, f"{content_hash}{ext.lower()}", f"{session_id}__{name}"
+        )
+
+    def _owner_alive(self, session_id: str) -> bool:
+        try:
+            with open(os.path.join(self.owners_dir, session_id)) as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            return False
+        if pid == os.getpid() or os.name != "posix":
+            return True  # Liveness of other processes is only checked on POSIX
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # Alive, owned by another user
+        return True
+
+    def _claim(self, session_id: str):
+        """Record this process as the owner of a session namespace"""
+        owner_path = os.path.join(self.owners_dir, session_id)
+        pid = str(os.getpid())
+        with contextlib.suppress(OSError), open(owner_path) as f:
+            if f.read() == pid:
+                return
+        with open(owner_path, "w") as f:
+            f.write(pid)
+
+    def _read_entry(self, session_id: str, name: str):
+        try:
+            with open(self._entry_path(session_id, name)) as f:
+                content_hash, ext = f.read().split()
+            return content_hash, ext
+        except (OSError, ValueError):
+            return None
+
+    def _link(self, session_id: str, name: str, content_hash: str, ext: str):
+        if self._read_entry(session_id, name) == (content_hash, ext.lower()):
+            return
+        self._unlink(session_id, name)
+
+        os.makedirs(os.path.join(self.sessions_dir, session_id), exist_ok=True)
+        self._claim(session_id)
+        with open(self._entry_path(session_id, name), "w") as f:
+            f.write(f"{content_hash} {ext.lower()}")
+
+        ref_path = self._ref_path(content_hash, ext, session_id, name)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        open(ref_path, "w").close()
+
+    def _unlink(self, session_id: str, name: str):
+        entry = self._read_entry(session_id, name)
+        with contextlib.suppress(OSError):
+            os.remove(self._entry_path(session_id, name))
+        if entry is None:
+            return
+
+        ref_path = self._ref_path(*entry, session_id, name)
+        with contextlib.suppress(OSError):
+            os.remove(ref_path)
+        ref_dir = os.path.dirname(ref_path)
+        if os.path.isdir(ref_dir) and not os.listdir(ref_dir):
+            os.rmdir(ref_dir)
+            with contextlib.suppress(OSError):
+                os.remove(self.blob_path(*entry))
+            logger.debug("Deleted unreferenced blob %s", entry[0][:12])
+
+    def _total_bytes(self) -> int:
+        total = 0
+        for name in os.listdir(self.blobs_dir):
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(self.blobs_dir, name))
+        return total
+
+    def _session_bytes(
+        self, session_id: str, exclude_name: Optional[str] = None
+    ) -> int:
+        session_dir = os.path.join(self.sessions_dir, session_id)
+        if not os.path.isdir(session_dir):
+            return 0
+        blobs = set()
+        for name in os.listdir(session_dir):
+            if name == exclude_name:
+                continue
+            entry = self._read_entry(session_id, name)
+            if entry is not None:
+                blobs.add(self.blob_path(*entry))
+        return sum(os.path.getsize(p) for p in blobs if os.path.exists(p))
+
+    def _check_quota(self, session_id: str, name: str, size: int, new_blob: bool):
+        """Raise UploadQuotaExceededError if storing size bytes would exceed a quota"""
+        if self.max_session_bytes:
+            session_bytes = self._session_bytes(session_id, exclude_name=name) + size
+            if session_bytes > self.max_session_bytes:
+                msg = f"Session upload quota exceeded ({session_bytes} > {self.max_session_bytes} bytes)"
+                raise UploadQuotaExceededError(msg)
+        if self.max_total_bytes and new_blob:
+            total_bytes = self._total_bytes() + size
+            if total_bytes > self.max_total_bytes:
+                msg = f"Upload store quota exceeded ({total_bytes} > {self.max_total_bytes} bytes)"
+                raise UploadQuotaExceededError(msg)
+
+
+_default_store = None
+
+
+def get_upload_store() -> UploadStore:
+    """Get the process-wide upload store configured from the environment"""
+    global _default_store
+    if _default_store is None:
+        _default_store = UploadStore(
+            UPLOAD_STORE_DIR,
+            max_total_bytes=UPLOAD_STORE_MAX_MB * 1024 * 1024,
+            max_session_bytes=UPLOAD_SESSION_QUOTA_MB * 1024 * 1024,
+        )
+        # Each process start reclaims what crashed processes left behind
+        try:
+            _default_store.sweep()
+        except OSError as e:
+            logger.warning("Upload store sweep failed: %s", e)
+    return _default_store
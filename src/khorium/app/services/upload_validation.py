@@ -0,0 +1,270 @@
+import io
+import os
+import re
+import struct
+from typing import BinaryIO, Optional
+
+STL_HEADER_SIZE = 84  # 80 byte header + UInt32 triangle count
+STL_TRIANGLE_SIZE = 50  # normal + 3 vertices as 12 Float32, plus UInt16 attribute
+
+# How much of a VTU file is scanned for the XML header before giving up
+VTU_MAX_HEADER_BYTES = 4 * 1024 * 1024
+VTU_SCAN_CHUNK = 64 * 1024
+VTU_TAIL_BYTES = 4096
+
+_ATTRIBUTE_PATTERN = re.compile(rb'([A-Za-z_]+)\s*=\s*"([^"]*)"')
+_HEADER_TYPES = {b"UInt32": "I", b"UInt64": "Q"}
+# Tags that can end the part of a VTU file _read_vtu_header needs
+_HEADER_END_PATTERN = re.compile(rb"<AppendedData\b|<DataArray\b|</Piece\b")
+
+
+class UploadValidationError(ValueError):
+    """Raised when an upload fails header-level validation"""
+
+
+def validate_mesh_file(path: str, filename: Optional[str] = None) -> Optional[str]:
+    """
+    Cheaply check that a stored mesh file is structurally complete
+
+    Args:
+        path: File to check
+        filename: Name used to pick the format and in messages, defaults to path
+
+    Returns:
+        None if the file looks valid, otherwise a specific error message
+    """
+    with open(path, "rb") as f:
+        return validate_mesh_stream(f, os.path.getsize(path), filename or path)
+
+
+def validate_mesh_bytes(content: bytes, filename: str) -> Optional[str]:
+    """Check in-memory file content, see validate_mesh_file"""
+    return validate_mesh_stream(io.BytesIO(content), len(content), filename)
+
+
+def validate_mesh_stream(f: BinaryIO, size: int, filename: str) -> Optional[str]:
+    """Check a seekable binary stream, see validate_mesh_file"""
+    name = os.path.basename(filename)
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        if ext == ".stl":
+            return _validate_stl(f, size, name)
+        if ext == ".vtu":
+            return _validate_vtu(f, size, name)
+    except (OSError, struct.error) as e:
+        return f"{name}: could not read file header ({e})"
+    return None
+
+
+def _validate_stl(f: BinaryIO, size: int, name: str) -> Optional[str]:
+    if size < STL_HEADER_SIZE:
+        head = f.read(size)
+        if head.lstrip().startswith(b"solid"):
+            return _validate_ascii_stl(f, size, name)
+        return f"{name}: file is {size} bytes, smaller than the {STL_HEADER_SIZE} byte binary STL header"
+
+    head = f.read(STL_HEADER_SIZE)
+    (triangle_count,) = struct.unpack_from("<I", head, 80)
+    expected_size = STL_HEADER_SIZE + STL_TRIANGLE_SIZE * triangle_count
+    if expected_size == size:
+        return None
+
+    # ASCII STL starts with "solid"; binary headers may too, so only fall back
+    # to the ASCII check when the triangle count does not match the size
+    if head.lstrip().startswith(b"solid") and _looks_like_ascii_stl(f, size):
+        return _validate_ascii_stl(f, size, name)
+
+    if size < expected_size:
+        return (
+            f"{name}: binary STL header declares {triangle_count} triangles ({expected_size} bytes) "
+            f"but the file has {size} bytes, it is truncated"
+        )
+    return (
+        f"{name}: binary STL header declares {triangle_count} triangles ({expected_size} bytes) "
+        f"but the file has {size} bytes of which {size - expected_size} are unaccounted for"
+    )
+
+
+def _looks_like_ascii_stl(f: BinaryIO, size: int) -> bool:
+    f.seek(0)
+    head = f.read(min(size, 1024))
+    return b"facet" in head or b"endsolid" in head
+
+
+def _validate_ascii_stl(f: BinaryIO, size: int, name: str) -> Optional[str]:
+    if not _looks_like_ascii_stl(f, size):
+        return f"{name}: ASCII STL has no facets in its first {min(size, 1024)} bytes"
+    f.seek(max(0, size - 1024))
+    if b"endsolid" not in f.read():
+        return f"{name}: ASCII STL is missing its closing 'endsolid', it is truncated"
+    return None
+
+
+def _read_vtu_header(f: BinaryIO) -> tuple[bytes, Optional[int]]:
+    """
+    Read the XML describing the file, returning it and the appended data start offset
+
+    Scanning stops at the appended data marker, at the payload of the first
+    inline DataArray, or at the end of the first Piece when nothing is appended,
+    so array payloads are never buffered.
+    """
+    header = bytearray()
+    position = 0  # Where the next tag search starts
+    has_appended = False
+    while len(header) < VTU_MAX_HEADER_BYTES:
+        chunk = f.read(VTU_SCAN_CHUNK)
+        if not chunk:
+            break
+        header += chunk
+        for match in _HEADER_END_PATTERN.finditer(header, position):
+            tag_end = header.find(b">", match.end())
+            if tag_end == -1:
+                break  # The tag continues in the next chunk
+            position = tag_end + 1
+            tag = match.group()
+            if tag == b"<AppendedData":
+                marker = header.find(b"_", tag_end)
+                if marker == -1:
+                    position = match.start()
+                    break
+                return bytes(header[:marker]), marker + 1
+            if tag == b"</Piece":
+                if not has_appended:
+                    return bytes(header[:position]), None
+            elif (
+                _parse_attributes(header[match.end() : tag_end]).get(b"format")
+                == b"appended"
+            ):
+                has_appended = True
+            elif header[tag_end - 1 : tag_end] != b"/":
+                # Inline payload follows, everything describing the file came before it
+                return bytes(header[:position]), None
+        else:
+            # Keep a margin so a tag split across chunks is still found
+            position = max(position, len(header) - 64)
+    return bytes(header), None
+
+
+def _parse_attributes(tag: bytes) -> dict[bytes, bytes]:
+    return dict(_ATTRIBUTE_PATTERN.findall(tag))
+
+
+def _find_tags(header: bytes, name: bytes) -> list[dict[bytes, bytes]]:
+    return [
+        _parse_attributes(m.group(1))
+        for m in re.finditer(rb"<" + name + rb"\b([^>]*)>", header)
+    ]
+
+
+def _validate_vtu(f: BinaryIO, size: int, name: str) -> Optional[str]:
+    start = f.read(256).lstrip()
+    if not (start.startswith((b"<?xml", b"<VTKFile"))):
+        return (
+            f"{name}: not a VTK XML file (expected '<?xml' or '<VTKFile' at the start)"
+        )
+    f.seek(0)
+
+    header, data_start = _read_vtu_header(f)
+    vtk_files = _find_tags(header, b"VTKFile")
+    if not vtk_files:
+        return f"{name}: missing <VTKFile> element"
+    vtk_file = vtk_files[0]
+    if vtk_file.get(b"type") != b"UnstructuredGrid":
+        file_type = vtk_file.get(b"type", b"").decode(errors="replace")
+        return f"{name}: VTKFile type is '{file_type}', expected 'UnstructuredGrid'"
+
+    pieces = _find_tags(header, b"Piece")
+    if not pieces:
+        return f"{name}: missing <Piece> element"
+    for piece in pieces:
+        for attribute in (b"NumberOfPoints", b"NumberOfCells"):
+            value = piece.get(attribute, b"")
+            if not value.isdigit():
+                return f"{name}: <Piece> has invalid {attribute.decode()} '{value.decode(errors='replace')}'"
+
+    f.seek(max(0, size - VTU_TAIL_BYTES))
+    tail = f.read()
+    if b"</VTKFile>" not in tail:
+        return f"{name}: missing closing </VTKFile>, the file is truncated"
+
+    arrays = [
+        a for a in _find_tags(header, b"DataArray") if a.get(b"format") == b"appended"
+    ]
+    if not arrays:
+        return None
+    if data_start is None:
+        return f"{name}: data arrays reference appended data but there is no <AppendedData> section"
+
+    appended = _find_tags(header, b"AppendedData")
+    if appended and appended[0].get(b"encoding", b"raw") != b"raw":
+        return None  # base64 blocks have no fixed layout to check cheaply
+
+    closing = tail.rfind(b"</AppendedData>")
+    if closing == -1:
+        return f"{name}: missing closing </AppendedData>, the file is truncated"
+    # The raw data ends before the whitespace preceding the closing tag
+    data_end = size - len(tail) + closing
+    return _validate_appended_blocks(f, vtk_file, arrays, data_start, data_end, name)
+
+
+def _validate_appended_blocks(
+    f: BinaryIO,
+    vtk_file: dict[bytes, bytes],
+    arrays: list[dict[bytes, bytes]],
+    data_start: int,
+    data_end: int,
+    name: str,
+) -> Optional[str]:
+    header_format = _HEADER_TYPES.get(vtk_file.get(b"header_type", b"UInt32"))
+    if header_format is None:
+        return f"{name}: unsupported header_type '{vtk_file[b'header_type'].decode(errors='replace')}'"
+    byte_order = ">" if vtk_file.get(b"byte_order") == b"BigEndian" else "<"
+    word = struct.calcsize(header_format)
+    compressed = bool(vtk_file.get(b"compressor"))
+
+    offsets = []
+    for array in arrays:
+        value = array.get(b"offset", b"")
+        if not value.isdigit():
+            array_name = array.get(b"Name", b"?").decode(errors="replace")
+            return f"{name}: DataArray '{array_name}' has invalid appended offset '{value.decode(errors='replace')}'"
+        offsets.append(int(value))
+
+    data_size = data_end - data_start
+    for offset in sorted(set(offsets)):
+        if offset >= data_size:
+            return f"{name}: appended data offset {offset} is past the end of the data ({data_size} bytes)"
+        f.seek(data_start + offset)
+        if compressed:
+            block_header = f.read(3 * word)
+            if len(block_header) < 3 * word:
+                return (
+                    f"{name}: compressed block header at offset {offset} is truncated"
+                )
+            block_count = struct.unpack(byte_order + 3 * header_format, block_header)[0]
+            sizes = f.read(block_count * word)
+            if len(sizes) < block_count * word:
+                return (
+                    f"{name}: compressed block sizes at offset {offset} are truncated"
+                )
+            block_end = (
+                offset
+                + (3 + block_count) * word
+                + sum(struct.unpack(byte_order + block_count * header_format, sizes))
+            )
+        else:
+            block_header = f.read(word)
+            if len(block_header) < word:
+                return f"{name}: data block header at offset {offset} is truncated"
+            block_end = (
+                offset
+                + word
+                + struct.unpack(byte_order + header_format, block_header)[0]
+            )
+
+        if block_end > data_size:
+            return (
+                f"{name}: appended data block at offset {offset} declares {block_end - offset} bytes "
+                f"but only {data_size - offset} remain, the file is truncated"
+            )
+    return None
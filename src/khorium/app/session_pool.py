@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import time
+import uuid
+from collections.abc import Coroutine
+from string import Template
+from typing import Optional
+
+from aiohttp import web
+
+from khorium.app.config import (
+    SESSION_POOL_IDLE_TIMEOUT,
+    SESSION_POOL_PORTS,
+    SESSION_POOL_PROXY_FILE,
+    SESSION_POOL_READY_LINE,
+    SESSION_POOL_READY_TIMEOUT,
+    SESSION_POOL_SESSION_URL,
+    SESSION_POOL_SIZE,
+)
+from khorium.app.utils.log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+# How often exited processes are reaped and the pool is topped up
+MAINTENANCE_INTERVAL = 5.0
+
+
+class PooledProcess:
+    """One khorium server process owned by the pool"""
+
+    def __init__(self, port: int, process: asyncio.subprocess.Process, secret: str):
+        self.id = uuid.uuid4().hex
+        self.port = port
+        self.process = process
+        self.secret = secret
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.claimed_at: Optional[float] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    def to_dict(self, host: str, session_url: str) -> dict:
+        """Session description in the format of the wslink launcher response"""
+        return {
+            "id": self.id,
+            "host": host,
+            "port": self.port,
+            "secret": self.secret,
+            "sessionURL": Template(session_url).safe_substitute(
+                id=self.id, host=host, port=self.port
+            ),
+            "startTime": self.started_at,
+            "ready": self.ready_at is not None,
+        }
+
+
+class SessionPool:
+    """
+    Keeps a number of khorium processes started and ready to serve a session
+
+    Each process is started with its VtkPipeline built and its server listening.
+    acquire() hands out a ready process and the pool starts a replacement in
+    the background. Idle processes older than idle_timeout are recycled, and a
+    claimed process leaves the pool when its session ends and the process exits.
+    """
+
+    def __init__(
+        self,
+        size: int = SESSION_POOL_SIZE,
+        ports: str = SESSION_POOL_PORTS,
+        idle_timeout: int = SESSION_POOL_IDLE_TIMEOUT,
+        ready_timeout: int = SESSION_POOL_READY_TIMEOUT,
+        ready_line: str = SESSION_POOL_READY_LINE,
+        proxy_file: str = SESSION_POOL_PROXY_FILE,
+        host: str = "localhost",
+        command: Optional[list[str]] = None,
+    ):
+        self.size = max(0, size)
+        self.ports = _parse_port_range(ports)
+        self.idle_timeout = idle_timeout
+        self.ready_timeout = ready_timeout
+        self.ready_line = ready_line
+        self.proxy_file = proxy_file
+        self.host = host
+        self.command = command or [sys.executable, "-m", "khorium.app.main"]
+        self.processes: dict[str, PooledProcess] = {}
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._starting = 0
+        self._reserved_ports = (
+            set()
+        )  # Ports of processes being started but not yet registered
+        self._tasks: set[asyncio.Task] = (
+            set()
+        )  # Background tasks, referenced until they finish
+        self.acquired_count = 0
+        self.cold_start_count = 0  # Sessions that had to wait for a process to start
+
+    async def start(self):
+        """Fill the pool and start background maintenance"""
+        logger.info(
+            "Starting %d warm processes on ports %d-%d",
+            self.size,
+            self.ports[0],
+            self.ports[-1],
+        )
+        self._replenish()
+        self._create_task(self._maintain())
+
+    async def stop(self):
+        """Cancel background tasks and terminate every process owned by the pool"""
+        for task in list(self._tasks):
+            task.cancel()
+        processes = list(self.processes.values())
+        for pooled in processes:
+            self._terminate(pooled)
+        # Reap the processes so none outlives the pool
+        await asyncio.gather(*(pooled.process.wait() for pooled in processes))
+        self.processes.clear()
+        self._write_proxy_file()
+
+    async def acquire(self) -> Optional[PooledProcess]:
+        """Hand a ready process to a new session, starting one if the pool is empty"""
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if pooled.alive and pooled.id in self.processes:
+                break
+        else:
+            pooled = None
+
+        if pooled is None:
+            self.cold_start_count += 1
+            logger.info("No warm process available, starting one for this session")
+            pooled = await self._spawn(queue=False)
+            if pooled is None:
+                return None
+
+        pooled.claimed_at = time.time()
+        self.acquired_count += 1
+        logger.info(
+            "Session %s on port %d (warm for %.1fs)",
+            pooled.id,
+            pooled.port,
+            pooled.claimed_at - pooled.ready_at,
+        )
+        self._replenish()
+        return pooled
+
+    def get_status(self) -> dict:
+        """Pool counters for monitoring"""
+        idle = [
+            p
+            for p in self.processes.values()
+            if p.claimed_at is None and p.ready_at is not None
+        ]
+        return {
+            "size": self.size,
+            "idle": len(idle),
+            "starting": self._starting,
+            "claimed": sum(
+                1 for p in self.processes.values() if p.claimed_at is not None
+            ),
+            "acquired": self.acquired_count,
+            "cold_starts": self.cold_start_count,
+        }
+
+    def _replenish(self):
+        idle = sum(
+            1
+            for p in self.processes.values()
+            if p.claimed_at is None and p.ready_at is not None
+        )
+        for _ in range(self.size - idle - self._starting):
+            self._create_task(self._spawn())
+
+    def _create_task(self, coroutine: Coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _spawn(self, queue: bool = True) -> Optional[PooledProcess]:
+        port = self._free_port()
+        if port is None:
+            logger.warning("No free port left in the pool range")
+            return None
+
+        secret = secrets.token_hex(16)
+        self._starting += 1
+        self._reserved_ports.add(port)
+        try:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self.command,
+                    "--server",
+                    "--host",
+                    "0.0.0.0",
+                    "--port",
+                    str(port),
+                    "--authKey",
+                    secret,
+                    "--timeout",
+                    str(self.idle_timeout),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                )
+            finally:
+                self._reserved_ports.discard(port)
+            pooled = PooledProcess(port, process, secret)
+            self.processes[pooled.id] = pooled
+
+            try:
+                await asyncio.wait_for(self._wait_ready(pooled), self.ready_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Process on port %d not ready after %ds, stopping it",
+                    port,
+                    self.ready_timeout,
+                )
+                self._terminate(pooled)
+                self.processes.pop(pooled.id, None)
+                await pooled.process.wait()
+                return None
+        finally:
+            self._starting -= 1
+
+        pooled.ready_at = time.time()
+        logger.info(
+            "Process on port %d ready in %.1fs",
+            port,
+            pooled.ready_at - pooled.started_at,
+        )
+        self._create_task(self._drain_output(pooled))
+        self._write_proxy_file()
+        if queue:
+            self._idle.put_nowait(pooled)
+        return pooled
+
+    async def _wait_ready(self, pooled: PooledProcess):
+        while True:
+            line = await pooled.process.stdout.readline()
+            if not line:
+                raise asyncio.TimeoutError()  # Exited before becoming ready
+            if self.ready_line in line.decode(errors="replace"):
+                return
+
+    async def _drain_output(self, pooled: PooledProcess):
+        """Keep reading output so a chatty process never blocks on a full pipe"""
+        async for line in pooled.process.stdout:
+            logger.info("[%d] %s", pooled.port, line.decode(errors="replace").rstrip())
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            now = time.time()
+            changed = False
+            for pooled in list(self.processes.values()):
+                if pooled.ready_at is None:
+                    continue
+                if not pooled.alive:
+                    state = "session" if pooled.claimed_at else "idle process"
+                    logger.info("%s on port %d exited", state.capitalize(), pooled.port)
+                    del self.processes[pooled.id]
+                    changed = True
+                elif (
+                    pooled.claimed_at is None
+                    and now - pooled.ready_at > self.idle_timeout
+                ):
+                    logger.info("Recycling idle process on port %d", pooled.port)
+                    self._terminate(pooled)
+                    del self.processes[pooled.id]
+                    changed = True
+            if changed:
+                self._write_proxy_file()
+            self._replenish()
+
+    def _terminate(self, pooled: PooledProcess):
+        if pooled.alive:
+            pooled.process.terminate()
+
+    def _free_port(self) -> Optional[int]:
+        used = {p.port for p in self.processes.values()} | self._reserved_ports
+        for port in self.ports:
+            if port not in used:
+                return port
+        return None
+
+    def _write_proxy_file(self):
+        """Write the session id to host:port mapping used by the reverse proxy"""
+        if not self.proxy_file:
+            return
+        lines = [
+            f"{p.id} {self.host}:{p.port}\n"
+            for p in self.processes.values()
+            if p.ready_at is not None
+        ]
+        temp_path = f"{self.proxy_file}.tmp"
+        with open(temp_path, "w") as f:
+            f.writelines(lines)
+        os.replace(temp_path, self.proxy_file)
+
+
+def _parse_port_range(ports: str) -> list[int]:
+    start, _, end = ports.partition("-")
+    return list(range(int(start), int(end or start) + 1))
+
+
+def create_launcher_app(
+    pool: SessionPool, endpoint: str, session_url: str
+) -> web.Application:
+    """HTTP endpoint compatible with the wslink launcher, backed by the pool"""
+
+    async def launch(_request):
+        pooled = await pool.acquire()
+        if pooled is None:
+            return web.json_response({"error": "No session available"}, status=503)
+        return web.json_response(pooled.to_dict(pool.host, session_url))
+
+    async def session_info(request):
+        pooled = pool.processes.get(request.match_info["session_id"])
+        if pooled is None:
+            return web.json_response({"error": "Unknown session"}, status=404)
+        return web.json_response(pooled.to_dict(pool.host, session_url))
+
+    async def status(_request):
+        return web.json_response(pool.get_status())
+
+    async def on_startup(_app):
+        await pool.start()
+
+    async def on_cleanup(_app):
+        await pool.stop()
+
+    app = web.Application()
+    app.router.add_post(f"/{endpoint}", launch)
+    app.router.add_get(f"/{endpoint}/status", status)
+    app.router.add_get(f"/{endpoint}/{{session_id}}", session_info)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve khorium sessions from a pool of pre-started processes"
+    )
+    parser.add_argument(
+        "--host", default="0.0.0.0", help="Interface the launcher endpoint listens on"
+    )
+    parser.add_argument(
+        "--port", type=int, default=9000, help="Port of the launcher endpoint"
+    )
+    parser.add_argument(
+        "--endpoint", default="launcher", help="Path sessions are requested on"
+    )
+    parser.add_argument(
+        "--session-host",
+        default="localhost",
+        help="Host the session processes are reached on",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=SESSION_POOL_SIZE,
+        help="Number of warm idle processes",
+    )
+    parser.add_argument(
+        "--ports", default=SESSION_POOL_PORTS, help="Port range for session processes"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=int,
+        default=SESSION_POOL_IDLE_TIMEOUT,
+        help="Seconds before an unused process is recycled",
+    )
+    parser.add_argument(
+        "--proxy-file",
+        default=SESSION_POOL_PROXY_FILE,
+        help="Session id to host:port mapping file for the reverse proxy",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    pool = SessionPool(
+        size=args.size,
+        ports=args.ports,
+        idle_timeout=args.idle_timeout,
+        proxy_file=args.proxy_file,
+        host=args.session_host,
+    )
+    web.run_app(
+        create_launcher_app(pool, args.endpoint, SESSION_POOL_SESSION_URL),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,10 @@ from trame.widgets import html, vuetify3
 
 class ToolbarComponent:
     """Toolbar component with file upload and mesh generation buttons"""
-    
+
     def __init__(self, app):
         self.app = app
-    
+
     def build(self):
         """Build the toolbar UI components"""
         # File upload button
@@ -14,12 +14,13 @@ class ToolbarComponent:
             vuetify3.VIcon("mdi-upload")
             html.Input(
                 type="file",
-                accept=".vtu,.stl",
+                accept=".vtu,.stl,.gz,.zst,.zip",
+                multiple=True,
                 style="position: absolute; opacity: 0; width: 100%; height: 100%; cursor: pointer;",
                 change=(self.app.ctrl.upload_file, "[$event.target.files]"),
                 __events=["change"],
             )
-        
+
         # # Generate Mesh button
         # with vuetify3.VBtn(
         #     "Generate Mesh",
@@ -28,5 +29,5 @@ class ToolbarComponent:
         #     click=self.app.ctrl.generate_mesh,
         # ):
         #     vuetify3.VIcon("mdi-auto-fix", classes="mr-1")
-        
-        vuetify3.VSpacer()
\ No newline at end of file
+
+        vuetify3.VSpacer()
@@ -0,0 +1,121 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from khorium.app.config import LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
+
+ROOT_LOGGER = "khorium"
+
+# Attributes every LogRecord has, anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class TextFormatter(logging.Formatter):
+    """Formats records as `>>> COMPONENT: message`, tagging levels other than INFO"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        component = record.name.rpartition(".")[2].upper()
+        level = "" if record.levelno == logging.INFO else f"[{record.levelname}] "
+        return f">>> {component}: {level}{record.message}"
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with `extra` fields as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread with only the message interpolated"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments are merged now since they may change before the listener
+        # runs; layout and output happen on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_module_levels(spec: str) -> dict[str, str]:
+    """Parse `module=LEVEL,...`, with module names relative to khorium.app unless qualified"""
+    levels = {}
+    for entry in spec.split(","):
+        name, _, level = entry.strip().partition("=")
+        if not name or not level:
+            continue
+        if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+            name = f"{ROOT_LOGGER}.app.{name}"
+        levels[name] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    module_levels: str = LOG_LEVELS,
+    output_format: str = LOG_FORMAT,
+):
+    """
+    Route khorium logs through a queue to a background thread writing stdout
+
+    Safe to call more than once; only the first call installs the handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        JsonFormatter() if output_format.lower() == "json" else TextFormatter()
+    )
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [_QueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    root.propagate = False
+    for name, module_level in parse_module_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger for a module, pass `__name__`
+
+    Log with %-style arguments (`logger.debug("value %s", value)`) so nothing is
+    formatted when the level is disabled, and guard expensive arguments with
+    `logger.isEnabledFor(logging.DEBUG)`.
+    """
+    return logging.getLogger(name)
@@ -0,0 +1,104 @@
+import builtins
+import json
+import sys
+import time
+
+
+class StartupProfiler:
+    """
+    Measures where process startup time goes
+
+    While installed, first-time imports are timed and their self time (excluding
+    nested imports of other top-level packages) is attributed to the top-level
+    package being imported. Named phases record the time since the profiler was
+    created, up to the first page served to a client.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.import_times = {}
+        self.import_counts = {}
+        self.phases = []
+        self._stack = []
+        self._original_import = None
+        self._reported = False
+
+    def install(self):
+        """Start timing imports"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        """Stop timing imports"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        package = name.partition(".")[0]
+        frame = [package, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.import_times[package] = (
+                self.import_times.get(package, 0.0) + elapsed - frame[2]
+            )
+            self.import_counts[package] = self.import_counts.get(package, 0) + 1
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def mark(self, phase: str):
+        """Record that a startup phase has been reached"""
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def get_report(self, top: int = 15) -> dict:
+        """Phases and the packages with the largest import time"""
+        imports = sorted(self.import_times.items(), key=lambda item: -item[1])
+        return {
+            "phases": [
+                {"phase": phase, "seconds": seconds} for phase, seconds in self.phases
+            ],
+            "imports": [
+                {
+                    "package": package,
+                    "seconds": seconds,
+                    "modules": self.import_counts[package],
+                }
+                for package, seconds in imports[:top]
+            ],
+            "total_import_seconds": sum(self.import_times.values()),
+        }
+
+    def print_report(self, json_path: str = ""):
+        """Print the report once, optionally writing it as JSON"""
+        if self._reported:
+            return
+        self._reported = True
+        self.uninstall()
+        report = self.get_report()
+
+        print(">>> STARTUP_PROFILE: Phases (seconds since start)")
+        for phase in report["phases"]:
+            print(
+                f">>> STARTUP_PROFILE:   {phase['phase']:<28} {phase['seconds']:8.3f}"
+            )
+        print(
+            f">>> STARTUP_PROFILE: Imports by package (self time, {report['total_import_seconds']:.3f}s total)"
+        )
+        for entry in report["imports"]:
+            print(
+                f">>> STARTUP_PROFILE:   {entry['package']:<28} {entry['seconds']:8.3f}  ({entry['modules']} imports)"
+            )
+
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f">>> STARTUP_PROFILE: Report written to {json_path}")
@@ -0,0 +1,319 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any, Callable, Optional
+
+from khorium.app.config import TRACE_RETAINED, TRACING_ENABLED
+
+# Environment variables carrying the trace context into worker processes
+TRACE_CONTEXT_ENV = "KHORIUM_TRACE_CONTEXT"
+TRACE_FILE_ENV = "KHORIUM_TRACE_FILE"
+
+# Span helpers injected into mesh code. Spans are appended as trace events to
+# the file named by KHORIUM_TRACE_FILE and merged into the action's trace
+# once the run finishes. A fresh process also records the whole script.
+TRACE_HELPERS_CODE = '''
+
+import contextlib as _contextlib
+
+
+@_contextlib.contextmanager
+def trace_span(name, **args):
+    """Time a block of the script, it shows up in the trace of the action that ran it"""
+    import json, threading, time
+    started = time.time_ns() // 1000
+    perf_started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace_path = os.environ.get("KHORIUM_TRACE_FILE")
+        if _trace_path:
+            event = {"name": name, "cat": "mesh_code", "ph": "X", "ts": started,
+                     "dur": (time.perf_counter() - perf_started) * 1e6, "pid": os.getpid(),
+                     "tid": threading.get_ident(), "args": args}
+            try:
+                with open(_trace_path, "a") as f:
+                    f.write(json.dumps(event, default=str) + "\\n")
+            except OSError:
+                pass
+
+
+if "KHORIUM_KERNEL_FD" not in os.environ:
+    import atexit as _atexit
+    _script_span = trace_span("mesh_code.script")
+    _script_span.__enter__()
+    _atexit.register(_script_span.__exit__, None, None, None)
+'''
+
+_current_span: contextvars.ContextVar[Optional["SpanContext"]] = contextvars.ContextVar(
+    "khorium_span", default=None
+)
+
+
+class SpanContext:
+    """Identifies the active span, and through it the action's trace"""
+
+    __slots__ = ("span_id", "trace_id")
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def to_dict(self) -> dict[str, str]:
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+
+class Trace:
+    """Trace events recorded for one user action"""
+
+    def __init__(self, trace_id: str, name: str):
+        self.id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.events: list[dict[str, Any]] = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, event: dict[str, Any]):
+        with self._lock:
+            self.events.append(event)
+
+    def get_events(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self.events)
+
+
+class Tracer:
+    """
+    Records nested spans per user action
+
+    The outermost span opened without an active span starts a new trace named
+    after it, so controller entry points delimit actions. Nested spans attach
+    to it through a context variable, which follows asyncio tasks and, when
+    propagated with copy_context, executor threads. Worker processes receive
+    the context through the environment (see get_worker_env).
+    """
+
+    def __init__(
+        self, enabled: bool = TRACING_ENABLED, max_traces: int = TRACE_RETAINED
+    ):
+        self.enabled = enabled
+        self.max_traces = max(1, max_traces)
+        self.traces: OrderedDict[str, Trace] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, category: str = "", **args
+    ) -> Iterator[Optional[SpanContext]]:
+        """Record the duration of a block as a span of the current action's trace"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        context = SpanContext(
+            parent.trace_id if parent else uuid.uuid4().hex[:16], uuid.uuid4().hex[:16]
+        )
+        trace = (
+            self._get_trace(context.trace_id)
+            if parent
+            else self._start_trace(context.trace_id, name)
+        )
+        token = _current_span.set(context)
+        started = time.time_ns() // 1000
+        perf_started = time.perf_counter()
+        error = None
+        try:
+            yield context
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            if trace is not None:
+                event_args = dict(
+                    args,
+                    span_id=context.span_id,
+                    parent_id=parent.span_id if parent else None,
+                )
+                if error is not None:
+                    event_args["error"] = repr(error)
+                trace.add(
+                    {
+                        "name": name,
+                        "cat": category or name.partition(".")[0],
+                        "ph": "X",
+                        "ts": started,
+                        "dur": (time.perf_counter() - perf_started) * 1e6,
+                        "pid": self._pid,
+                        "tid": threading.get_ident(),
+                        "args": event_args,
+                    }
+                )
+                if parent is None:
+                    trace.finished = True
+
+    def traced(self, name: Optional[str] = None, category: str = "") -> Callable:
+        """Decorator recording each call of a function or coroutine as a span"""
+
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, category):
+                        return await fn(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, category):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextlib.contextmanager
+    def activate(self, context: Optional[SpanContext]) -> Iterator[None]:
+        """Make a captured span current, for callbacks run outside the context that created them"""
+        token = _current_span.set(context)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    def current_context(self) -> Optional[SpanContext]:
+        """The active span, to hand to work that runs later"""
+        return _current_span.get() if self.enabled else None
+
+    def get_worker_env(self, trace_file: str) -> dict[str, str]:
+        """Environment variables propagating the active span into a worker process"""
+        context = self.current_context()
+        if context is None:
+            # Set empty so a persistent worker does not keep a previous run's file
+            return {TRACE_CONTEXT_ENV: "", TRACE_FILE_ENV: ""}
+        return {
+            TRACE_CONTEXT_ENV: json.dumps(context.to_dict()),
+            TRACE_FILE_ENV: trace_file,
+        }
+
+    def collect_worker_events(self, trace_file: str):
+        """Merge the spans a worker process wrote to trace_file under the active span"""
+        context = self.current_context()
+        if context is None or not os.path.exists(trace_file):
+            return
+        trace = self._get_trace(context.trace_id)
+        try:
+            with open(trace_file) as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # Partially written line of a killed worker
+            event.setdefault("args", {})["parent_id"] = context.span_id
+            if trace is not None:
+                trace.add(event)
+
+    def export_chrome_trace(
+        self, trace_id: Optional[str] = None, path: Optional[str] = None
+    ) -> dict[str, Any]:
+        """
+        Trace of one action in the Chrome trace-event format, viewable in Perfetto
+
+        Defaults to the most recent action; written as JSON when path is given.
+        """
+        with self._lock:
+            if trace_id is None and self.traces:
+                trace_id = next(reversed(self.traces))
+            trace = self.traces.get(trace_id)
+        if trace is None:
+            return {"traceEvents": []}
+
+        events = sorted(trace.get_events(), key=lambda event: event["ts"])
+        names = [
+            {
+                "ph": "M",
+                "name": "process_name",
+                "pid": pid,
+                "args": {"name": "khorium" if pid == self._pid else "mesh code worker"},
+            }
+            for pid in sorted({event["pid"] for event in events})
+        ]
+        result = {
+            "traceEvents": names + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "trace_id": trace.id,
+                "action": trace.name,
+                "started_at": trace.started_at,
+            },
+        }
+        if path:
+            with open(path, "w") as f:
+                json.dump(result, f, default=str)
+        return result
+
+    def list_traces(self) -> list[dict[str, Any]]:
+        """Recent actions, oldest first"""
+        with self._lock:
+            traces = list(self.traces.values())
+        return [
+            {
+                "trace_id": t.id,
+                "action": t.name,
+                "started_at": t.started_at,
+                "spans": len(t.events),
+                "finished": t.finished,
+            }
+            for t in traces
+        ]
+
+    def _start_trace(self, trace_id: str, name: str) -> Trace:
+        trace = Trace(trace_id, name)
+        with self._lock:
+            self.traces[trace_id] = trace
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        return trace
+
+    def _get_trace(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self.traces.get(trace_id)
+
+
+_default_tracer = None
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer configured from the environment"""
+    global _default_tracer
+    if _default_tracer is None:
+        _default_tracer = Tracer()
+    return _default_tracer
+
+
+def traced(name: Optional[str] = None, category: str = "") -> Callable:
+    """Record each call of the decorated function as a span of the process-wide tracer"""
+    return get_tracer().traced(name, category)
+
+
+def trace_span(name: str, category: str = "", **args):
+    """Record a block as a span of the process-wide tracer"""
+    return get_tracer().span(name, category, **args)
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from khorium.app.services.code_execution_service import (
+    CodeExecutionService,
+    ResourceLimits,
+    resource,
+)
+from khorium.app.services.execution_cache import ExecutionCache
+
+posix_only = pytest.mark.skipif(resource is None, reason="rlimits are POSIX only")
+
+
+def _service(cache=None, **limits):
+    limits = {
+        "max_memory_mb": 0,
+        "max_cpu_seconds": 0,
+        "max_open_files": 0,
+        "max_file_size_mb": 0,
+        **limits,
+    }
+    return CodeExecutionService(
+        default_timeout=30, resource_limits=ResourceLimits(**limits), cache=cache
+    )
+
+
+def test_output_and_usage_are_reported(tmp_path):
+    result = _service().execute_code("print('hello')", working_dir=str(tmp_path))
+    assert result.success
+    assert result.stdout == "hello\n"
+    assert result.exit_code == 0
+    if resource is not None:
+        assert result.peak_rss_bytes > 0
+    assert set(result.to_dict()) >= {
+        "peak_rss_bytes",
+        "user_cpu_time",
+        "child_process_count",
+    }
+
+
+def test_failure_keeps_stderr(tmp_path):
+    result = _service().execute_code(
+        "raise SystemExit('boom')", working_dir=str(tmp_path)
+    )
+    assert not result.success
+    assert result.exit_code == 1
+    assert "boom" in result.stderr
+
+
+def test_output_is_capped(tmp_path):
+    service = _service()
+    service.set_max_output_size(4096)
+    result = service.execute_code("print('x' * 1_000_000)", working_dir=str(tmp_path))
+    assert result.success
+    assert result.stdout.startswith("x" * 4096 + "\n... [Output truncated")
+
+
+def test_stdin_is_fed_to_the_script(tmp_path):
+    result = _service().execute_code_with_input(
+        "import sys; print(sys.stdin.read().upper())", "abc", working_dir=str(tmp_path)
+    )
+    assert result.stdout == "ABC\n"
+
+
+def test_timeout_kills_the_script(tmp_path):
+    result = _service().execute_code(
+        "import time; time.sleep(30)", timeout=1, working_dir=str(tmp_path)
+    )
+    assert not result.success
+    assert "timed out after 1 seconds" in result.error_message
+    assert result.execution_time < 10
+
+
+@posix_only
+def test_rlimits_are_applied(tmp_path):
+    code = (
+        "import resource\n"
+        "print(resource.getrlimit(resource.RLIMIT_NOFILE)[0],"
+        " resource.getrlimit(resource.RLIMIT_FSIZE)[0])"
+    )
+    result = _service(max_open_files=64, max_file_size_mb=1).execute_code(
+        code, working_dir=str(tmp_path)
+    )
+    assert result.stdout.split() == ["64", str(1024 * 1024)]
+
+
+def _wait_for_exit(pid, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@posix_only
+def test_timeout_kills_spawned_processes(tmp_path):
+    code = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+        "open('child.pid', 'w').write(str(child.pid))\n"
+        "time.sleep(30)\n"
+    )
+    result = _service().execute_code(code, timeout=1, working_dir=str(tmp_path))
+    assert not result.success
+    assert _wait_for_exit(int((tmp_path / "child.pid").read_text()))
+
+
+@posix_only
+def test_rlimits_apply_to_spawned_processes(tmp_path):
+    child = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0])"
+    code = f"import subprocess, sys\nsubprocess.run([sys.executable, '-c', {child!r}])"
+    result = _service(max_open_files=64).execute_code(code, working_dir=str(tmp_path))
+    assert result.stdout.split() == ["64"]
+
+
+@posix_only
+def test_file_size_limit_stops_large_writes(tmp_path):
+    # Python ignores SIGXFSZ, so the write fails with EFBIG instead of killing the script
+    code = (
+        "import sys\n"
+        "try:\n"
+        "    open('big.bin', 'wb').write(b'x' * 2 * 1024 * 1024)\n"
+        "except OSError:\n"
+        "    sys.exit(3)\n"
+    )
+    result = _service(max_file_size_mb=1).execute_code(code, working_dir=str(tmp_path))
+    assert result.exit_code == 3
+    assert (tmp_path / "big.bin").stat().st_size <= 1024 * 1024
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="counts children through /proc"
+)
+def test_child_processes_are_counted(tmp_path):
+    code = "import subprocess, sys\nsubprocess.run([sys.executable, '-c', 'import time; time.sleep(0.5)'])"
+    result = _service().execute_code(code, working_dir=str(tmp_path))
+    assert result.success
+    assert result.child_process_count >= 1
+
+
+def test_only_declared_artifacts_are_returned():
+    code = (
+        "os.chdir(output_dir)\n"
+        "open('result.vtk', 'w').write('# vtk')\n"
+        "open('stray.vtu', 'w').write('not declared')\n"
+        "publish_file('result.vtk')\n"
+        "publish_file('missing.vtu')\n"
+    )
+    result = _service().execute_mesh_code(code)
+    assert result.success, result.stderr
+    assert result.artifacts == [
+        {
+            "name": "result.vtk",
+            "kind": "file",
+            "path": f"{result.output_dir}/result.vtk",
+        }
+    ]
+
+
+def test_scripts_run_in_the_app_directory():
+    result = _service().execute_mesh_code("print(os.getcwd() == working_dir)")
+    assert result.success, result.stderr
+    assert result.stdout.rstrip().endswith("True")
+
+
+def test_output_dirs_are_private_until_cleaned_up():
+    service = _service()
+    first = service.execute_mesh_code("pass").output_dir
+    second = service.execute_mesh_code("pass").output_dir
+    assert first != second
+
+    service.cleanup_output_dir(first)
+    assert not Path(first).exists()
+    assert Path(second).is_dir()
+    service.cleanup_output_dir(second)
+
+
+def test_cached_results_are_replayed(tmp_path):
+    service = _service(cache=ExecutionCache(str(tmp_path), 1024 * 1024))
+    code = (
+        "import uuid\n"
+        "print(uuid.uuid4().hex)\n"
+        "os.chdir(output_dir)\n"
+        "open('result.vtk', 'w').write('# vtk')\n"
+        "publish_file('result.vtk')\n"
+    )
+    first = service.execute_mesh_code(code)
+    replayed = service.execute_mesh_code(code)
+    assert not first.cached
+    assert replayed.cached
+    assert replayed.stdout == first.stdout
+    assert replayed.artifacts[0]["path"].startswith(str(tmp_path))
+
+    rerun = service.execute_mesh_code(code, bypass_cache=True)
+    assert not rerun.cached
+    assert rerun.stdout != first.stdout
+
+
+def test_cached_results_depend_on_timeout_and_limits(tmp_path):
+    cache = ExecutionCache(str(tmp_path), 1024 * 1024)
+    service = _service(cache=cache)
+    service.execute_mesh_code("print('run')")
+    assert service.execute_mesh_code("print('run')").cached
+    assert not service.execute_mesh_code("print('run')", timeout=5).cached
+
+    limited = _service(cache=cache, max_open_files=64)
+    assert not limited.execute_mesh_code("print('run')").cached
+
+
+@posix_only
+def test_persistent_runs_share_interpreter_state():
+    service = _service()
+    try:
+        first = service.execute_mesh_code("answer = 41", persistent=True)
+        assert first.success, first.stderr
+        second = service.execute_mesh_code("print(answer + 1)", persistent=True)
+        assert second.stdout.rstrip().endswith("42")
+        assert service.get_kernel_status()["execution_count"] == 2
+
+        service.restart_kernel()
+        third = service.execute_mesh_code("print(answer)", persistent=True)
+        assert not third.success
+        assert "NameError" in third.stderr
+    finally:
+        service.shutdown_kernel()
@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from khorium.app.services import compression
+from khorium.app.services.compression import (
+    DecompressionError,
+    StreamDecompressor,
+    decompress_stream,
+    split_compression_suffix,
+)
+
+CONTENT = b"solid part\n" + bytes(range(256)) * 4096 + b"endsolid part\n"
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_split_compression_suffix():
+    assert split_compression_suffix("part.stl.gz") == ("part.stl", "gzip")
+    assert split_compression_suffix("part.vtu.ZST") == ("part.vtu", "zstd")
+    assert split_compression_suffix("parts.zip") == ("parts", "zip")
+    assert split_compression_suffix("part.stl") == ("part.stl", None)
+
+
+def test_gzip_round_trip(tmp_path):
+    target = tmp_path / "part.stl"
+    content_hash, size, member = decompress_stream(
+        io.BytesIO(gzip.compress(CONTENT)), str(target), "gzip"
+    )
+    assert target.read_bytes() == CONTENT
+    assert (content_hash, size, member) == (
+        hashlib.sha256(CONTENT).hexdigest(),
+        len(CONTENT),
+        None,
+    )
+
+
+def test_gzip_output_is_bounded_per_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "CHUNK_SIZE", 1024)
+    chunks = []
+    decompressor = StreamDecompressor("gzip")
+    decompressor.feed(gzip.compress(CONTENT), chunks.append)
+    decompressor.finish(chunks.append)
+    assert b"".join(chunks) == CONTENT
+    assert max(len(chunk) for chunk in chunks) <= 1024
+
+
+def test_concatenated_gzip_members(tmp_path):
+    data = gzip.compress(b"first ") + gzip.compress(b"second")
+    decompress_stream(io.BytesIO(data), str(tmp_path / "out"), "gzip")
+    assert (tmp_path / "out").read_bytes() == b"first second"
+
+
+def test_truncated_gzip_is_rejected(tmp_path):
+    data = gzip.compress(CONTENT)
+    with pytest.raises(DecompressionError, match="Truncated"):
+        decompress_stream(
+            io.BytesIO(data[: len(data) // 2]), str(tmp_path / "out"), "gzip"
+        )
+
+
+def test_invalid_gzip_is_rejected(tmp_path):
+    with pytest.raises(DecompressionError, match="Invalid gzip") as excinfo:
+        decompress_stream(io.BytesIO(b"not gzip data"), str(tmp_path / "out"), "gzip")
+    assert excinfo.value.__cause__ is not None
+
+
+def test_gzip_size_limit(tmp_path):
+    with pytest.raises(DecompressionError, match="limit"):
+        decompress_stream(
+            io.BytesIO(gzip.compress(CONTENT)),
+            str(tmp_path / "out"),
+            "gzip",
+            max_output_bytes=len(CONTENT) - 1,
+        )
+
+
+def test_zstd_round_trip(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = zstandard.ZstdCompressor().compress(CONTENT)
+    _hash, size, _member = decompress_stream(
+        io.BytesIO(data), str(tmp_path / "out"), "zstd"
+    )
+    assert size == len(CONTENT)
+    assert (tmp_path / "out").read_bytes() == CONTENT
+
+    with pytest.raises(DecompressionError):
+        decompress_stream(io.BytesIO(b"not zstd data"), str(tmp_path / "out"), "zstd")
+
+
+def test_truncated_zstd_is_rejected(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = zstandard.ZstdCompressor().compress(CONTENT)
+    with pytest.raises(DecompressionError, match="Truncated zstd stream"):
+        decompress_stream(
+            io.BytesIO(data[: len(data) // 2]), str(tmp_path / "out"), "zstd"
+        )
+
+
+def test_concatenated_zstd_frames(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    data = compressor.compress(b"first ") + compressor.compress(b"second")
+    decompress_stream(io.BytesIO(data), str(tmp_path / "out"), "zstd")
+    assert (tmp_path / "out").read_bytes() == b"first second"
+
+
+def test_zstd_output_is_chunked_and_limited(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = zstandard.ZstdCompressor().compress(bytes(8 * compression.CHUNK_SIZE))
+    chunks = []
+    decompressor = StreamDecompressor("zstd")
+    decompressor.feed(data, chunks.append)
+    decompressor.finish(chunks.append)
+    assert sum(map(len, chunks)) == 8 * compression.CHUNK_SIZE
+    assert max(map(len, chunks)) <= compression.CHUNK_SIZE
+
+    with pytest.raises(DecompressionError, match="limit"):
+        decompress_stream(
+            io.BytesIO(data),
+            str(tmp_path / "out"),
+            "zstd",
+            max_output_bytes=compression.CHUNK_SIZE,
+        )
+
+
+def test_zip_single_member(tmp_path):
+    archive = _zip({"folder/part.stl": CONTENT})
+    _hash, size, member = decompress_stream(archive, str(tmp_path / "out"), "zip")
+    assert (size, member) == (len(CONTENT), "part.stl")
+    assert (tmp_path / "out").read_bytes() == CONTENT
+
+
+def test_zip_must_hold_one_file(tmp_path):
+    with pytest.raises(DecompressionError, match="exactly one file"):
+        decompress_stream(
+            _zip({"a.stl": b"a", "b.stl": b"b"}), str(tmp_path / "out"), "zip"
+        )
+
+
+def test_zip_size_limit(tmp_path):
+    with pytest.raises(DecompressionError, match="limit"):
+        decompress_stream(
+            _zip({"part.stl": CONTENT}),
+            str(tmp_path / "out"),
+            "zip",
+            max_output_bytes=1024,
+        )
+
+
+def test_invalid_zip_is_rejected(tmp_path):
+    with pytest.raises(DecompressionError, match="Invalid zip"):
+        decompress_stream(
+            io.BytesIO(b"not a zip archive"), str(tmp_path / "out"), "zip"
+        )
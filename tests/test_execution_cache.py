@@ -0,0 +1,94 @@
+import os
+import time
+from pathlib import Path
+
+from khorium.app.services.execution_cache import ExecutionCache
+
+
+def _result(tmp_path, name, size):
+    artifact = tmp_path / name
+    artifact.write_bytes(b"x" * size)
+    return {
+        "success": True,
+        "artifacts": [{"name": name, "kind": "mesh", "path": str(artifact)}],
+    }
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=1024 * 1024)
+    key = cache.make_key("print(1)", [])
+    assert cache.get(key) is None
+
+    stored = cache.put(key, _result(tmp_path, "mesh.msh", 100))
+    assert stored["artifacts"][0]["path"].startswith(str(tmp_path / "cache"))
+    assert cache.get(key) == stored
+
+
+def test_key_changes_with_code_inputs_and_extra(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=1024)
+    source = tmp_path / "model.stl"
+    source.write_bytes(b"solid a")
+
+    key = cache.make_key("code", [str(source)], extra="30")
+    assert key == cache.make_key("code", [str(source)], extra="30")
+    assert key != cache.make_key("other code", [str(source)], extra="30")
+    assert key != cache.make_key("code", [str(source)], extra="60")
+
+    source.write_bytes(b"solid b, modified")
+    assert key != cache.make_key("code", [str(source)], extra="30")
+
+
+def test_missing_artifact_is_a_miss(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=1024 * 1024)
+    stored = cache.put("key", _result(tmp_path, "mesh.msh", 10))
+    Path(stored["artifacts"][0]["path"]).unlink()
+    assert cache.get("key") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=2500)
+    cache.put("a", _result(tmp_path, "a.msh", 1000))
+    cache.put("b", _result(tmp_path, "b.msh", 1000))
+    # Age both entries so the touch on get() orders them
+    old = time.time() - 100
+    for name in ("a", "b"):
+        os.utime(tmp_path / "cache" / name, (old, old))
+    assert cache.get("a") is not None
+
+    cache.put("c", _result(tmp_path, "c.msh", 1000))
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_oversized_entry_is_kept(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=10)
+    cache.put("big", _result(tmp_path, "big.msh", 1000))
+    assert cache.get("big") is not None
+
+
+def test_key_depends_on_input_content_not_path(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=1024)
+    first, copy, other = (tmp_path / name for name in ("a.stl", "b.stl", "c.stl"))
+    first.write_bytes(b"solid a")
+    copy.write_bytes(b"solid a")
+    other.write_bytes(b"solid c")
+
+    key = cache.make_key("code", [str(first), str(other)])
+    assert key == cache.make_key("code", [str(other), str(copy)])
+    assert key != cache.make_key("code", [str(first), str(first)])
+
+
+def test_file_hash_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(ExecutionCache, "FILE_HASH_MEMO_SIZE", 2)
+    cache = ExecutionCache(str(tmp_path / "cache"), max_size_bytes=1024)
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.stl"
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+
+    cache.make_key("code", paths[:2])
+    cache.make_key("code", paths[:1])  # a is now the most recently used
+    cache.make_key("code", paths[2:])
+    assert list(cache._file_hashes) == [paths[0], paths[2]]
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+
+import pytest
+
+from khorium.app.services.execution_scheduler import (
+    ExecutionScheduler,
+    HostSlots,
+    QueueFullError,
+    fcntl,
+)
+
+posix_only = pytest.mark.skipif(fcntl is None, reason="host slots are POSIX only")
+
+
+async def _wait_until(predicate, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_less_busy_session_is_admitted_first():
+    async def scenario():
+        scheduler = ExecutionScheduler(max_concurrent=2, max_per_session=2)
+        started = []
+        gates = {name: threading.Event() for name in ("a1", "a2", "a3", "b1")}
+        positions = {name: [] for name in gates}
+
+        def job(name):
+            started.append(name)
+            assert gates[name].wait(5)
+            return name
+
+        def submit(session_id, name):
+            def on_queue_update(position, _depth):
+                positions[name].append(position)
+
+            return asyncio.ensure_future(
+                scheduler.run(session_id, job, name, on_queue_update=on_queue_update)
+            )
+
+        tasks = {name: submit("a", name) for name in ("a1", "a2", "a3")}
+        await _wait_until(lambda: len(started) == 2)
+        tasks["b1"] = submit("b", "b1")
+        await asyncio.sleep(0)
+
+        # b has nothing running, so it moves ahead of a's earlier request
+        assert positions["a3"] == [1, 2]
+        assert positions["b1"] == [1]
+
+        gates["a1"].set()
+        assert await tasks["a1"] == "a1"
+        await _wait_until(lambda: len(started) == 3)
+        assert started[2] == "b1"
+        assert scheduler.get_metrics()["queue_depth"] == 1
+
+        for gate in gates.values():
+            gate.set()
+        await asyncio.gather(*tasks.values())
+        assert sorted(started) == ["a1", "a2", "a3", "b1"]
+        metrics = scheduler.get_metrics()
+        assert metrics["completed"] == 4
+        assert metrics["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_same_session_is_admitted_fifo():
+    async def scenario():
+        scheduler = ExecutionScheduler(max_concurrent=1, max_per_session=1)
+        order = []
+        await asyncio.gather(*(scheduler.run("a", order.append, i) for i in range(4)))
+        assert order == [0, 1, 2, 3]
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_is_rejected():
+    async def scenario():
+        scheduler = ExecutionScheduler(
+            max_concurrent=1, max_per_session=1, max_queued_per_session=1
+        )
+        gate = threading.Event()
+        running = asyncio.ensure_future(scheduler.run("a", gate.wait, 5))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(scheduler.run("a", lambda: None))
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError):
+            await scheduler.run("a", lambda: None)
+        assert scheduler.get_metrics()["rejected"] == 1
+
+        gate.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = ExecutionScheduler(max_concurrent=1, max_per_session=1)
+        gate = threading.Event()
+        running = asyncio.ensure_future(scheduler.run("a", gate.wait, 5))
+        waiting = asyncio.ensure_future(scheduler.run("b", lambda: None))
+        await asyncio.sleep(0)
+        assert scheduler.get_metrics()["queue_depth"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.get_metrics()["queue_depth"] == 0
+
+        gate.set()
+        await running
+        assert scheduler.running_count == 0
+
+    asyncio.run(scenario())
+
+
+@posix_only
+def test_host_slots_are_exclusive(tmp_path):
+    slots = HostSlots(str(tmp_path), 2)
+    first, second = slots.try_acquire(), slots.try_acquire()
+    assert first is not None
+    assert second is not None
+    # Another process sees the same lock files
+    assert HostSlots(str(tmp_path), 2).try_acquire() is None
+
+    slots.release(first)
+    third = slots.try_acquire()
+    assert third is not None
+    slots.release(second)
+    slots.release(third)
+
+
+@posix_only
+def test_admission_waits_for_a_host_slot(tmp_path):
+    async def scenario():
+        other_process = HostSlots(str(tmp_path), 1)
+        held = other_process.try_acquire()
+        scheduler = ExecutionScheduler(
+            max_concurrent=1, host_slots=HostSlots(str(tmp_path), 1)
+        )
+        started = []
+        task = asyncio.ensure_future(scheduler.run("a", started.append, "a"))
+        await asyncio.sleep(0.2)
+        assert started == []
+        assert scheduler.get_metrics()["queue_depth"] == 1
+
+        other_process.release(held)
+        await asyncio.wait_for(task, timeout=5)
+        assert started == ["a"]
+        # The slot is given back once the run finishes
+        fd = other_process.try_acquire()
+        assert fd is not None
+        other_process.release(fd)
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from vtkmodules.vtkFiltersSources import vtkSphereSource
+from vtkmodules.vtkIOGeometry import vtkSTLWriter
+
+from khorium.app.controllers import file_controller
+from khorium.app.controllers.file_controller import FileController
+from khorium.app.controllers.view_controller import ViewController
+
+
+class FakePipeline:
+    """Waits for the preprocessing job in load_file, which must already be running"""
+
+    def __init__(self, controller_ref):
+        self.controller_ref = controller_ref
+        self.current_file = None
+        self.centered_on = "not centered"
+        self.contour_values = []
+
+    def is_file_loaded(self, path):
+        return path == self.current_file
+
+    def load_file(self, path):
+        job = self.controller_ref[0].preprocessing_service.current_job
+        assert job is not None
+        assert job.file_path == path
+        job.wait(30)
+        self.current_file = path
+        return True
+
+    def get_current_file(self):
+        return self.current_file
+
+    def center_camera_on_all_actors(self, original_bounds=None):
+        self.centered_on = original_bounds
+
+    def set_contour_value(self, value):
+        self.contour_values.append(value)
+
+
+class FakeStateManager:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def set_deferred(self, values):
+        self.values.update(values)
+
+    def show_mesh(self, visible=True):
+        self.values["mesh_visible"] = visible
+
+    def on_change(self, key, handler):
+        pass
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(file_controller, "FileService", lambda _session_id: None)
+    controller_ref = []
+    app = SimpleNamespace(
+        session_id="s1",
+        ctrl=SimpleNamespace(),
+        server=SimpleNamespace(trigger=lambda _name: lambda func: func),
+        state_manager=FakeStateManager(),
+        render_scheduler=SimpleNamespace(request_update=lambda **_: None),
+        vtk_pipeline=FakePipeline(controller_ref),
+    )
+    app.file_controller = FileController(app)
+    controller_ref.append(app.file_controller)
+    yield app
+    app.file_controller.preprocessing_service.executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def sphere_stl(tmp_path):
+    source = vtkSphereSource()
+    source.SetRadius(2.0)
+    writer = vtkSTLWriter()
+    writer.SetFileName(str(tmp_path / "sphere.stl"))
+    writer.SetInputConnection(source.GetOutputPort())
+    writer.Write()
+    return str(tmp_path / "sphere.stl")
+
+
+def test_preprocessing_starts_before_the_pipeline_loads(app, sphere_stl):
+    async def scenario():
+        app.file_controller._load_uploaded_file(sphere_stl)
+
+    asyncio.run(scenario())
+    bounds = app.file_controller.get_preprocessed("bounds")
+    assert bounds == pytest.approx([-2.0, 2.0, -2.0, 2.0, -2.0, 2.0], abs=0.1)
+    assert app.vtk_pipeline.centered_on == bounds
+
+
+def test_contour_value_is_kept_in_the_preprocessed_range(app, monkeypatch):
+    view_controller = ViewController(app)
+    ranges = {"array_ranges": [{"text": "pressure", "range": [0.0, 10.0]}]}
+    monkeypatch.setattr(app.file_controller, "get_preprocessed", ranges.get)
+
+    for value in (4.0, 25.0, -3.0):
+        view_controller.on_contour_value_change(contour_value=value)
+    assert app.vtk_pipeline.contour_values == [4.0, 10.0, 0.0]
+
+    ranges.clear()  # Not preprocessed yet, the value is passed through
+    view_controller.on_contour_value_change(contour_value=25.0)
+    assert app.vtk_pipeline.contour_values[-1] == 25.0
@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from khorium.app.services import file_service as file_service_module
+from khorium.app.services.file_service import FileService
+from khorium.app.services.upload_store import UploadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path / "store"))
+
+
+@pytest.fixture
+def service(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(file_service_module, "CURRENT_DIRECTORY", str(tmp_path))
+    return FileService("s1", store)
+
+
+def _stl(name="part"):
+    return f"solid {name}\nendsolid {name}\n".encode()
+
+
+def _vtu(points=0):
+    return (
+        '<?xml version="1.0"?>\n<VTKFile type="UnstructuredGrid"><UnstructuredGrid>'
+        f'<Piece NumberOfPoints="{points}" NumberOfCells="0"></Piece>'
+        "</UnstructuredGrid></VTKFile>\n"
+    ).encode()
+
+
+def _upload(service, filename, content, chunk_size=4):
+    upload_id = service.begin_chunked_upload(filename, len(content))
+    for offset in range(0, len(content), chunk_size):
+        assert service.write_chunk(
+            upload_id, offset, content[offset : offset + chunk_size]
+        )
+    return upload_id
+
+
+def test_chunked_upload_is_stored_under_its_logical_name(service, store):
+    content = b"solid part\nendsolid part\n"
+    upload_id = _upload(service, "part.stl", content)
+    assert service.get_upload_progress(upload_id)["percent"] == 100.0
+
+    digest = hashlib.sha256(content).hexdigest()
+    path = service.finish_chunked_upload(upload_id, expected_sha256=digest.upper())
+    assert path == store.blob_path(digest, ".stl")
+    assert service.get_uploaded_stl_file() == path
+    assert Path(path).read_bytes() == content
+    assert service.content_hashes[path] == digest
+    assert list(Path(store.staging_dir).iterdir()) == []
+
+
+def test_unsupported_or_empty_uploads_are_rejected(service):
+    assert service.begin_chunked_upload("mesh.obj", 10) is None
+    assert service.begin_chunked_upload("mesh.vtu", 0) is None
+
+
+def test_out_of_order_chunk_is_rejected(service):
+    upload_id = service.begin_chunked_upload("mesh.vtu", 8)
+    assert not service.write_chunk(upload_id, 4, b"abcd")
+    assert service.write_chunk(upload_id, 0, b"abcd")
+    assert service.get_upload_progress(upload_id)["received"] == 4
+
+
+def test_oversized_chunk_aborts_upload(service, store):
+    upload_id = service.begin_chunked_upload("mesh.vtu", 4)
+    assert not service.write_chunk(upload_id, 0, b"too long")
+    assert service.get_upload_progress(upload_id) == {}
+    assert list(Path(store.staging_dir).iterdir()) == []
+
+
+def test_incomplete_or_corrupt_uploads_keep_the_old_file(service, store, tmp_path):
+    assert service.get_current_vtu_file() == str(tmp_path / "cad_000.vtu")
+    upload_id = _upload(service, "mesh.vtu", _vtu(points=1))
+    old = service.finish_chunked_upload(upload_id)
+
+    upload_id = service.begin_chunked_upload("mesh.vtu", 8)
+    service.write_chunk(upload_id, 0, b"half")
+    assert service.finish_chunked_upload(upload_id) is None
+
+    upload_id = _upload(service, "mesh.vtu", _vtu(points=2))
+    assert service.finish_chunked_upload(upload_id, expected_sha256="0" * 64) is None
+
+    assert service.get_current_vtu_file() == old
+    assert list(Path(store.staging_dir).iterdir()) == []
+
+
+def test_duplicate_content_is_linked_without_transfer(service, store):
+    content = _stl()
+    digest = hashlib.sha256(content).hexdigest()
+    assert service.link_existing_upload("part.stl", digest) is None
+
+    path = service.finish_chunked_upload(_upload(service, "part.stl", content))
+    other = FileService("s2", store)
+    assert other.link_existing_upload("part.stl", digest.upper()) == path
+    assert other.get_uploaded_stl_file() == path
+
+    service.release_uploads()
+    assert Path(path).exists()
+    other.release_uploads()
+    assert not Path(path).exists()
+
+
+def test_unknown_upload_id(service):
+    assert not service.write_chunk("missing", 0, b"x")
+    assert service.finish_chunked_upload("missing") is None
+    service.abort_chunked_upload("missing")
+
+
+def test_gzip_chunked_upload_is_stored_decompressed(service, store):
+    content = _stl("x" * 1000)
+    upload_id = _upload(service, "part.stl.gz", gzip.compress(content), chunk_size=64)
+    path = service.finish_chunked_upload(upload_id)
+
+    digest = hashlib.sha256(content).hexdigest()
+    assert path == store.blob_path(digest, ".stl")
+    assert Path(path).read_bytes() == content
+    assert list(Path(store.staging_dir).iterdir()) == []
+
+
+def test_corrupt_compressed_upload_is_rejected(service, store):
+    payload = gzip.compress(_stl("x" * 1000))[:-8]
+    upload_id = _upload(service, "part.stl.gz", payload, chunk_size=64)
+    assert service.finish_chunked_upload(upload_id) is None
+    assert list(Path(store.staging_dir).iterdir()) == []
+
+
+def _client_file(name, content):
+    return {"name": name, "size": len(content), "type": "", "content": content}
+
+
+def test_process_uploaded_files_stores_the_first_file(service):
+    path = service.process_uploaded_files(
+        [_client_file("mesh.vtu", _vtu()), _client_file("b.vtu", b"x")]
+    )
+    assert path == service.get_current_vtu_file()
+    assert Path(path).read_bytes() == _vtu()
+    assert service.process_uploaded_files([]) is None
+    assert service.process_uploaded_files([_client_file("mesh.obj", b"o")]) is None
+
+
+def test_batch_files_are_ingested_as_separate_parts(service, store):
+    files = [_client_file(f"part{i}.stl", _stl(str(i))) for i in range(4)]
+    futures = [
+        service.ingest_executor.submit(
+            service.ingest_file, i, file, lambda path: Path(path).read_bytes()
+        )
+        for i, file in enumerate(files)
+    ]
+    results = [future.result() for future in futures]
+
+    assert [r["status"] for r in results] == ["loaded"] * 4
+    assert [r["dataset"] for r in results] == [f["content"] for f in files]
+    assert store.list_names("s1") == [f"part_{i:03d}_uploaded.stl" for i in range(4)]
+    assert set(results[0]["timings"]) == {"validate", "store", "parse", "total"}
+
+    service.begin_batch()
+    assert store.list_names("s1") == []
+
+
+def test_ingest_reports_per_file_failures(service):
+    def parse(path):
+        msg = f"bad mesh in {Path(path).suffix}"
+        raise ValueError(msg)
+
+    invalid = service.ingest_file(0, _client_file("part.obj", b"o"))
+    assert invalid["status"] == "failed"
+    assert "Invalid file format" in invalid["error"]
+
+    unparsable = service.ingest_file(1, _client_file("part.stl", _stl()), parse)
+    assert unparsable["status"] == "failed"
+    assert unparsable["error"] == "Error parsing file: bad mesh in .stl"
+    assert unparsable["path"] is not None
+
+    stored = service.ingest_file(2, _client_file("part.stl", _stl()))
+    assert stored["status"] == "stored"
+    assert stored["sha256"] == hashlib.sha256(_stl()).hexdigest()
+
+
+def test_structurally_invalid_uploads_are_rejected(service, store):
+    truncated = _vtu()[:-20]
+    assert service.process_uploaded_files([_client_file("mesh.vtu", truncated)]) is None
+
+    result = service.ingest_file(0, _client_file("part.stl", b"\0" * 90))
+    assert result["status"] == "failed"
+    assert "binary STL header" in result["error"]
+
+    upload_id = _upload(service, "part.stl", b"\0" * 90)
+    assert service.finish_chunked_upload(upload_id) is None
+    assert store.list_names("s1") == []
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from khorium.app.services.kernel_session import KernelSession
+
+
+@pytest.fixture
+def kernel():
+    session = KernelSession(idle_timeout=0)
+    yield session
+    session.shutdown()
+
+
+def _run(kernel, code, tmp_path, timeout=30):
+    result = kernel.execute(code, str(tmp_path), {}, timeout)
+    result["stdout"] = Path(result["stdout_path"]).read_text()
+    result["stderr"] = Path(result["stderr_path"]).read_text()
+    return result
+
+
+def test_namespace_persists_between_cells(kernel, tmp_path):
+    assert _run(kernel, "mesh = [1, 2, 3]", tmp_path)["exit_code"] == 0
+    result = _run(kernel, "print(sum(mesh))", tmp_path)
+    assert result["stdout"] == "6\n"
+    assert kernel.execution_count == 2
+    assert kernel.get_status()["alive"]
+
+
+def test_errors_and_exit_codes(kernel, tmp_path):
+    result = _run(kernel, "raise ValueError('bad cell')", tmp_path)
+    assert result["exit_code"] == 1
+    assert "ValueError: bad cell" in result["stderr"]
+    assert _run(kernel, "raise SystemExit(4)", tmp_path)["exit_code"] == 4
+    # The kernel survives failing cells
+    assert _run(kernel, "print('still here')", tmp_path)["stdout"] == "still here\n"
+
+
+def test_timeout_restarts_the_kernel(kernel, tmp_path):
+    _run(kernel, "value = 1", tmp_path)
+    pid = kernel.pid
+
+    result = _run(kernel, "import time; time.sleep(30)", tmp_path, timeout=0.5)
+    assert result["timed_out"]
+    assert not kernel.is_alive()
+
+    result = _run(kernel, "print('value' in globals())", tmp_path)
+    assert result["stdout"] == "False\n"
+    assert kernel.pid != pid
+
+
+@pytest.mark.skipif(os.name != "posix", reason="kills the process group")
+def test_timeout_kills_processes_spawned_by_the_kernel(kernel, tmp_path):
+    code = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+        "print(child.pid, flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    result = _run(kernel, code, tmp_path, timeout=1)
+    assert result["timed_out"]
+    child_pid = int(result["stdout"])
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("process spawned by the kernel survived the timeout")
+
+
+def test_wrap_command_prefixes_the_kernel_command(tmp_path):
+    wrapped = []
+
+    def wrap(command):
+        wrapped.append(command)
+        return [sys.executable, *command[1:]]
+
+    kernel = KernelSession(idle_timeout=0, wrap_command=wrap)
+    try:
+        result = _run(kernel, "import sys; print(sys.executable)", tmp_path)
+    finally:
+        kernel.shutdown()
+    assert wrapped[0][0] == "python"
+    assert result["stdout"] == f"{sys.executable}\n"
+
+
+def test_dead_kernel_is_reported(kernel, tmp_path):
+    result = _run(kernel, "import os; os._exit(9)", tmp_path)
+    assert result["kernel_died"]
+    assert result["exit_code"] == -1
+    assert _run(kernel, "print('fresh')", tmp_path)["stdout"] == "fresh\n"
+
+
+def test_restart_discards_state(kernel, tmp_path):
+    _run(kernel, "value = 1", tmp_path)
+    kernel.restart()
+    assert kernel.execution_count == 0
+    assert "NameError" in _run(kernel, "value", tmp_path)["stderr"]
+
+
+def test_memory_cap_stops_the_kernel(tmp_path):
+    kernel = KernelSession(idle_timeout=0, max_memory_mb=1)
+    result = _run(kernel, "pass", tmp_path)
+    assert result["memory_cap_exceeded"]
+    assert not kernel.is_alive()
+
+
+def test_idle_kernel_is_shut_down(tmp_path):
+    kernel = KernelSession(idle_timeout=0.2)
+    _run(kernel, "pass", tmp_path)
+    assert kernel.is_alive()
+    deadline = time.monotonic() + 5
+    while kernel.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not kernel.is_alive()
@@ -0,0 +1,105 @@
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from khorium.app.utils import log
+from khorium.app.utils.log import (
+    JsonFormatter,
+    TextFormatter,
+    _QueueHandler,
+    parse_module_levels,
+)
+
+
+def _record(level=logging.INFO, msg="loaded %s", args=("mesh.vtu",), **extra):
+    record = logging.LogRecord(
+        "khorium.app.core.vtk_pipeline", level, __file__, 1, msg, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_text_formatter_tags_non_info_levels():
+    formatter = TextFormatter()
+    assert formatter.format(_record()) == ">>> VTK_PIPELINE: loaded mesh.vtu"
+    assert (
+        formatter.format(_record(logging.WARNING))
+        == ">>> VTK_PIPELINE: [WARNING] loaded mesh.vtu"
+    )
+
+
+def test_json_formatter_includes_extra_fields_and_exceptions():
+    try:
+        raise RuntimeError("bad")  # noqa: EM101
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    record = _record(logging.ERROR, cells=12)
+    record.exc_info = exc_info
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["level"] == "ERROR"
+    assert payload["logger"] == "khorium.app.core.vtk_pipeline"
+    assert payload["message"] == "loaded mesh.vtu"
+    assert payload["cells"] == 12
+    assert "RuntimeError: bad" in payload["exception"]
+
+
+def test_queued_records_are_interpolated_before_handoff():
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    values = ["first"]
+    handler.handle(_record(msg="values %s", args=(values,)))
+    values.append("second")
+
+    queued = log_queue.get_nowait()
+    assert queued.getMessage() == "values ['first']"
+    assert queued.args is None
+
+
+@pytest.mark.parametrize(
+    ("spec", "expected"),
+    [
+        ("", {}),
+        (
+            "core.vtk_pipeline=debug, services=WARNING",
+            {
+                "khorium.app.core.vtk_pipeline": "DEBUG",
+                "khorium.app.services": "WARNING",
+            },
+        ),
+        (
+            "khorium=error,khorium.other=info",
+            {"khorium": "ERROR", "khorium.other": "INFO"},
+        ),
+        ("missing_level=,=DEBUG", {}),
+    ],
+)
+def test_parse_module_levels(spec, expected):
+    assert parse_module_levels(spec) == expected
+
+
+def test_configure_logging_installs_once(monkeypatch, capsys):
+    monkeypatch.setattr(log, "_listener", None)
+    monkeypatch.setattr(log.atexit, "register", lambda _stop: None)
+    root = logging.getLogger(log.ROOT_LOGGER)
+    for attribute in ("handlers", "level", "propagate"):
+        monkeypatch.setattr(root, attribute, getattr(root, attribute))
+    module_logger = logging.getLogger("khorium.app.services.file_service")
+    monkeypatch.setattr(module_logger, "level", logging.NOTSET)
+
+    log.configure_logging("WARNING", "services.file_service=DEBUG", "text")
+    listener = log._listener
+    try:
+        log.configure_logging("DEBUG", "", "json")
+        assert log._listener is listener
+        assert root.level == logging.WARNING
+        assert module_logger.level == logging.DEBUG
+
+        module_logger.debug("stored %s", "part.stl")
+        logging.getLogger("khorium.app.core.metrics").info("hidden")
+    finally:
+        listener.stop()
+    assert capsys.readouterr().out == ">>> FILE_SERVICE: [DEBUG] stored part.stl\n"
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from khorium.app.controllers import mesh_controller
+from khorium.app.controllers.mesh_controller import MeshController
+from khorium.app.services.code_execution_service import CodeExecutionResult
+
+
+class FakeStateManager:
+    def __init__(self):
+        self.completed = []
+
+    def on_change(self, key, handler):
+        pass
+
+    def complete_mesh_code_execution(self, success, result, error_message=""):
+        self.completed.append((success, result, error_message))
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(mesh_controller, "MeshService", lambda: None)
+    monkeypatch.setattr(mesh_controller, "FileService", lambda _session_id: None)
+    monkeypatch.setattr(
+        mesh_controller,
+        "CodeExecutionService",
+        lambda **_: SimpleNamespace(cleanup_output_dir=lambda _path: None),
+    )
+    app = SimpleNamespace(
+        session_id="s1",
+        ctrl=SimpleNamespace(),
+        server=SimpleNamespace(trigger=lambda _name: lambda func: func),
+        state_manager=FakeStateManager(),
+        vtk_pipeline=SimpleNamespace(
+            get_scene_token=lambda: 0, scene_changed_since=lambda _token: False
+        ),
+    )
+    return MeshController(app)
+
+
+def _result(success, stderr="", error_message=""):
+    return CodeExecutionResult(
+        success, "", stderr, 0 if success else 1, 0.1, error_message
+    )
+
+
+def test_successful_run_with_stderr_has_no_error(controller):
+    controller._apply_mesh_code_result(
+        _result(True, stderr="DeprecationWarning"), False
+    )
+    ((success, result, error_message),) = controller.app.state_manager.completed
+    assert success
+    assert result["stderr"] == "DeprecationWarning"
+    assert error_message == ""
+
+
+@pytest.mark.parametrize(
+    ("stderr", "error_message", "expected"),
+    [
+        ("Traceback", "Script exited with code 1", "Script exited with code 1"),
+        ("Traceback", "", "Traceback"),
+        ("", "", "Execution failed"),
+    ],
+)
+def test_failed_run_reports_the_first_error_available(
+    controller, stderr, error_message, expected
+):
+    controller._apply_mesh_code_result(_result(False, stderr, error_message), False)
+    assert controller.app.state_manager.completed[0][2] == expected
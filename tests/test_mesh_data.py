@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from khorium.app.core.mesh_data import (
+    MeshConversionCache,
+    build_unstructured_grid,
+    load_npz_mesh,
+    read_msh,
+)
+
+
+def test_grid_from_cell_blocks():
+    points = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    grid = build_unstructured_grid(
+        points, [("tetra", [[0, 1, 2, 3]]), ("triangle", [[0, 1, 2], [0, 1, 3]])]
+    )
+    assert grid.GetNumberOfPoints() == 4
+    assert grid.GetNumberOfCells() == 3
+    assert [grid.GetCellType(i) for i in range(3)] == [10, 5, 5]
+    assert [grid.GetCell(2).GetPointId(i) for i in range(3)] == [0, 1, 3]
+
+
+def test_2d_points_are_padded():
+    grid = build_unstructured_grid([[0, 0], [1, 0], [0, 1]], {"triangle": [[0, 1, 2]]})
+    assert grid.GetPoint(1) == (1.0, 0.0, 0.0)
+
+
+def test_unknown_and_empty_blocks_are_skipped():
+    grid = build_unstructured_grid(
+        np.zeros((3, 3)),
+        {"polyhedron42": [[0, 1, 2]], "quad": np.zeros((0, 4)), "vertex": [0, 1]},
+    )
+    assert grid.GetNumberOfCells() == 2
+    assert grid.GetCellType(0) == 1
+
+
+def test_invalid_points_are_rejected():
+    with pytest.raises(ValueError, match="shape"):
+        build_unstructured_grid(np.zeros((3, 4)), {})
+
+
+def test_npz_round_trip(tmp_path):
+    path = tmp_path / "mesh.npz"
+    np.savez(
+        path,
+        points=np.eye(3),
+        cells_0=np.array([[0, 1, 2]]),
+        cell_types=np.array(["triangle"]),
+    )
+    grid = load_npz_mesh(str(path))
+    assert grid.GetNumberOfCells() == 1
+    assert grid.GetCellType(0) == 5
+
+
+MSH_TETRA = """$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$Nodes
+4
+1 0 0 0
+2 1 0 0
+3 0 1 0
+4 0 0 1
+$EndNodes
+$Elements
+2
+1 4 2 0 1 1 2 3 4
+2 2 2 0 1 1 2 3
+$EndElements
+"""
+
+
+@pytest.fixture
+def msh_file(tmp_path):
+    path = tmp_path / "mesh.msh"
+    path.write_text(MSH_TETRA)
+    return path
+
+
+def test_read_msh(msh_file):
+    pytest.importorskip("meshio")
+    grid = read_msh(str(msh_file))
+    assert grid.GetNumberOfPoints() == 4
+    assert sorted(grid.GetCellType(i) for i in range(grid.GetNumberOfCells())) == [
+        5,
+        10,
+    ]
+
+
+def _counting_converter():
+    calls = []
+
+    def convert(path):
+        calls.append(path)
+        return build_unstructured_grid(np.zeros((1, 3)), {})
+
+    return calls, convert
+
+
+def test_conversion_cache_recognizes_content(tmp_path):
+    calls, convert = _counting_converter()
+    cache = MeshConversionCache()
+    first, copy = tmp_path / "a.msh", tmp_path / "b.msh"
+    first.write_text("mesh a")
+    copy.write_text("mesh a")
+
+    grid = cache.get_or_convert(str(first), convert)
+    assert cache.get_or_convert(str(first), convert) is grid
+    # A different path with the same content is the same mesh
+    assert cache.get_or_convert(str(copy), convert) is grid
+    assert len(calls) == 1
+
+    first.write_text("mesh a, rewritten")
+    assert cache.get_or_convert(str(first), convert) is not grid
+    assert len(calls) == 2
+
+
+def test_conversion_cache_evicts_least_recently_used(tmp_path):
+    calls, convert = _counting_converter()
+    cache = MeshConversionCache(max_entries=2)
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.msh"
+        path.write_text(name)
+        paths.append(str(path))
+
+    cache.get_or_convert(paths[0], convert)
+    cache.get_or_convert(paths[1], convert)
+    cache.get_or_convert(paths[0], convert)
+    cache.get_or_convert(paths[2], convert)
+    assert len(calls) == 3
+
+    cache.get_or_convert(paths[0], convert)
+    assert len(calls) == 3
+    cache.get_or_convert(paths[1], convert)
+    assert len(calls) == 4
+
+
+def test_conversion_cache_forgets_evicted_paths(tmp_path):
+    _calls, convert = _counting_converter()
+    cache = MeshConversionCache(max_entries=2)
+    paths = []
+    for index in range(10):
+        path = tmp_path / f"{index}.msh"
+        path.write_text(str(index))
+        paths.append(str(path))
+        cache.get_or_convert(paths[-1], convert)
+    assert set(cache._stats) == set(paths[-2:])
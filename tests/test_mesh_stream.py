@@ -0,0 +1,169 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+mesh_stream = pytest.importorskip("khorium.app.services.mesh_stream")
+
+MeshStreamService = mesh_stream.MeshStreamService
+
+
+@pytest.fixture
+def tetra_mesh(monkeypatch):
+    """Random tetrahedra, passed through open() as the already extracted arrays"""
+    monkeypatch.setattr(mesh_stream, "extract_mesh_arrays", lambda arrays: arrays)
+    rng = np.random.default_rng(0)
+    points = rng.uniform([-50.0, 0.0, 1e3], [50.0, 1e-3, 1e3 + 7.0], size=(20000, 3))
+    cells = 10000
+    return {
+        "points": points,
+        "connectivity": rng.integers(0, len(points), size=cells * 4).astype(np.int64),
+        "offsets": np.arange(0, cells * 4 + 1, 4, dtype=np.int64),
+        "cell_types": np.full(cells, 10, dtype=np.uint8),
+    }
+
+
+def _receive(service, header, max_chunks=4):
+    """Pull every chunk of a stream and reassemble its arrays"""
+    arrays = {
+        name: np.zeros(info["length"], dtype=info["dtype"])
+        for name, info in header["arrays"].items()
+    }
+    seqs = []
+    while True:
+        reply = service.next(header["stream_id"], max_chunks=max_chunks)
+        for chunk in reply["chunks"]:
+            data = np.frombuffer(chunk["data"], dtype=chunk["dtype"])
+            assert len(data) == chunk["count"]
+            assert data.nbytes <= header["chunk_bytes"]
+            arrays[chunk["array"]][
+                chunk["offset"] : chunk["offset"] + chunk["count"]
+            ] = data
+            seqs.append(chunk["seq"])
+        if reply["done"]:
+            break
+    assert seqs == list(range(header["total_chunks"]))
+    return arrays
+
+
+def test_point_chunks_hold_whole_points(tetra_mesh):
+    service = MeshStreamService(chunk_bytes=16 * 1024)
+    stream = service.streams[service.open(tetra_mesh)["stream_id"]]
+    point_chunks = [
+        (start, count) for name, start, count in stream.chunks if name == "points"
+    ]
+    assert all(start % 3 == 0 and count % 3 == 0 for start, count in point_chunks)
+
+
+def test_uint16_quantization_error_is_bounded(tetra_mesh):
+    service = MeshStreamService()
+    header = service.open(tetra_mesh, point_format="uint16")
+    quantized = _receive(service, header)["points"].reshape(-1, 3)
+
+    decoded = quantized * np.array(header["scale"]) + np.array(header["offset"])
+    error = np.abs(decoded - tetra_mesh["points"]).max(axis=0)
+    assert np.all(error <= np.array(header["max_error"]) * (1 + 1e-9))
+    extent = tetra_mesh["points"].max(axis=0) - tetra_mesh["points"].min(axis=0)
+    np.testing.assert_allclose(header["max_error"], extent / 65535 / 2)
+
+
+def test_uint16_flat_axis(tetra_mesh):
+    tetra_mesh["points"][:, 2] = 3.0
+    service = MeshStreamService()
+    header = service.open(tetra_mesh, point_format="uint16", arrays=["points"])
+    quantized = _receive(service, header)["points"].reshape(-1, 3)
+    assert header["scale"][2] == 0.0
+    np.testing.assert_array_equal(
+        quantized[:, 2] * header["scale"][2] + header["offset"][2], 3.0
+    )
+
+
+def test_float16_range(tetra_mesh):
+    service = MeshStreamService()
+    assert (
+        service.open(tetra_mesh, point_format="float16")["arrays"]["points"]["dtype"]
+        == "float16"
+    )
+    tetra_mesh["points"][0, 0] = 1e5
+    with pytest.raises(ValueError, match="float16"):
+        service.open(tetra_mesh, point_format="float16")
+
+
+def test_auto_index_format(tetra_mesh):
+    service = MeshStreamService()
+    header = service.open(tetra_mesh, index_format="auto", arrays=["connectivity"])
+    assert list(header["arrays"]) == ["connectivity"]
+    assert header["arrays"]["connectivity"]["dtype"] == "uint16"
+
+    tetra_mesh["points"] = np.zeros((70000, 3))
+    header = service.open(tetra_mesh, index_format="auto", arrays=["connectivity"])
+    assert header["arrays"]["connectivity"]["dtype"] == "int32"
+
+
+def test_invalid_options(tetra_mesh):
+    service = MeshStreamService()
+    for options in (
+        {"point_format": "float64"},
+        {"index_format": "int64"},
+        {"arrays": ["normals"]},
+    ):
+        with pytest.raises(ValueError, match=r"Unsupported|Unknown"):
+            service.open(tetra_mesh, **options)
+
+
+def test_next_is_bounded_and_resumable(tetra_mesh):
+    service = MeshStreamService(chunk_bytes=16 * 1024, max_chunks_per_request=3)
+    header = service.open(tetra_mesh)
+    stream_id = header["stream_id"]
+
+    reply = service.next(stream_id, max_chunks=100)
+    assert [chunk["seq"] for chunk in reply["chunks"]] == [0, 1, 2]
+    # A lost reply is recovered by asking again from the last chunk received
+    reply = service.next(stream_id, max_chunks=2, from_seq=1)
+    assert [chunk["seq"] for chunk in reply["chunks"]] == [1, 2]
+    assert reply["next_seq"] == 3
+
+    reply = service.next(stream_id, from_seq=header["total_chunks"])
+    assert reply["chunks"] == []
+    assert reply["done"] is True
+
+
+def test_streams_are_closed_evicted_and_expired(tetra_mesh, monkeypatch):
+    service = MeshStreamService(max_open=2, idle_timeout=60)
+    first, second, third = (
+        service.open(tetra_mesh, arrays=["cell_types"])["stream_id"] for _ in range(3)
+    )
+    with pytest.raises(KeyError):
+        service.next(first)
+
+    assert service.close(second) is True
+    assert service.close(second) is False
+
+    now = mesh_stream.time.monotonic()
+    monkeypatch.setattr(mesh_stream.time, "monotonic", lambda: now + 120)
+    with pytest.raises(KeyError):
+        service.next(third)
+
+
+def test_offsets_past_int32_are_rejected(tetra_mesh):
+    tetra_mesh["offsets"] = tetra_mesh["offsets"].copy()
+    tetra_mesh["offsets"][-1] = mesh_stream.INT32_MAX + 1
+    with pytest.raises(ValueError, match="32-bit"):
+        MeshStreamService().open(tetra_mesh)
+
+
+def test_chunks_reassemble_the_mesh(tetra_mesh):
+    service = MeshStreamService(chunk_bytes=16 * 1024)
+    header = service.open(tetra_mesh)
+    assert header["points"] == 20000
+    assert header["cells"] == 10000
+    assert header["total_bytes"] == sum(
+        info["length"] * np.dtype(info["dtype"]).itemsize
+        for info in header["arrays"].values()
+    )
+
+    arrays = _receive(service, header)
+    np.testing.assert_array_equal(
+        arrays["points"].reshape(-1, 3), tetra_mesh["points"].astype(np.float32)
+    )
+    np.testing.assert_array_equal(arrays["connectivity"], tetra_mesh["connectivity"])
+    np.testing.assert_array_equal(arrays["offsets"], tetra_mesh["offsets"])
+    np.testing.assert_array_equal(arrays["cell_types"], tetra_mesh["cell_types"])
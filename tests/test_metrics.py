@@ -0,0 +1,89 @@
+import pytest
+
+from khorium.app.core.metrics import MetricsRegistry, get_process_rss_bytes
+
+
+def test_counter_renders_per_label_set():
+    registry = MetricsRegistry()
+    counter = registry.counter("uploads_total", "Uploads", ["kind"])
+    counter.inc(kind="stl")
+    counter.inc(2, kind="stl")
+    counter.inc(0.5, kind='a"b')
+
+    assert counter.get(kind="stl") == 3
+    assert registry.render() == (
+        "# HELP uploads_total Uploads\n"
+        "# TYPE uploads_total counter\n"
+        'uploads_total{kind="a\\"b"} 0.5\n'
+        'uploads_total{kind="stl"} 3\n'
+    )
+
+
+def test_labels_must_match():
+    counter = MetricsRegistry().counter("uploads_total", "Uploads", ["kind"])
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc()
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc(kind="stl", status="ok")
+
+
+def test_registration_is_idempotent():
+    registry = MetricsRegistry()
+    assert registry.counter("jobs_total", "Jobs") is registry.counter(
+        "jobs_total", "Jobs"
+    )
+    with pytest.raises(ValueError, match="already registered"):
+        registry.gauge("jobs_total", "Jobs")
+    with pytest.raises(ValueError, match="already registered"):
+        registry.counter("jobs_total", "Jobs", ["kind"])
+
+
+def test_gauge_functions_are_computed_at_scrape():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("active_jobs", "Jobs", ["kind"])
+    running = [3]
+    gauge.set_function(lambda: running[0], kind="mesh")
+    gauge.set(1, kind="upload")
+    gauge.dec(kind="upload")
+    gauge.set_function(lambda: 1 / 0, kind="broken")
+
+    running[0] = 5
+    assert gauge.get(kind="mesh") == 5
+    lines = registry.render().splitlines()
+    assert 'active_jobs{kind="mesh"} 5' in lines
+    assert 'active_jobs{kind="upload"} 0' in lines
+    assert not any("broken" in line for line in lines)
+
+    gauge.remove(kind="mesh")
+    assert "mesh" not in registry.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "run_seconds", "Runs", ["status"], buckets=(1.0, 0.1)
+    )
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, status="ok")
+
+    assert histogram.buckets == (0.1, 1.0)
+    assert histogram.get_count(status="ok") == 4
+    assert registry.render().splitlines()[2:] == [
+        'run_seconds_bucket{status="ok",le="0.1"} 2',
+        'run_seconds_bucket{status="ok",le="1"} 3',
+        'run_seconds_bucket{status="ok",le="+Inf"} 4',
+        'run_seconds_sum{status="ok"} 5.65',
+        'run_seconds_count{status="ok"} 4',
+    ]
+
+
+def test_histogram_time_takes_labels_from_the_block():
+    histogram = MetricsRegistry().histogram("run_seconds", "Runs", ["status"])
+    with histogram.time(status="error") as labels:
+        labels["status"] = "ok"
+    assert histogram.get_count(status="ok") == 1
+    assert histogram.get_count(status="error") == 0
+
+
+def test_process_rss_is_positive():
+    assert get_process_rss_bytes() > 0
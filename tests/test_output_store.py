@@ -0,0 +1,78 @@
+import pytest
+
+from khorium.app.services.output_store import MAX_PAGE_CHARS, OutputStore
+
+
+def test_pages_cover_the_stream_without_gaps():
+    store = OutputStore()
+    text = "".join(f"line {i} é\n" for i in range(1000))
+    output_id = store.put(text, "")
+
+    pages, offset = [], 0
+    while True:
+        page = store.read(output_id, offset=offset, length=1000)
+        assert page["offset"] == offset
+        assert page["total_size"] == len(text)
+        pages.append(page["data"])
+        offset = page["next_offset"]
+        if page["eof"]:
+            break
+    assert "".join(pages) == text
+    assert len(pages) == -(-len(text) // 1000)
+
+
+def test_negative_offset_reads_the_tail():
+    store = OutputStore()
+    output_id = store.put("0123456789", "")
+    page = store.read(output_id, offset=-3)
+    assert (page["offset"], page["data"], page["eof"]) == (7, "789", True)
+    assert store.read(output_id, offset=-100)["offset"] == 0
+
+
+def test_offsets_and_lengths_are_clamped():
+    store = OutputStore()
+    output_id = store.put("0123456789", "")
+    page = store.read(output_id, offset=50, length=5)
+    assert (page["offset"], page["next_offset"], page["data"], page["eof"]) == (
+        10,
+        10,
+        "",
+        True,
+    )
+    assert store.read(output_id, offset=2, length=-1)["data"] == ""
+
+    long_id = store.put("x" * (MAX_PAGE_CHARS + 10), "")
+    assert len(store.read(long_id, length=MAX_PAGE_CHARS * 2)["data"]) == MAX_PAGE_CHARS
+
+
+def test_streams_are_read_separately():
+    store = OutputStore()
+    output_id = store.put("out", "err")
+    assert store.read(output_id, "stderr")["data"] == "err"
+    with pytest.raises(ValueError, match="Unknown output stream"):
+        store.read(output_id, "stdin")
+
+
+def test_summary_previews_the_tail():
+    store = OutputStore(preview_chars=4)
+    output_id = store.put("a\nb\nlast", "")
+    summary = store.summarize(output_id)
+    assert summary["stdout_size"] == 8
+    assert summary["stdout_lines"] == 3
+    assert summary["stdout_preview"] == "last"
+    assert summary["stdout_preview_complete"] is False
+    assert summary["stderr_preview_complete"] is True
+    assert store.summarize("unknown") == {}
+
+
+def test_oldest_outputs_are_evicted():
+    store = OutputStore(max_outputs=2)
+    first = store.put("1", "")
+    second = store.put("2", "")
+    third = store.put("3", "")
+    assert store.read(first) is None
+    assert store.read(second)["data"] == "2"
+    assert store.read(third)["data"] == "3"
+
+    store.discard(third)
+    assert store.read(third) is None
@@ -0,0 +1,145 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from vtkmodules.vtkCommonDataModel import vtkDataObject
+from vtkmodules.vtkFiltersSources import vtkSphereSource
+from vtkmodules.vtkIOGeometry import vtkSTLWriter
+
+from khorium.app.services.preprocessing_service import (
+    PreprocessingJob,
+    PreprocessingService,
+)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def _job(stages, executor, tmp_path):
+    return PreprocessingJob("mesh.vtu", stages, executor, str(tmp_path))
+
+
+def test_stages_receive_dependency_results(executor, tmp_path):
+    job = _job(
+        {
+            "total": (["a", "b"], lambda a, b: a + b),
+            "a": ([], lambda: 1),
+            "b": (["a"], lambda a: a * 10),
+        },
+        executor,
+        tmp_path,
+    )
+    assert job.order == ["a", "b", "total"]
+    job.start()
+    assert job.wait(5)
+    assert job.get("total") == 11
+    assert job.get_summary()["status"] == "completed"
+
+
+def test_independent_stages_run_concurrently(executor, tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+    job = _job(
+        {"left": ([], barrier.wait), "right": ([], barrier.wait)}, executor, tmp_path
+    )
+    job.start()
+    assert job.wait(5)
+    assert job.get_summary()["status"] == "completed"
+
+
+def test_failed_stage_skips_its_dependents(executor, tmp_path):
+    def fail():
+        msg = "unreadable"
+        raise RuntimeError(msg)
+
+    job = _job(
+        {
+            "read": ([], fail),
+            "bounds": (["read"], lambda read: read),
+            "other": ([], lambda: "ok"),
+        },
+        executor,
+        tmp_path,
+    )
+    job.start()
+    assert job.wait(5)
+    summary = job.get_summary()
+    assert summary["status"] == "failed"
+    assert summary["stages"]["read"]["error"] == "unreadable"
+    assert summary["stages"]["bounds"]["status"] == "skipped"
+    assert job.get("other") == "ok"
+
+
+def test_cycles_are_rejected(executor, tmp_path):
+    with pytest.raises(ValueError, match="cycle"):
+        _job({"a": (["b"], None), "b": (["a"], None)}, executor, tmp_path)
+
+
+def test_cancel_skips_pending_stages(executor, tmp_path):
+    release = threading.Event()
+    job = _job(
+        {"slow": ([], release.wait), "after": (["slow"], lambda slow: slow)},
+        executor,
+        tmp_path,
+    )
+    job.start()
+    job.cancel()
+    release.set()
+    assert job.wait(5)
+    assert job.status["after"] == "cancelled"
+    assert job.get_summary()["status"] == "cancelled"
+
+
+@pytest.fixture
+def sphere():
+    source = vtkSphereSource()
+    source.SetRadius(2.0)
+    source.Update()
+    return source.GetOutput()
+
+
+@pytest.fixture
+def sphere_stl(sphere, tmp_path):
+    writer = vtkSTLWriter()
+    writer.SetFileName(str(tmp_path / "sphere.stl"))
+    writer.SetInputData(sphere)
+    writer.Write()
+    return str(tmp_path / "sphere.stl")
+
+
+def test_service_preprocesses_an_upload(sphere_stl):
+    service = PreprocessingService(max_workers=2, lod_target_cells=20)
+    job = service.submit(sphere_stl)
+    assert job.wait(30)
+
+    summary = job.get_summary()
+    assert summary["status"] == "completed", summary["stages"]
+    assert summary["products"]["bounds"] == pytest.approx(
+        service.get_artifact(sphere_stl, "bounds")
+    )
+    assert summary["products"]["array_ranges"] == []
+    assert summary["products"]["lod_cells"] < summary["products"]["surface_cells"]
+    meshing_surface = service.get_artifact(sphere_stl, "meshing_surface")
+    assert Path(meshing_surface).stat().st_size > 0
+    assert service.get_artifact("other.stl", "bounds") is None
+
+    # Resubmitting the same file reuses the job, a new file replaces it
+    assert service.submit(sphere_stl) is job
+    service.submit(sphere_stl + ".missing")
+    assert not Path(job.output_dir).exists()
+    service.executor.shutdown(wait=True)
+
+
+def test_array_ranges_match_the_pipeline_format(sphere):
+    service = PreprocessingService(max_workers=1)
+    (normals,) = service._array_ranges(sphere)
+    assert normals["text"] == "Normals"
+    assert normals["value"] == 0
+    assert normals["type"] == vtkDataObject.FIELD_ASSOCIATION_POINTS
+    assert normals["range"] == pytest.approx(
+        list(sphere.GetPointData().GetArray(0).GetRange())
+    )
+    service.executor.shutdown(wait=True)
@@ -0,0 +1,59 @@
+import asyncio
+
+from khorium.app.core.render_scheduler import RenderScheduler
+
+
+def _attached(frame_interval=0.05):
+    calls = []
+    scheduler = RenderScheduler(frame_interval)
+    scheduler.attach(lambda: calls.append("update"), lambda: calls.append("reset"))
+    return scheduler, calls
+
+
+def test_requests_render_immediately_without_event_loop():
+    scheduler, calls = _attached()
+    scheduler.request_update()
+    scheduler.request_reset_camera()
+    assert calls == ["update", "update", "reset"]
+    assert scheduler.render_count == 2
+
+
+def test_requests_in_one_tick_are_coalesced():
+    scheduler, calls = _attached()
+
+    async def scenario():
+        scheduler.request_update()
+        scheduler.request_reset_camera()
+        scheduler.request_update()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert calls == ["update", "reset"]
+    assert scheduler.requested_count == 3
+    assert scheduler.render_count == 1
+
+
+def test_renders_are_limited_to_one_per_frame():
+    scheduler, calls = _attached(frame_interval=0.2)
+
+    async def scenario():
+        scheduler.request_update()
+        await asyncio.sleep(0.01)
+        scheduler.request_update()
+        await asyncio.sleep(0.05)
+        rendered_early = len(calls)
+        await asyncio.sleep(0.3)
+        return rendered_early
+
+    assert asyncio.run(scenario()) == 1
+    assert calls == ["update", "update"]
+
+
+def test_flush_without_changes_or_view_does_nothing():
+    scheduler = RenderScheduler()
+    scheduler.request_update()
+    assert scheduler.render_count == 0
+
+    scheduler, calls = _attached()
+    scheduler.flush()
+    assert calls == []
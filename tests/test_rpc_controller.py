@@ -0,0 +1,256 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from khorium.app.controllers.rpc_controller import RpcController
+from khorium.app.core.render_scheduler import RenderScheduler
+
+
+class FakeState:
+    """Records when batched state updates would be sent"""
+
+    def __init__(self, events):
+        self.events = events
+
+    def __enter__(self):
+        self.events.append("state_open")
+        return self
+
+    def __exit__(self, *exc):
+        self.events.append("state_sent")
+
+
+class FakeStateManager:
+    def __init__(self, events):
+        self.events = events
+        self.values = {"mesh_size_factor": 1.0}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.events.append(f"set {key}={value}")
+        self.values[key] = value
+        self.app.render_scheduler.request_update()
+
+    def show_mesh(self, visible=True):
+        self.set("show_mesh", visible)
+
+
+class FakePipeline:
+    def __init__(self):
+        self.token = 0
+        self.current_file = "blade.stl"
+        self.has_generated_mesh = False
+
+    def get_scene_token(self):
+        return self.token
+
+    def scene_changed_since(self, token):
+        return self.token != token
+
+    def get_current_file(self):
+        return self.current_file
+
+
+def _run_batch(rpc, commands, **kwargs):
+    return asyncio.run(rpc.run_batch(commands, **kwargs))
+
+
+@pytest.fixture
+def app():
+    events = []
+    ctrl = SimpleNamespace()
+    triggers = {}
+    server = SimpleNamespace(
+        trigger=lambda name: lambda func: triggers.setdefault(name, func)
+    )
+    scheduler = RenderScheduler()
+    scheduler.attach(lambda: events.append("push"), lambda: events.append("reset"))
+    state_manager = FakeStateManager(events)
+    app = SimpleNamespace(
+        ctrl=ctrl,
+        server=server,
+        triggers=triggers,
+        events=events,
+        state=FakeState(events),
+        render_scheduler=scheduler,
+        state_manager=state_manager,
+        vtk_pipeline=FakePipeline(),
+    )
+    state_manager.app = app
+    return app
+
+
+def test_batch_runs_in_order_with_one_push(app):
+    rpc = RpcController(app)
+    assert app.triggers["khorium_rpc"] == rpc.run_batch
+
+    response = _run_batch(
+        rpc,
+        [
+            {"command": "set_contour_value", "args": {"value": 2}},
+            {"command": "set_mesh_visible", "args": {"visible": False}},
+            {"command": "reset_camera"},
+            {"command": "get_state", "args": {"keys": ["contour_value"]}},
+        ],
+    )
+
+    assert response["ok"]
+    assert [r["command"] for r in response["results"]] == [
+        "set_contour_value",
+        "set_mesh_visible",
+        "reset_camera",
+        "get_state",
+    ]
+    assert response["results"][3]["result"] == {"contour_value": 2.0}
+    # Each command sends its own state changes, the view is pushed once
+    assert app.events == [
+        "state_open",
+        "set contour_value=2.0",
+        "state_sent",
+        "state_open",
+        "set show_mesh=False",
+        "state_sent",
+        "state_open",
+        "state_sent",
+        "state_open",
+        "state_sent",
+        "push",
+        "reset",
+    ]
+
+
+def test_state_is_not_held_across_awaits(app):
+    async def execute_mesh_code_async(*_args):
+        app.events.append("waiting")
+        await asyncio.sleep(0)
+        return {"success": True}
+
+    app.mesh_controller = SimpleNamespace(
+        execute_mesh_code_async=execute_mesh_code_async
+    )
+    _run_batch(
+        RpcController(app),
+        [
+            {"command": "execute_mesh_code", "args": {"code": "pass"}},
+            {"command": "set_contour_value", "args": {"value": 1}},
+        ],
+    )
+    assert app.events[:3] == ["state_open", "state_sent", "waiting"]
+
+
+def test_batch_stops_at_the_first_failure(app):
+    rpc = RpcController(app)
+    response = _run_batch(
+        rpc,
+        [
+            {"command": "set_contour_value", "args": {"value": "not a number"}},
+            {"command": "set_contour_value", "args": {"value": 3}},
+        ],
+    )
+    assert not response["ok"]
+    (failed,) = response["results"]
+    assert failed["command"] == "set_contour_value"
+    assert "could not convert" in failed["error"]
+    assert "contour_value" not in app.state_manager.values
+
+
+def test_continue_on_error_runs_every_command(app):
+    rpc = RpcController(app)
+    response = _run_batch(
+        rpc,
+        [
+            {"command": "explode"},
+            "not a command",
+            {"command": "set_contour_value", "args": {"value": 3}},
+        ],
+        continue_on_error=True,
+    )
+    assert not response["ok"]
+    assert [r["ok"] for r in response["results"]] == [False, False, True]
+    assert response["results"][0]["error"] == "Unknown command: 'explode'"
+    assert response["results"][1]["command"] == ""
+    assert app.state_manager.values["contour_value"] == 3.0
+
+
+def test_empty_batch(app):
+    response = _run_batch(RpcController(app), [])
+    assert response["ok"]
+    assert response["results"] == []
+    assert "push" not in app.events
+
+
+def test_failed_mesh_code_is_reported(app):
+    results = [
+        {"success": False, "error_message": "Script exited with code 1", "stdout": ""},
+        None,
+        {"success": True, "execution_time": 0.5, "stdout": "big"},
+    ]
+
+    async def execute_mesh_code_async(*_args):
+        return results.pop(0)
+
+    app.mesh_controller = SimpleNamespace(
+        execute_mesh_code_async=execute_mesh_code_async
+    )
+    app.state_manager.values["mesh_code_error_message"] = "Queue is full"
+    command = {"command": "execute_mesh_code", "args": {"code": "pass"}}
+    response = _run_batch(RpcController(app), [command] * 3, continue_on_error=True)
+    errors = [r.get("error") for r in response["results"]]
+    assert errors == ["Script exited with code 1", "Queue is full", None]
+    assert response["results"][2]["result"] == {
+        "success": True,
+        "execution_time": 0.5,
+    }
+
+
+def test_upload_reports_the_file_service_error(app):
+    def upload_file(files):
+        name = files[0]["name"]
+        if name.endswith(".stl"):
+            return f"/store/{name}"
+        file_service.last_error = "Invalid file format"
+        return None
+
+    async def upload_files_async(files):
+        await asyncio.sleep(0.01)
+        return [
+            {"filename": file["name"], "status": "loaded", "error": ""}
+            if file["name"].endswith(".stl")
+            else {"filename": file["name"], "status": "failed", "error": "bad mesh"}
+            for file in files
+        ]
+
+    file_service = SimpleNamespace(last_error="")
+    app.file_controller = SimpleNamespace(
+        upload_file=upload_file,
+        upload_files_async=upload_files_async,
+        file_service=file_service,
+    )
+    single = {"command": "upload_file", "args": {"files": [{"name": "part.stl"}]}}
+    response = _run_batch(
+        RpcController(app),
+        [
+            single,
+            # The same file again leaves the scene unchanged but still succeeds
+            single,
+            {
+                "command": "upload_file",
+                "args": {"files": [{"name": "a.stl"}, {"name": "b.obj"}]},
+            },
+            {
+                "command": "upload_file",
+                "args": {"files": [{"name": "c.obj"}, {"name": "d.obj"}]},
+            },
+            {"command": "upload_file", "args": {"files": [{"name": "part.obj"}]}},
+        ],
+        continue_on_error=True,
+    )
+    results = response["results"]
+    assert results[0]["result"] == {"file": "/store/part.stl"}
+    assert results[1]["result"] == {"file": "/store/part.stl"}
+    assert results[2]["result"] == {"files": ["a.stl"], "failed": 1}
+    assert results[3]["error"] == "bad mesh; bad mesh"
+    assert results[4]["error"] == "Invalid file format"
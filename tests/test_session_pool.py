@@ -0,0 +1,108 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from khorium.app.session_pool import SessionPool, _parse_port_range
+
+SERVER = "import sys, time\nprint(sys.argv[1:], flush=True)\n{ready}time.sleep(60)\n"
+
+
+def _pool(tmp_path, size=1, ready=True, **kwargs):
+    script = tmp_path / "server.py"
+    ready_code = "print('Starting factory', flush=True)\n" if ready else ""
+    script.write_text(SERVER.format(ready=ready_code))
+    return SessionPool(
+        size=size,
+        ports="9101-9103",
+        ready_line="Starting factory",
+        proxy_file=str(tmp_path / "proxy.txt"),
+        command=[sys.executable, str(script)],
+        **{"ready_timeout": 10, **kwargs},
+    )
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.05)
+
+
+def test_parse_port_range():
+    assert _parse_port_range("9001-9003") == [9001, 9002, 9003]
+    assert _parse_port_range("9001") == [9001]
+
+
+def test_acquire_hands_out_a_warm_process_and_replenishes(tmp_path):
+    pool = _pool(tmp_path, size=1)
+
+    async def scenario():
+        await pool.start()
+        try:
+            await _wait_for(lambda: pool.get_status()["idle"] == 1)
+            pooled = await pool.acquire()
+            assert pooled.alive
+            await _wait_for(lambda: pool.get_status()["idle"] == 1)
+            return pooled, pool.get_status()
+        finally:
+            await pool.stop()
+
+    pooled, status = asyncio.run(scenario())
+    assert status["claimed"] == 1
+    assert status["acquired"] == 1
+    assert status["cold_starts"] == 0
+    assert pooled.port == 9101
+    assert Path(pool.proxy_file).read_text() == ""
+
+    session = pooled.to_dict("example", "ws://host/proxy?sessionId=${id}&port=${port}")
+    assert session["sessionURL"] == f"ws://host/proxy?sessionId={pooled.id}&port=9101"
+    assert session["ready"]
+
+
+def test_empty_pool_starts_a_process_on_demand(tmp_path):
+    pool = _pool(tmp_path, size=0)
+
+    async def scenario():
+        try:
+            pooled = await pool.acquire()
+            proxy = Path(pool.proxy_file).read_text()
+            return pooled, proxy
+        finally:
+            await pool.stop()
+
+    pooled, proxy = asyncio.run(scenario())
+    assert pool.cold_start_count == 1
+    assert proxy == f"{pooled.id} localhost:9101\n"
+
+
+def test_process_that_never_gets_ready_is_dropped(tmp_path):
+    pool = _pool(tmp_path, size=0, ready=False, ready_timeout=1)
+
+    async def scenario():
+        try:
+            return await pool.acquire()
+        finally:
+            await pool.stop()
+
+    assert asyncio.run(scenario()) is None
+    assert pool.processes == {}
+
+
+@pytest.mark.parametrize("ports", ["9101-9101"])
+def test_acquire_fails_when_the_port_range_is_used_up(tmp_path, ports):
+    pool = _pool(tmp_path, size=0)
+    pool.ports = _parse_port_range(ports)
+
+    async def scenario():
+        try:
+            first = await pool.acquire()
+            second = await pool.acquire()
+            return first, second
+        finally:
+            await pool.stop()
+
+    first, second = asyncio.run(scenario())
+    assert first is not None
+    assert second is None
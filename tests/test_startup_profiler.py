@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from khorium.app.utils.startup_profiler import StartupProfiler
+
+
+@pytest.fixture
+def packages(tmp_path, monkeypatch):
+    (tmp_path / "outer_pkg").mkdir()
+    (tmp_path / "outer_pkg" / "__init__.py").write_text("import inner_pkg\n")
+    (tmp_path / "inner_pkg").mkdir()
+    (tmp_path / "inner_pkg" / "__init__.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ("outer_pkg", "inner_pkg"):
+        sys.modules.pop(name, None)
+
+
+@pytest.mark.usefixtures("packages")
+def test_imports_are_attributed_to_top_level_packages():
+    profiler = StartupProfiler()
+    profiler.install()
+    try:
+        import outer_pkg  # noqa: F401
+    finally:
+        profiler.uninstall()
+
+    assert set(profiler.import_times) >= {"outer_pkg", "inner_pkg"}
+    assert profiler.import_counts["outer_pkg"] == 1
+    packages_reported = {e["package"] for e in profiler.get_report()["imports"]}
+    assert packages_reported >= {"outer_pkg", "inner_pkg"}
+
+
+def test_report_is_printed_once(tmp_path, capsys):
+    profiler = StartupProfiler()
+    profiler.install()
+    profiler.mark("imports done")
+    profiler.mark("server ready")
+    report_path = tmp_path / "startup.json"
+    profiler.print_report(str(report_path))
+    profiler.print_report(str(tmp_path / "again.json"))
+
+    report = json.loads(report_path.read_text())
+    assert [p["phase"] for p in report["phases"]] == ["imports done", "server ready"]
+    assert not (tmp_path / "again.json").exists()
+    assert profiler._original_import is None
+    assert "STARTUP_PROFILE" in capsys.readouterr().out
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    code = (
+        "import sys\n"
+        "import khorium.app.services.mesh_service\n"
+        "import khorium.app.controllers.file_controller\n"
+        "heavy = ('gmsh', 'requests', 'khorium.app.services.preprocessing_service')\n"
+        "print([name for name in heavy if name in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parent,
+    )
+    assert result.stdout.strip() == "[]"
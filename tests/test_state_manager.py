@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from trame.app import get_server
+
+from khorium.app.core import state_manager
+from khorium.app.core.state_manager import StateManager, serialize_state_value
+
+
+def _manager(request):
+    server = get_server(request.node.name, client_type="vue3")
+    server.state.ready()
+    return StateManager(server.state)
+
+
+@pytest.fixture
+def manager(request):
+    return _manager(request)
+
+
+@pytest.fixture
+def dirty_keys(manager, monkeypatch):
+    marked = []
+    state_class = type(manager.state)
+    dirty = state_class.dirty
+
+    def record(state, *keys):
+        marked.extend(keys)
+        dirty(state, *keys)
+
+    monkeypatch.setattr(state_class, "dirty", record)
+    return marked
+
+
+def test_in_place_writes_are_flushed_right_away(manager, dirty_keys):
+    items = [1, 2]
+    manager.set("items", items)
+    assert dirty_keys == []
+
+    items.append(3)
+    manager.set("items", items)  # Same object, trame would not send it
+    assert dirty_keys == ["items"]
+    assert manager.flush_state() == []
+
+    result = {"stdout": ""}
+    manager.set_multiple({"result": result, "count": 1})
+    result["stdout"] = "done"
+    manager.set_multiple({"result": result, "count": 2})
+    assert dirty_keys == ["items", "result"]
+
+
+def test_new_objects_are_left_to_trame(manager, dirty_keys):
+    manager.set("items", [1])
+    manager.set("items", [1, 2])
+    assert manager.flush_state() == []
+    assert dirty_keys == []
+
+
+def test_explicit_keys_are_always_flushed(manager, dirty_keys):
+    manager.set("items", [1])
+    assert manager.flush_state(["items"]) == ["items"]
+    assert manager.flush_state(["items"]) == ["items"]
+    assert dirty_keys == ["items", "items"]
+
+
+def test_serialize_state_value_is_compact_json():
+    assert serialize_state_value({"a": [1, 2]}) == b'{"a":[1,2]}'
+    assert json.loads(serialize_state_value({"path": object()}))["path"].startswith(
+        "<object"
+    )
+
+
+def test_traffic_statistics_are_disabled_by_default(manager):
+    assert manager.traffic is None
+    assert manager.dump_state_traffic() is None
+
+
+def test_writes_and_handlers_are_recorded(request, monkeypatch):
+    monkeypatch.setattr(state_manager, "STATE_TRAFFIC_STATS_ENABLED", True)
+    manager = _manager(request)
+    calls = []
+    manager.on_change("zoom", lambda zoom=None, **_: calls.append(zoom))
+    manager.set("zoom", 2)
+    manager.set_multiple({"zoom": 3, "label": "mesh"})
+    manager.state.flush()
+
+    updates = {entry["key"]: entry for entry in manager.traffic.snapshot()["updates"]}
+    assert updates["zoom"]["count"] == 2
+    assert updates["label"]["bytes"] == len(b'"mesh"')
+    assert "state_traffic" not in updates
+    assert calls
+    (handler,) = manager.traffic.snapshot()["handlers"]
+    assert handler["key"] == "zoom"
+    assert handler["events"] >= 1
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+from khorium.app.core.state_manager import serialize_state_value
+from khorium.app.core.state_traffic import StateTrafficStats
+
+
+def test_updates_are_counted_per_key():
+    stats = StateTrafficStats(serialize_state_value)
+    stats.record_update("small", 1)
+    stats.record_update("big", "x" * 100)
+    stats.record_update("big", "x" * 10)
+
+    snapshot = stats.snapshot()
+    assert snapshot["total_updates"] == 3
+    assert snapshot["total_bytes"] == 1 + 102 + 12
+    big, small = snapshot["updates"]
+    assert big == {
+        "key": "big",
+        "count": 2,
+        "bytes": 114,
+        "max_bytes": 102,
+        "last_bytes": 12,
+    }
+    assert small["key"] == "small"
+
+
+def test_unserializable_values_count_as_empty():
+    def serialize(value):
+        raise TypeError(value)
+
+    stats = StateTrafficStats(serialize)
+    stats.record_update("key", object())
+    assert stats.snapshot()["updates"][0]["bytes"] == 0
+
+
+def test_instrumented_handlers_record_latency():
+    stats = StateTrafficStats(serialize_state_value)
+    calls = []
+
+    def on_change(value=None, **_kwargs):
+        calls.append(value)
+
+    handler = stats.instrument("key", on_change)
+    assert handler.__name__ == "on_change"
+    stats.record_event("key", "on_change")
+    stats.record_event("key", "on_change")
+    handler(value=1)
+
+    (entry,) = stats.snapshot()["handlers"]
+    assert calls == [1]
+    assert entry["events"] == 2
+    assert entry["calls"] == 1
+    assert entry["mean_time"] == entry["total_time"] >= 0
+
+
+def test_dump_and_reset(tmp_path):
+    stats = StateTrafficStats(serialize_state_value)
+    stats.record_update("key", [1, 2])
+    path = stats.dump(str(tmp_path / "traffic.json"))
+    assert json.loads(Path(path).read_text())["total_bytes"] == 5
+
+    stats.reset()
+    assert stats.snapshot()["updates"] == []
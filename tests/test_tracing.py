@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from khorium.app.utils.tracing import TRACE_CONTEXT_ENV, TRACE_FILE_ENV, Tracer
+
+
+def _spans(tracer, trace_id=None):
+    return {
+        event["name"]: event
+        for event in tracer.export_chrome_trace(trace_id)["traceEvents"]
+        if event["ph"] == "X"
+    }
+
+
+def test_nested_spans_share_the_outer_trace():
+    tracer = Tracer(enabled=True)
+    with (
+        tracer.span("controller.action", size=3) as outer,
+        tracer.span("service.step") as inner,
+    ):
+        assert inner.trace_id == outer.trace_id
+
+    spans = _spans(tracer)
+    assert spans["service.step"]["args"]["parent_id"] == outer.span_id
+    assert spans["controller.action"]["args"]["parent_id"] is None
+    assert spans["controller.action"]["args"]["size"] == 3
+    assert spans["controller.action"]["cat"] == "controller"
+    assert tracer.list_traces()[0]["action"] == "controller.action"
+    assert tracer.list_traces()[0]["finished"] is True
+
+
+def test_errors_are_recorded():
+    tracer = Tracer(enabled=True)
+    error = RuntimeError("failed")
+    with pytest.raises(RuntimeError), tracer.span("action"):
+        raise error
+    assert "failed" in _spans(tracer)["action"]["args"]["error"]
+
+
+def test_traced_wraps_functions_and_coroutines():
+    tracer = Tracer(enabled=True)
+
+    @tracer.traced("step")
+    def step():
+        return 1
+
+    @tracer.traced()
+    async def action():
+        await asyncio.sleep(0)
+        return step() + 1
+
+    assert asyncio.run(action()) == 2
+    spans = _spans(tracer)
+    assert set(spans) == {
+        "test_traced_wraps_functions_and_coroutines.<locals>.action",
+        "step",
+    }
+    assert len(tracer.list_traces()) == 1
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("action") as context:
+        assert context is None
+    assert tracer.list_traces() == []
+    assert tracer.export_chrome_trace() == {"traceEvents": []}
+
+
+def test_oldest_traces_are_dropped():
+    tracer = Tracer(enabled=True, max_traces=2)
+    for name in ("first", "second", "third"):
+        with tracer.span(name):
+            pass
+    assert [trace["action"] for trace in tracer.list_traces()] == ["second", "third"]
+
+
+def test_worker_events_join_the_active_span(tmp_path):
+    tracer = Tracer(enabled=True)
+    trace_file = tmp_path / "trace.jsonl"
+    assert tracer.get_worker_env(str(trace_file)) == {
+        TRACE_CONTEXT_ENV: "",
+        TRACE_FILE_ENV: "",
+    }
+
+    with tracer.span("action") as context:
+        env = tracer.get_worker_env(str(trace_file))
+        assert json.loads(env[TRACE_CONTEXT_ENV]) == context.to_dict()
+        worker_event = {
+            "name": "mesh_code.script",
+            "ph": "X",
+            "ts": 1,
+            "dur": 5,
+            "pid": os.getpid() + 1,
+            "tid": 1,
+            "args": {},
+        }
+        # The last line of a killed worker can be cut short
+        trace_file.write_text(json.dumps(worker_event) + "\n" + '{"name": "partial')
+        tracer.collect_worker_events(str(trace_file))
+
+    exported = tracer.export_chrome_trace(path=str(tmp_path / "export.json"))
+    assert _spans(tracer)["mesh_code.script"]["args"]["parent_id"] == context.span_id
+    processes = {
+        event["args"]["name"] for event in exported["traceEvents"] if event["ph"] == "M"
+    }
+    assert processes == {"khorium", "mesh code worker"}
+    assert (
+        json.loads((tmp_path / "export.json").read_text())["otherData"]["action"]
+        == "action"
+    )
+
+
+def test_activate_restores_a_captured_span():
+    tracer = Tracer(enabled=True)
+    with tracer.span("action") as context:
+        captured = tracer.current_context()
+    assert tracer.current_context() is None
+
+    with tracer.activate(captured), tracer.span("callback"):
+        pass
+    assert _spans(tracer)["callback"]["args"]["parent_id"] == context.span_id
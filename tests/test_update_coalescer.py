@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from khorium.app.core.update_coalescer import UpdateCoalescer, UpdatePolicy
+
+
+class FakeState:
+    """Stands in for trame's state: a dict that records each flushed update"""
+
+    def __init__(self):
+        self.values = {}
+        self.updates = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def update(self, values):
+        self.values.update(values)
+        self.updates.append(dict(values))
+
+
+def _recorder():
+    calls = []
+
+    def handler(value=None, **_kwargs):
+        calls.append(value)
+
+    return calls, handler
+
+
+def test_unknown_policy_mode():
+    with pytest.raises(ValueError, match="Unknown update policy"):
+        UpdatePolicy("sometimes", 0.1)
+
+
+def test_keys_without_policy_are_not_wrapped():
+    _calls, handler = _recorder()
+    coalescer = UpdateCoalescer(FakeState(), {})
+    assert coalescer.wrap("value", handler) is handler
+
+
+def test_handlers_run_directly_without_event_loop():
+    calls, handler = _recorder()
+    coalescer = UpdateCoalescer(FakeState(), {"value": UpdatePolicy.debounce(10)})
+    wrapped = coalescer.wrap("value", handler)
+    wrapped(value=1)
+    wrapped(value=2)
+    assert calls == [1, 2]
+
+
+def test_debounce_runs_once_with_last_value():
+    async def scenario():
+        calls, handler = _recorder()
+        coalescer = UpdateCoalescer(FakeState(), {"value": UpdatePolicy.debounce(0.05)})
+        wrapped = coalescer.wrap("value", handler)
+        for value in range(5):
+            wrapped(value=value)
+        assert calls == []
+        await asyncio.sleep(0.1)
+        assert calls == [4]
+        assert coalescer.coalesced_count == 4
+
+    asyncio.run(scenario())
+
+
+def test_throttle_runs_first_and_last_value():
+    async def scenario():
+        calls, handler = _recorder()
+        coalescer = UpdateCoalescer(FakeState(), {"value": UpdatePolicy.throttle(0.05)})
+        wrapped = coalescer.wrap("value", handler)
+        for value in range(5):
+            wrapped(value=value)
+        assert calls == [0]
+        await asyncio.sleep(0.1)
+        assert calls == [0, 4]
+        assert coalescer.coalesced_count == 3
+
+    asyncio.run(scenario())
+
+
+def test_deferred_writes_are_applied_as_one_update():
+    async def scenario():
+        state = FakeState()
+        coalescer = UpdateCoalescer(state, {})
+        coalescer.defer({"a": 1, "b": 1})
+        coalescer.defer({"b": 2, "c": 3})
+        coalescer.defer({"d": 4})
+        coalescer.discard(["d"])
+        assert state.updates == []
+        await asyncio.sleep(0)
+        assert state.updates == [{"a": 1, "b": 2, "c": 3}]
+        assert coalescer.flush_count == 1
+
+    asyncio.run(scenario())
+
+
+def test_defer_applies_immediately_without_event_loop():
+    state = FakeState()
+    UpdateCoalescer(state, {}).defer({"a": 1})
+    assert state.values == {"a": 1}
+
+
+def test_run_pending_flushes_debounced_handlers():
+    async def scenario():
+        calls, handler = _recorder()
+        other_calls, other_handler = _recorder()
+        coalescer = UpdateCoalescer(
+            FakeState(),
+            {"value": UpdatePolicy.debounce(10), "other": UpdatePolicy.debounce(10)},
+        )
+        coalescer.wrap("value", handler)(value=1)
+        coalescer.wrap("other", other_handler)(value=2)
+
+        coalescer.run_pending("value")
+        assert calls == [1]
+        assert other_calls == []
+        coalescer.run_pending()
+        assert other_calls == [2]
+        # Nothing left to run when the timers would have fired
+        coalescer.run_pending()
+        assert calls == [1]
+        assert other_calls == [2]
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from khorium.app.services.upload_store import UploadQuotaExceededError, UploadStore
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = UploadStore(str(tmp_path))
+    first = store.put_bytes("s1", "uploaded.stl", b"solid a", ".stl")
+    second = store.put_bytes("s2", "part.stl", b"solid a", ".STL")
+
+    assert first == second
+    assert [p.name for p in Path(store.blobs_dir).iterdir()] == [Path(first).name]
+    assert store.resolve("s1", "uploaded.stl") == first
+    assert store.resolve("s2", "part.stl") == first
+
+
+def test_blob_is_deleted_with_its_last_reference(tmp_path):
+    store = UploadStore(str(tmp_path))
+    path = store.put_bytes("s1", "uploaded.stl", b"solid a", ".stl")
+    store.put_bytes("s2", "uploaded.stl", b"solid a", ".stl")
+
+    store.release("s1", "uploaded.stl")
+    assert Path(path).exists()
+    assert store.resolve("s1", "uploaded.stl") is None
+
+    store.release_session("s2")
+    assert not Path(path).exists()
+    assert store.list_names("s2") == []
+
+
+def test_replacing_a_name_releases_the_old_blob(tmp_path):
+    store = UploadStore(str(tmp_path))
+    old = store.put_bytes("s1", "uploaded.stl", b"solid a", ".stl")
+    new = store.put_bytes("s1", "uploaded.stl", b"solid b", ".stl")
+
+    assert old != new
+    assert not Path(old).exists()
+    assert store.list_names("s1") == ["uploaded.stl"]
+
+
+def test_put_file_moves_staged_content(tmp_path):
+    store = UploadStore(str(tmp_path))
+    staged = store.staging_path("upload.part")
+    Path(staged).write_bytes(b"solid a")
+    content_hash = hashlib.sha256(b"solid a").hexdigest()
+
+    path = store.put_file("s1", "uploaded.stl", staged, content_hash, ".stl")
+    assert not Path(staged).exists()
+    assert store.has_blob(content_hash, ".stl")
+    assert store.link_existing("s2", "copy.stl", content_hash, ".stl") == path
+    assert store.link_existing("s2", "missing.stl", "0" * 64, ".stl") is None
+
+
+def test_session_quota(tmp_path):
+    store = UploadStore(str(tmp_path), max_session_bytes=10)
+    store.put_bytes("s1", "a.stl", b"x" * 6, ".stl")
+    with pytest.raises(UploadQuotaExceededError):
+        store.put_bytes("s1", "b.stl", b"y" * 6, ".stl")
+    # Replacing a name does not count the content it replaces
+    store.put_bytes("s1", "a.stl", b"z" * 8, ".stl")
+    assert store.get_usage("s1")["session_bytes"] == 8
+
+
+def test_total_quota_ignores_deduplicated_content(tmp_path):
+    store = UploadStore(str(tmp_path), max_total_bytes=10)
+    store.put_bytes("s1", "a.stl", b"x" * 8, ".stl")
+    store.put_bytes("s2", "a.stl", b"x" * 8, ".stl")
+    with pytest.raises(UploadQuotaExceededError):
+        store.put_bytes("s3", "a.stl", b"y" * 8, ".stl")
+    assert store.get_usage()["total_bytes"] == 8
+
+
+@pytest.mark.skipif(os.name != "posix", reason="owner liveness is checked on POSIX")
+def test_sweep_reclaims_what_dead_sessions_left(tmp_path):
+    store = UploadStore(str(tmp_path))
+    live = store.put_bytes("live", "uploaded.stl", b"solid a", ".stl")
+    store.put_bytes("dead", "part.stl", b"solid a", ".stl")
+    orphan = store.put_bytes("dead", "other.stl", b"solid b", ".stl")
+    exited = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    Path(store.owners_dir, "dead").write_text(exited.stdout.strip())
+
+    ghost_ref = Path(store.refs_dir, Path(live).name, "gone__uploaded.stl")
+    ghost_ref.touch()
+    stray_blob = Path(store.blob_path("0" * 64, ".vtu"))
+    stray_blob.write_bytes(b"unreferenced")
+    stale, fresh = (
+        Path(store.staging_path("stale.part")),
+        Path(store.staging_path("fresh.part")),
+    )
+    stale.write_bytes(b"abandoned")
+    fresh.write_bytes(b"in progress")
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    removed = store.sweep(staging_max_age=3600)
+    assert removed == {"sessions": 1, "refs": 1, "staging": 1, "blobs": 1}
+    assert store.resolve("live", "uploaded.stl") == live
+    assert store.list_names("dead") == []
+    assert not Path(orphan).exists()
+    assert not ghost_ref.exists()
+    assert not stray_blob.exists()
+    assert not stale.exists()
+    assert fresh.exists()
+
+    # Nothing is left to reclaim
+    assert not any(store.sweep(staging_max_age=3600).values())
@@ -0,0 +1,140 @@
+import io
+import struct
+
+import pytest
+
+from khorium.app.services import upload_validation
+from khorium.app.services.upload_validation import (
+    validate_mesh_bytes,
+    validate_mesh_file,
+)
+
+ASCII_STL = b"""solid part
+facet normal 0 0 1
+ outer loop
+  vertex 0 0 0
+  vertex 1 0 0
+  vertex 0 1 0
+ endloop
+endfacet
+endsolid part
+"""
+
+
+def _binary_stl(triangles, declared=None):
+    header = b"binary stl".ljust(80, b"\0") + struct.pack(
+        "<I", triangles if declared is None else declared
+    )
+    return header + b"\0" * 50 * triangles
+
+
+def _appended_vtu(points=3, truncate=0):
+    # Raw appended blocks: UInt32 byte count followed by the data
+    blocks = [
+        struct.pack("<I", points * 12) + b"\0" * points * 12,
+        struct.pack("<I", 12) + b"\0" * 12,
+    ]
+    offsets = [0, len(blocks[0])]
+    data = b"".join(blocks)
+    data = data[: len(data) - truncate]
+    return (
+        b'<?xml version="1.0"?>\n'
+        b'<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt32">\n'
+        b"<UnstructuredGrid>\n"
+        + f'<Piece NumberOfPoints="{points}" NumberOfCells="1">\n'.encode()
+        + b"<Points>\n"
+        + f'<DataArray type="Float32" NumberOfComponents="3" format="appended" offset="{offsets[0]}"/>\n'.encode()
+        + b"</Points>\n<Cells>\n"
+        + f'<DataArray type="Int32" Name="connectivity" format="appended" offset="{offsets[1]}"/>\n'.encode()
+        + b"</Cells>\n</Piece>\n</UnstructuredGrid>\n"
+        + b'<AppendedData encoding="raw">\n_'
+        + data
+        + b"\n</AppendedData>\n</VTKFile>\n"
+    )
+
+
+def _inline_vtu(values=1000):
+    payload = b" ".join(b"0" for _ in range(values))
+    return (
+        b'<?xml version="1.0"?>\n<VTKFile type="UnstructuredGrid" version="1.0">\n<UnstructuredGrid>\n'
+        b'<Piece NumberOfPoints="1" NumberOfCells="0">\n<Points>\n'
+        b'<DataArray type="Float32" NumberOfComponents="3" format="ascii">\n'
+        + payload
+        + b"\n</DataArray>\n"
+        b"</Points>\n</Piece>\n</UnstructuredGrid>\n</VTKFile>\n"
+    )
+
+
+def test_valid_binary_stl():
+    assert validate_mesh_bytes(_binary_stl(3), "part.stl") is None
+
+
+def test_truncated_binary_stl():
+    error = validate_mesh_bytes(_binary_stl(3)[:-10], "part.stl")
+    assert "truncated" in error
+    assert "3 triangles" in error
+
+
+def test_binary_stl_with_trailing_bytes():
+    error = validate_mesh_bytes(_binary_stl(2, declared=1), "part.stl")
+    assert "50 are unaccounted for" in error
+
+
+def test_binary_stl_smaller_than_header():
+    assert "smaller than the 84 byte" in validate_mesh_bytes(b"\0" * 20, "part.stl")
+
+
+def test_binary_stl_header_starting_with_solid():
+    content = b"solid from exporter".ljust(80, b" ") + struct.pack("<I", 1) + b"\0" * 50
+    assert validate_mesh_bytes(content, "part.stl") is None
+
+
+def test_ascii_stl():
+    assert validate_mesh_bytes(ASCII_STL, "part.stl") is None
+    assert "endsolid" in validate_mesh_bytes(ASCII_STL[:-30], "part.stl")
+
+
+def test_other_formats_are_not_checked():
+    assert validate_mesh_bytes(b"anything", "part.step") is None
+
+
+def test_valid_appended_vtu(tmp_path):
+    path = tmp_path / "mesh.vtu"
+    path.write_bytes(_appended_vtu())
+    assert validate_mesh_file(str(path)) is None
+
+
+def test_truncated_appended_block():
+    error = validate_mesh_bytes(_appended_vtu(truncate=4), "mesh.vtu")
+    assert "truncated" in error
+    assert "offset 40" in error
+
+
+def test_missing_closing_tag():
+    content = _appended_vtu()
+    assert "</VTKFile>" in validate_mesh_bytes(content[:-20], "mesh.vtu")
+
+
+def test_vtu_header_checks():
+    assert "not a VTK XML file" in validate_mesh_bytes(b"solid part", "mesh.vtu")
+    content = _appended_vtu().replace(b"UnstructuredGrid", b"PolyData", 1)
+    assert "expected 'UnstructuredGrid'" in validate_mesh_bytes(content, "mesh.vtu")
+    content = _appended_vtu().replace(b'NumberOfPoints="3"', b'NumberOfPoints="x"')
+    assert "invalid NumberOfPoints" in validate_mesh_bytes(content, "mesh.vtu")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_header_scan_is_independent_of_chunk_size(monkeypatch, chunk_size):
+    monkeypatch.setattr(upload_validation, "VTU_SCAN_CHUNK", chunk_size)
+    assert validate_mesh_bytes(_appended_vtu(), "mesh.vtu") is None
+    assert "truncated" in validate_mesh_bytes(_appended_vtu(truncate=4), "mesh.vtu")
+    assert validate_mesh_bytes(_inline_vtu(), "mesh.vtu") is None
+
+
+def test_header_scan_stops_before_inline_payload(monkeypatch):
+    monkeypatch.setattr(upload_validation, "VTU_SCAN_CHUNK", 16)
+    f = io.BytesIO(_inline_vtu(values=100000))
+    header, data_start = upload_validation._read_vtu_header(f)
+    assert data_start is None
+    assert header.endswith(b'format="ascii">')
+    assert f.tell() < 1024
@@ -0,0 +1,43 @@
+import pytest
+from vtkmodules.vtkRenderingCore import vtkActor
+
+from khorium.app.core.vtk_pipeline import VtkPipeline
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return VtkPipeline()
+
+
+def test_scene_token_is_stable_without_changes(pipeline):
+    token = pipeline.get_scene_token()
+    assert not pipeline.scene_changed_since(token)
+    assert pipeline.scene_changed_since(None)
+
+
+def test_camera_moves_do_not_change_the_scene(pipeline):
+    token = pipeline.get_scene_token()
+    pipeline.renderer.GetActiveCamera().Azimuth(30)
+    assert not pipeline.scene_changed_since(token)
+
+
+def test_property_and_filter_changes_change_the_scene(pipeline):
+    token = pipeline.get_scene_token()
+    pipeline.set_contour_value(pipeline.contour_value + 1.0)
+    assert pipeline.scene_changed_since(token)
+
+    token = pipeline.get_scene_token()
+    props = pipeline.renderer.GetViewProps()
+    props.GetItemAsObject(0).GetProperty().SetOpacity(0.5)
+    assert pipeline.scene_changed_since(token)
+
+
+def test_adding_an_actor_changes_the_scene(pipeline):
+    token = pipeline.get_scene_token()
+    actor = vtkActor()
+    pipeline.renderer.AddActor(actor)
+    assert pipeline.scene_changed_since(token)
+
+    token = pipeline.get_scene_token()
+    pipeline.renderer.RemoveActor(actor)
+    assert pipeline.scene_changed_since(token)